@@ -0,0 +1,32 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0002_audit_events'
+down_revision = '0001_init'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'admin_audit_events',
+        sa.Column('id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('user_email', sa.String(255), nullable=False, index=True),
+        sa.Column('connection_id', sa.Integer, nullable=False),
+        sa.Column('connection_name', sa.String(255), nullable=True),
+        sa.Column('action', sa.String(32), nullable=False),
+        sa.Column('schema_name', sa.String(63), nullable=False),
+        sa.Column('table_name', sa.String(63), nullable=False),
+        sa.Column('key', postgresql.JSONB, nullable=True),
+        sa.Column('before', postgresql.JSONB, nullable=True),
+        sa.Column('after', postgresql.JSONB, nullable=True),
+    )
+    op.create_index('ix_admin_audit_events_table', 'admin_audit_events', ['schema_name', 'table_name', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_admin_audit_events_table', table_name='admin_audit_events')
+    op.drop_table('admin_audit_events')
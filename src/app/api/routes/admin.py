@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, PlainTextResponse
 from pathlib import Path
-from app.core.db import get_db
+from typing import Any, Dict, Optional
+from app.core import profiling
+from app.core.config import get_settings
+from app.core.db import engine, get_db
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.services import migrations
 from app.services.user_service import list_users
 from app.core.security import get_current_user, ensure_is_admin
 
@@ -11,6 +15,7 @@ from alembic.config import Config
 import os
 
 router = APIRouter(prefix="/admin", tags=["admin"])
+settings = get_settings()
 SPA_INDEX = Path("app/ui/static/spa/index.html")
 
 @router.get("/")
@@ -41,6 +46,25 @@ async def login_page(request: Request):
     return RedirectResponse("/", status_code=302)
 
 
+@router.get("/profiling")
+async def list_request_profiles(current_user=Depends(get_current_user)):
+    """Stored request profiles, newest first (see app/core/profiling.py)."""
+    ensure_is_admin(current_user)
+    return {"items": [p.summary() for p in profiling.list_profiles()]}
+
+
+@router.get("/profiling/{profile_id}")
+async def get_request_profile(profile_id: str, format: str = "json", current_user=Depends(get_current_user)):
+    """Profile with SQL statements; format=folded returns only the collapsed stacks for flame graph tools."""
+    ensure_is_admin(current_user)
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (expired or never recorded)")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return profile.to_dict()
+
+
 @router.get("/migrations/status", response_class=JSONResponse)
 async def migrations_status(current_user=Depends(get_current_user)):
     ensure_is_admin(current_user)
@@ -56,14 +80,75 @@ def _get_alembic_config() -> Config:
     return Config(config_path)
 
 
+@router.get("/migrations/preflight", response_class=JSONResponse)
+async def migrations_preflight(current_user=Depends(get_current_user)):
+    """Pending revisions rendered to SQL, with lock level, cost and risk per statement."""
+    ensure_is_admin(current_user)
+    try:
+        cfg = _get_alembic_config()
+        return await migrations.preflight(engine, cfg, settings.migration_large_table_bytes)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Alembic pre-flight failed: {e}")
+
+
+def _int_field(payload: Dict[str, Any], name: str, default: int, minimum: int) -> int:
+    """Integer field of a request body, `default` when absent; 400 when invalid."""
+    value = payload.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HTTPException(status_code=400, detail=f"'{name}' must be an integer")
+    try:
+        number = int(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be an integer") from exc
+    if number < minimum:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be >= {minimum}")
+    return number
+
+
 @router.post("/migrations/upgrade", response_class=JSONResponse)
-async def run_migrations_upgrade_head(current_user=Depends(get_current_user)):
+async def run_migrations_upgrade_head(
+    payload: Optional[Dict[str, Any]] = None,
+    current_user=Depends(get_current_user),
+):
+    """Upgrade to head.
+
+    Body (optional): {"guarded": bool = true, "lock_timeout_ms", "statement_timeout_ms",
+    "retries", "backoff_ms"}. Guarded mode runs the pre-flight SQL statement by
+    statement with lock/statement timeouts and retries lock timeouts with backoff;
+    "guarded": false runs the migration scripts directly as before.
+    """
     ensure_is_admin(current_user)
+    payload = payload or {}
+    guarded = payload.get("guarded", True)
+    if not isinstance(guarded, bool):
+        raise HTTPException(status_code=400, detail="'guarded' must be a boolean")
+    # validated before the broad except below turns mistakes into 500s
+    lock_timeout_ms = _int_field(payload, "lock_timeout_ms", settings.migration_lock_timeout_ms, 1)
+    statement_timeout_ms = _int_field(payload, "statement_timeout_ms", settings.migration_statement_timeout_ms, 1)
+    retries = _int_field(payload, "retries", settings.migration_lock_retries, 0)
+    backoff_ms = _int_field(payload, "backoff_ms", settings.migration_retry_backoff_ms, 0)
     try:
         cfg = _get_alembic_config()
-        command.upgrade(cfg, "head")
+        if not guarded:
+            command.upgrade(cfg, "head")
+            return {"status": "ok", "message": "Migrations upgraded to head"}
+        result = await migrations.run_guarded(
+            engine,
+            cfg,
+            lock_timeout_ms=lock_timeout_ms,
+            statement_timeout_ms=statement_timeout_ms,
+            retries=retries,
+            backoff_ms=backoff_ms,
+        )
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    except migrations.LockRetriesExhausted as e:
+        # nothing of the blocked transaction block was applied; safe to retry later
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Alembic upgrade failed: {e}")
-    return {"status": "ok", "message": "Migrations upgraded to head"}
+    return {"status": "ok", "message": "Migrations upgraded to head", **result}
@@ -1,14 +1,45 @@
-from typing import Any, Dict, List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
-
-from app.core.db import engine as default_engine, get_db
+import asyncio
+import json
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.types import JSON
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.admission import AdmissionTicket, admission_guard
+from app.core import db_monitor
+from app.core.config import get_settings
+from app.core.db import (
+    admin_engine as default_engine,
+    engine as app_engine,
+    get_db,
+    pin_request_sessions,
+    release_request_sessions,
+    request_session,
+)
+from app.core.replica import NODE_HEADER, get_read_engine, is_connection_error, run_read
 from app.core.security import get_current_user, ensure_is_admin
+from app.core.tenancy import current_tenant_schema, install_search_path, tenant_scope
+from app.models.audit import AuditEvent
+from app.services import activity, audit, change_feed, column_stats, fanout, jobs, maintenance, table_copy, table_diff, table_sample
+from app.services.bulk_service import estimate_matching_rows, prepare_bulk, run_bulk
+from app.services.schema_service import get_schema_cache
+from app.services.db_utils import INSUFFICIENT_PRIVILEGE, fetch_primary_key, quote_ident, sqlstate, table_identifier
+from app.services.result_cache import ResultCache
+from app.services.ref_labels import FOREIGN_KEYS_SQL, label_cache, pick_label_column, resolve_labels
+from app.services.export_service import FORMATS, arrow_available, prepare_export, stream_export
+from app.services.search_service import create_search_index, search_table
+from app.services.table_read import attach_sizes, build_select_list, column_types, encode_cell
+
 
+settings = get_settings()
 
-router = APIRouter(prefix="/admin/db", tags=["db-admin"])
+T = TypeVar("T")
 
 
 # --- Simple in-memory connection registry (process-local, non-persistent) ---
@@ -26,12 +57,49 @@ _connections: Dict[int, DbConnection] = {}
 _next_conn_id: int = 1
 _active_connection_id: Optional[int] = None
 
+# Shared read_table page cache (settings.table_cache_enabled); the response
+# header tells whether a page was a cache hit, a miss or joined a running load
+CACHE_HEADER = "X-Cache"
+page_cache = ResultCache(settings.table_cache_max_entries, settings.table_cache_ttl_seconds)
+# pg_stat_activity snapshots per connection, shared by admins polling the monitor
+activity_cache = ResultCache(64, settings.activity_cache_seconds)
+
+
+def _active_connection_key() -> int:
+    return _active_connection_id or 0
+
+
+# Admission cost class per endpoint; endpoints not listed here are "cheap"
+COST_CLASSES: Dict[str, str] = {
+    "read_table": "scan",
+    "column_profile": "scan",
+    "sample_table": "scan",
+    "search_rows": "scan",
+    "bulk_rows": "bulk",
+    "create_search_indexes": "bulk",
+    "export_table": "bulk",
+    "audit_log": "scan",
+    "fanout_query": "scan",
+    "diff_table": "bulk",
+    "copy_table": "bulk",
+    "table_maintenance": "bulk",
+}
+db_admission = admission_guard(COST_CLASSES, connection_key=_active_connection_key, admin_only=True)
+
+router = APIRouter(
+    prefix="/admin/db",
+    tags=["db-admin"],
+    # the session pin comes before admission, whose user lookup uses get_db
+    dependencies=[Depends(tenant_scope), Depends(pin_request_sessions), Depends(db_admission)],
+)
+
 
 async def get_active_engine() -> AsyncEngine:
     """Return engine for active connection or default app engine.
 
     For now, admin DB UI can switch between process-local connections.
     """
+    db_monitor.ensure_available(_active_connection_key())
     if _active_connection_id is None:
         return default_engine
     conn = _connections.get(_active_connection_id)
@@ -40,13 +108,96 @@ async def get_active_engine() -> AsyncEngine:
     return conn.engine
 
 
+async def run_active_read(fn: Callable[[AsyncEngine], Awaitable[T]], response: Response) -> T:
+    """Run a read-only query function against the active connection.
+
+    Reads of the default app database go to the streaming replica when one is
+    configured and healthy; the serving node is reported in X-DB-Node.
+    """
+    db_monitor.ensure_available(_active_connection_key())
+    conn = _connections.get(_active_connection_id) if _active_connection_id is not None else None
+    if conn is None:
+        result, node = await run_read(fn, default_engine)
+    else:
+        result, node = await fn(conn.engine), "primary"
+    response.headers[NODE_HEADER] = node
+    return result
+
+
+async def active_read_engine() -> Tuple[AsyncEngine, str]:
+    """(engine, node) for streaming reads that cannot be retried on failure."""
+    db_monitor.ensure_available(_active_connection_key())
+    conn = _connections.get(_active_connection_id) if _active_connection_id is not None else None
+    if conn is None:
+        return await get_read_engine(default_engine)
+    return conn.engine, "primary"
+
+
+def ensure_writable() -> None:
+    """Reject data-modifying operations on a connection registered as read-only."""
+    if _active_connection_id is None:
+        return
+    conn = _connections.get(_active_connection_id)
+    if conn is not None and conn.read_only:
+        raise HTTPException(status_code=409, detail="Active connection is read-only")
+
+
+def _int_field(payload: Dict[str, Any], name: str, default: int) -> int:
+    """Integer field of a request body, `default` when absent; 400 when not an integer."""
+    value = payload.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, (int, str)) or isinstance(value, bool):
+        raise HTTPException(status_code=400, detail=f"'{name}' must be an integer")
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be an integer") from exc
+
+
+def invalidate_table_caches(conn_key: int, schema: str, table: str) -> None:
+    """Drop cached data of a table after this module changed it."""
+    label_cache.invalidate((conn_key, schema, table))
+    page_cache.invalidate((conn_key, schema, table))
+
+
+async def record_audit(
+    current_user: Any,
+    action: str,
+    schema: str,
+    table: str,
+    key: Any = None,
+    before: Any = None,
+    after: Any = None,
+) -> None:
+    """Queue an audit event for a change made on the active connection."""
+    conn = _connections.get(_active_connection_id) if _active_connection_id is not None else None
+    await audit.record(
+        current_user.email,
+        _active_connection_key(),
+        conn.name if conn is not None else None,
+        action,
+        schema,
+        table,
+        key=key,
+        before=before,
+        after=after,
+    )
+
+
 @router.get("/connections")
 async def list_connections(current_user=Depends(get_current_user)):
     """List available DB connections (process-local).
 
-    Connection id=0 represents the default application database.
+    Connection id=0 represents the default application database. "health"
+    carries the monitor's breaker state, latency and recent ping history.
     """
     ensure_is_admin(current_user)
+
+    def _health(conn_id: int) -> Optional[Dict[str, Any]]:
+        health = db_monitor.get_health(conn_id)
+        return health.to_dict() if health is not None else None
+
     items = [
         {
             "id": 0,
@@ -54,6 +205,7 @@ async def list_connections(current_user=Depends(get_current_user)):
             "dsn": "<app default>",
             "read_only": False,
             "active": _active_connection_id is None,
+            "health": _health(0),
         }
     ]
     for conn_id, conn in _connections.items():
@@ -64,6 +216,7 @@ async def list_connections(current_user=Depends(get_current_user)):
                 "dsn": conn.dsn,
                 "read_only": conn.read_only,
                 "active": _active_connection_id == conn_id,
+                "health": _health(conn_id),
             }
         )
     return items
@@ -108,10 +261,12 @@ async def create_connection(payload: Dict[str, Any], current_user=Depends(get_cu
 
     # create engine but do not test here (recommend using /connections/test first)
     new_engine = create_async_engine(dsn, echo=False, future=True)
+    install_search_path(new_engine)
     conn_id = _next_conn_id
     _next_conn_id += 1
 
     _connections[conn_id] = DbConnection(conn_id, str(name), dsn, read_only, new_engine)
+    db_monitor.register(conn_id, new_engine)
     return {
         "id": conn_id,
         "name": name,
@@ -121,42 +276,56 @@ async def create_connection(payload: Dict[str, Any], current_user=Depends(get_cu
 
 
 @router.post("/connections/{conn_id}/activate")
-async def activate_connection(conn_id: int, current_user=Depends(get_current_user)):
+async def activate_connection(
+    conn_id: int,
+    force: bool = Query(False, description="Activate even if the database is marked unavailable"),
+    current_user=Depends(get_current_user),
+):
     """Activate given connection id, or 0 to use default app DB."""
     global _active_connection_id
     ensure_is_admin(current_user)
+    if conn_id != 0 and conn_id not in _connections:
+        raise HTTPException(status_code=404, detail="Connection not found")
+    if not force:
+        db_monitor.ensure_available(conn_id)
     if conn_id == 0:
         _active_connection_id = None
         return {"active": 0}
-    if conn_id not in _connections:
-        raise HTTPException(status_code=404, detail="Connection not found")
     _active_connection_id = conn_id
     return {"active": conn_id}
 
 
 @router.get("/tables")
 async def list_tables(
+    response: Response,
     current_user=Depends(get_current_user),
 ):
     """Return list of user tables in the current database.
 
+    With tenancy enabled only the tables of the tenant's schema are listed.
     Only for authenticated admins.
     """
     ensure_is_admin(current_user)
-    engine = await get_active_engine()
+    tenant = current_tenant_schema.get()
+    tenant_filter = "AND table_schema = :tenant" if tenant else ""
     # Works for PostgreSQL; filters out internal schemas
     q = text(
-        """
+        f"""
         SELECT table_schema, table_name
         FROM information_schema.tables
         WHERE table_type = 'BASE TABLE'
           AND table_schema NOT IN ('pg_catalog', 'information_schema')
+          {tenant_filter}
         ORDER BY table_schema, table_name
         """
     )
-    async with AsyncSession(engine) as session:
-        result = await session.execute(q)
-        rows = result.mappings().all()
+
+    async def _fetch(engine: AsyncEngine):
+        async with request_session(engine) as session:
+            result = await session.execute(q, {"tenant": tenant} if tenant else {})
+            return result.mappings().all()
+
+    rows = await run_active_read(_fetch, response)
     return [
         {
             "schema": row["table_schema"],
@@ -167,6 +336,49 @@ async def list_tables(
     ]
 
 
+@router.get("/schema")
+async def schema_snapshot(
+    response: Response,
+    current_user=Depends(get_current_user),
+):
+    """Return every table with columns, keys, indexes and foreign keys in one response.
+
+    The "version" is a content hash; pass it to /schema/delta to fetch only changes.
+    """
+    ensure_is_admin(current_user)
+    cache = get_schema_cache(_active_connection_key(), current_tenant_schema.get())
+
+    async def _refresh(engine: AsyncEngine) -> None:
+        async with request_session(engine) as session:
+            await cache.refresh(await session.connection())
+
+    await run_active_read(_refresh, response)
+    response.headers["ETag"] = f'"{cache.version}"'
+    return cache.snapshot()
+
+
+@router.get("/schema/delta")
+async def schema_delta(
+    response: Response,
+    since: str = Query(..., min_length=1),
+    current_user=Depends(get_current_user),
+):
+    """Return tables changed or removed since the given schema version.
+
+    If the version is unknown (too old or the server restarted) the full
+    snapshot is returned with "full": true.
+    """
+    ensure_is_admin(current_user)
+    cache = get_schema_cache(_active_connection_key(), current_tenant_schema.get())
+
+    async def _refresh(engine: AsyncEngine) -> None:
+        async with request_session(engine) as session:
+            await cache.refresh(await session.connection())
+
+    await run_active_read(_refresh, response)
+    return cache.delta(since)
+
+
 @router.post("/tables")
 async def create_table(
     payload: Dict[str, Any],
@@ -186,7 +398,10 @@ async def create_table(
     }
     """
     ensure_is_admin(current_user)
-    schema = (payload.get("schema") or "public").strip()
+    tenant = current_tenant_schema.get()
+    schema = (payload.get("schema") or tenant or "public").strip()
+    if tenant and schema != tenant:
+        raise HTTPException(status_code=403, detail="Schema is outside of the tenant")
     name = (payload.get("name") or "").strip()
     columns_def = payload.get("columns") or []
 
@@ -263,7 +478,7 @@ async def create_table(
 
     create_sql = text(f"CREATE TABLE {identifier} ({cols_sql})")
 
-    async with AsyncSession(engine) as session:
+    async with request_session(engine) as session:
         try:
             await session.execute(create_sql)
             await session.commit()
@@ -271,6 +486,7 @@ async def create_table(
             # Most likely table already exists or invalid definition
             raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    await record_audit(current_user, "create_table", schema, name, after={"columns": columns_def})
     return {"ok": True}
 
 
@@ -300,13 +516,15 @@ async def drop_table(
     engine = await get_active_engine()
     drop_sql = text(f"DROP TABLE IF EXISTS {identifier} CASCADE")
 
-    async with AsyncSession(engine) as session:
+    async with request_session(engine) as session:
         try:
             await session.execute(drop_sql)
             await session.commit()
         except Exception as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    invalidate_table_caches(_active_connection_key(), schema, table)
+    await record_audit(current_user, "drop_table", schema, table)
     return {"ok": True}
 
 
@@ -314,135 +532,363 @@ async def drop_table(
 async def read_table(
     schema: str,
     table: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return; default all"),
+    preview: Optional[int] = Query(None, ge=16, le=100_000, description="Truncate large values to this length"),
+    labels: bool = Query(False, description="Resolve foreign key values to labels of the referenced rows"),
     current_user=Depends(get_current_user),
 ):
     """Return rows of the given table with simple pagination.
 
+    With "columns" only those columns (plus the primary key) are returned;
+    with "preview" large text/json/bytea values are cut to that length and
+    their full size is reported per row in "_truncated" (fetch the full value
+    via /cell). With "labels" every row gets "_refs": {fk column: label of the
+    referenced row}, resolved with one query per referenced table.
     Only for authenticated admins.
     """
     ensure_is_admin(current_user)
 
     identifier = f'"{schema}"."{table}"'
-    engine = await get_active_engine()
+    projection = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    conn_key = _active_connection_key()
+
+    async def _read(engine: AsyncEngine) -> Dict[str, Any]:
+        async with request_session(engine) as session:
+            # Fetch total count
+            count_q = text(f"SELECT COUNT(*) AS cnt FROM {identifier}")
+            try:
+                count_result = await session.execute(count_q)
+            except Exception as exc:  # table might not exist, etc.
+                if is_connection_error(exc):
+                    raise
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            total = int(count_result.scalar_one())
+
+            select_sql = "*"
+            sizes: Dict[str, Tuple[str, str]] = {}
+            if projection is not None or preview:
+                conn = await session.connection()
+                types = await column_types(conn, schema, table)
+                pk_columns = await fetch_primary_key(conn, schema, table)
+                try:
+                    select_sql, sizes = build_select_list(types, projection, preview, pk_columns)
+                except ValueError as exc:
+                    raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+            # Fetch page of data
+            data_q = text(f"SELECT {select_sql} FROM {identifier} OFFSET :offset LIMIT :limit")
+            params: Dict[str, Any] = {"offset": offset, "limit": limit}
+            if sizes:
+                params["preview"] = preview
+            data_result = await session.execute(data_q, params)
+            rows = [dict(r) for r in data_result.mappings().all()]
+            if sizes:
+                rows = [attach_sizes(row, sizes, preview) for row in rows]
+            if labels and rows:
+                await resolve_labels(await session.connection(), conn_key, schema, table, rows)
+        return {"total": total, "rows": rows}
+
+    if not settings.table_cache_enabled:
+        return await run_active_read(_read, response)
+
+    async def _load() -> Tuple[Dict[str, Any], str]:
+        # runs in a task shared by coalesced requests, so it gets its own response
+        load_response = Response()
+        result = await run_active_read(_read, load_response)
+        return result, load_response.headers[NODE_HEADER]
+
+    shape = (tuple(projection) if projection is not None else None, preview, labels, offset, limit)
+    (result, node), outcome = await page_cache.get_or_load((conn_key, schema, table), shape, _load)
+    response.headers[NODE_HEADER] = node
+    response.headers[CACHE_HEADER] = outcome
+    return result
+
+
+@router.get("/table/{schema}/{table}/sample")
+async def sample_table(
+    schema: str,
+    table: str,
+    response: Response,
+    rows: int = Query(50, ge=1, le=500),
+    method: str = Query("system", description="system (page-level, cheapest) or bernoulli (row-level)"),
+    seed: Optional[int] = Query(None, ge=0, le=2**31 - 1, description="Repeat an earlier sample"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return; default all"),
+    preview: Optional[int] = Query(None, ge=16, le=100_000, description="Truncate large values to this length"),
+    labels: bool = Query(False, description="Resolve foreign key values to labels of the referenced rows"),
+    current_user=Depends(get_current_user),
+):
+    """Return a random sample of about "rows" rows via TABLESAMPLE.
 
-    async with AsyncSession(engine) as session:
-        # Fetch total count
-        count_q = text(f"SELECT COUNT(*) AS cnt FROM {identifier}")
-        try:
-            count_result = await session.execute(count_q)
-        except Exception as exc:  # table might not exist, etc.
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
-        total = int(count_result.scalar_one())
+    The sampling percentage follows from the estimated row count, so only a
+    small fraction of a big table is read. The response carries the "seed";
+    passing it again returns the same rows while the table is unchanged.
+    "columns", "preview" and "labels" work as in read_table.
+    """
+    ensure_is_admin(current_user)
+    if method not in table_sample.METHODS:
+        raise HTTPException(status_code=400, detail=f"'method' must be one of: {', '.join(table_sample.METHODS)}")
+    try:
+        identifier = table_identifier(schema, table)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    projection = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    seed = seed if seed is not None else random.randint(0, 2**31 - 1)
+    conn_key = _active_connection_key()
+
+    async def _sample(engine: AsyncEngine) -> Dict[str, Any]:
+        async with request_session(engine) as session:
+            size = (await session.execute(table_sample.SIZE_Q, {"schema": schema, "table": table})).mappings().one()
+            if not size["found"]:
+                raise HTTPException(status_code=404, detail=f"Table {schema}.{table} not found")
+            estimated, source = table_sample.estimate_rows(
+                size["known_rows"], size["known_pages"], size["unknown_pages"]
+            )
+
+            select_sql = "*"
+            sizes: Dict[str, Tuple[str, str]] = {}
+            params: Dict[str, Any] = {}
+            if projection is not None or preview:
+                conn = await session.connection()
+                types = await column_types(conn, schema, table)
+                pk_columns = await fetch_primary_key(conn, schema, table)
+                try:
+                    select_sql, sizes = build_select_list(types, projection, preview, pk_columns)
+                except ValueError as exc:
+                    raise HTTPException(status_code=400, detail=str(exc)) from exc
+            if sizes:
+                params["preview"] = preview
+
+            try:
+                found, info = await table_sample.sample_rows(
+                    session, identifier, select_sql, params, rows, method, seed, estimated
+                )
+            except Exception as exc:  # e.g. a view, which cannot be sampled
+                if is_connection_error(exc):
+                    raise
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            if sizes:
+                found = [attach_sizes(row, sizes, preview) for row in found]
+            if labels and found:
+                await resolve_labels(await session.connection(), conn_key, schema, table, found)
+        return {
+            "rows": found,
+            "sample": {**info, "estimated_rows": round(estimated), "estimate_source": source},
+        }
 
-        # Fetch page of data
-        data_q = text(f"SELECT * FROM {identifier} OFFSET :offset LIMIT :limit")
-        data_result = await session.execute(data_q, {"offset": offset, "limit": limit})
-        rows = [dict(r) for r in data_result.mappings().all()]
+    return await run_active_read(_sample, response)
 
-    return {"total": total, "rows": rows}
+
+@router.get("/table/{schema}/{table}/cell")
+async def read_cell(
+    schema: str,
+    table: str,
+    response: Response,
+    column: str = Query(..., min_length=1),
+    key: str = Query(..., description='Row key as JSON object, e.g. {"id": 5}'),
+    current_user=Depends(get_current_user),
+):
+    """Return the full value of one cell, addressed by column and row key.
+
+    Binary values are returned base64-encoded ("encoding": "base64").
+    """
+    ensure_is_admin(current_user)
+    try:
+        key_values = json.loads(key)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="'key' must be a JSON object") from exc
+    if not isinstance(key_values, dict) or not key_values:
+        raise HTTPException(status_code=400, detail="'key' must be a non-empty object")
+    try:
+        identifier = table_identifier(schema, table)
+        col = quote_ident(column)
+        where_parts = [f"{quote_ident(k)} = :key_{i}" for i, k in enumerate(key_values)]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    params = {f"key_{i}": v for i, v in enumerate(key_values.values())}
+    q = text(f"SELECT {col} FROM {identifier} WHERE {' AND '.join(where_parts)} LIMIT 2")
+
+    async def _fetch(engine: AsyncEngine):
+        async with request_session(engine) as session:
+            try:
+                result = await session.execute(q, params)
+            except Exception as exc:
+                if is_connection_error(exc):
+                    raise
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            return result.fetchall()
+
+    rows = await run_active_read(_fetch, response)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Row not found")
+    if len(rows) > 1:
+        raise HTTPException(status_code=409, detail="Row not uniquely identified by key")
+    return {"column": column, **encode_cell(rows[0][0])}
 
 
 @router.get("/table/{schema}/{table}/meta")
 async def table_meta(
     schema: str,
     table: str,
+    response: Response,
     current_user=Depends(get_current_user),
 ):
-    """Return basic metadata for the given table (columns, PK, uniques)."""
+    """Return basic metadata for the given table (columns, PK, uniques, foreign keys)."""
     ensure_is_admin(current_user)
-    engine = await get_active_engine()
 
-    # Columns
-    cols_q = text(
-        """
+    # Columns, primary key, unique constraints and foreign keys in one round trip
+    meta_q = text(
+        f"""
         SELECT
-          c.column_name,
-          c.data_type,
-          c.is_nullable = 'YES' AS is_nullable,
-          c.column_default       AS column_default
-        FROM information_schema.columns c
-        WHERE c.table_schema = :schema
-          AND c.table_name   = :table
-        ORDER BY c.ordinal_position
+          (SELECT coalesce(json_agg(json_build_object(
+                    'column_name', c.column_name,
+                    'data_type', c.data_type,
+                    'is_nullable', c.is_nullable = 'YES',
+                    'column_default', c.column_default
+                  ) ORDER BY c.ordinal_position), '[]')
+           FROM information_schema.columns c
+           WHERE c.table_schema = :schema
+             AND c.table_name   = :table) AS columns,
+          (SELECT coalesce(json_agg(kcu.column_name ORDER BY kcu.ordinal_position), '[]')
+           FROM information_schema.table_constraints tc
+           JOIN information_schema.key_column_usage kcu
+             ON tc.constraint_name = kcu.constraint_name
+            AND tc.table_schema    = kcu.table_schema
+           WHERE tc.table_schema = :schema
+             AND tc.table_name   = :table
+             AND tc.constraint_type = 'PRIMARY KEY') AS primary_key,
+          (SELECT coalesce(json_agg(json_build_array(tc.constraint_name, kcu.column_name)
+                    ORDER BY tc.constraint_name, kcu.ordinal_position), '[]')
+           FROM information_schema.table_constraints tc
+           JOIN information_schema.key_column_usage kcu
+             ON tc.constraint_name = kcu.constraint_name
+            AND tc.table_schema    = kcu.table_schema
+           WHERE tc.table_schema = :schema
+             AND tc.table_name   = :table
+             AND tc.constraint_type = 'UNIQUE') AS uniques,
+          (SELECT coalesce(json_agg(fk), '[]') FROM ({FOREIGN_KEYS_SQL}) fk) AS foreign_keys
         """
-    )
-    async with AsyncSession(engine) as session:
-        cols_res = await session.execute(cols_q, {"schema": schema, "table": table})
-    columns: List[Dict[str, Any]] = []
-    for row in cols_res.mappings().all():
-        columns.append(
-            {
-                "name": row["column_name"],
-                "data_type": row["data_type"],
-                "is_nullable": bool(row["is_nullable"]),
-                "has_default": row["column_default"] is not None,
-                "default": row["column_default"],
-                "is_primary_key": False,  # filled below
-                "is_unique": False,       # filled below
-            }
-        )
+    ).columns(columns=JSON, primary_key=JSON, uniques=JSON, foreign_keys=JSON)
+
+    async def _load(engine: AsyncEngine) -> Dict[str, Any]:
+        async with request_session(engine) as session:
+            meta = (await session.execute(meta_q, {"schema": schema, "table": table})).mappings().one()
+        columns: List[Dict[str, Any]] = []
+        for row in meta["columns"]:
+            columns.append(
+                {
+                    "name": row["column_name"],
+                    "data_type": row["data_type"],
+                    "is_nullable": bool(row["is_nullable"]),
+                    "has_default": row["column_default"] is not None,
+                    "default": row["column_default"],
+                    "is_primary_key": False,  # filled below
+                    "is_unique": False,       # filled below
+                }
+            )
+        pk_columns: List[str] = meta["primary_key"]
+        unique_indexes: Dict[str, List[str]] = {}
+        for cname, col in meta["uniques"]:
+            unique_indexes.setdefault(cname, []).append(col)
+
+        # Mark PK / unique flags on columns
+        pk_set = set(pk_columns)
+        uniq_cols = set(col for cols in unique_indexes.values() for col in cols)
+        for col in columns:
+            if col["name"] in pk_set:
+                col["is_primary_key"] = True
+            if col["name"] in uniq_cols:
+                col["is_unique"] = True
+
+        return {
+            "schema": schema,
+            "name": table,
+            "primary_key": pk_columns,
+            "unique_indexes": [
+                {"name": name, "columns": cols} for name, cols in unique_indexes.items()
+            ],
+            "foreign_keys": [
+                {
+                    "name": fk["name"],
+                    "columns": fk["columns"],
+                    "ref_schema": fk["ref_schema"],
+                    "ref_table": fk["ref_table"],
+                    "ref_columns": fk["ref_columns"],
+                    "label_column": pick_label_column(fk["ref_text_columns"]),
+                }
+                for fk in meta["foreign_keys"]
+            ],
+            "columns": columns,
+        }
 
-    # Primary key
-    pk_q = text(
-        """
-        SELECT
-          kcu.column_name
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu
-          ON tc.constraint_name = kcu.constraint_name
-         AND tc.table_schema    = kcu.table_schema
-        WHERE tc.table_schema = :schema
-          AND tc.table_name   = :table
-          AND tc.constraint_type = 'PRIMARY KEY'
-        ORDER BY kcu.ordinal_position
-        """
-    )
-    async with AsyncSession(engine) as session:
-        pk_res = await session.execute(pk_q, {"schema": schema, "table": table})
-    pk_columns = [r[0] for r in pk_res.fetchall()]
+    return await run_active_read(_load, response)
 
-    # Unique constraints
-    uniq_q = text(
-        """
-        SELECT
-          tc.constraint_name,
-          kcu.column_name
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu
-          ON tc.constraint_name = kcu.constraint_name
-         AND tc.table_schema    = kcu.table_schema
-        WHERE tc.table_schema = :schema
-          AND tc.table_name   = :table
-          AND tc.constraint_type = 'UNIQUE'
-        ORDER BY tc.constraint_name, kcu.ordinal_position
-        """
-    )
-    async with AsyncSession(engine) as session:
-        uniq_res = await session.execute(uniq_q, {"schema": schema, "table": table})
-    unique_indexes: Dict[str, List[str]] = {}
-    for cname, col in uniq_res.fetchall():
-        unique_indexes.setdefault(cname, []).append(col)
-
-    # Mark PK / unique flags on columns
-    pk_set = set(pk_columns)
-    uniq_cols = set(col for cols in unique_indexes.values() for col in cols)
-    for col in columns:
-        if col["name"] in pk_set:
-            col["is_primary_key"] = True
-        if col["name"] in uniq_cols:
-            col["is_unique"] = True
 
-    return {
-        "schema": schema,
-        "name": table,
-        "primary_key": pk_columns,
-        "unique_indexes": [
-            {"name": name, "columns": cols} for name, cols in unique_indexes.items()
-        ],
-        "columns": columns,
-    }
+@router.get("/table/{schema}/{table}/stats")
+async def column_profile(
+    schema: str,
+    table: str,
+    response: Response,
+    columns: Optional[str] = Query(None, description="Comma-separated columns to profile (default: all)"),
+    analyze: bool = Query(False, description="Run ANALYZE on the table (these columns) first"),
+    current_user=Depends(get_current_user),
+):
+    """Value distribution per column from pg_stats, without scanning the table.
+
+    Per column: null fraction, distinct estimate, most common values with
+    frequencies (and estimated row counts), histogram bounds. Columns that
+    were never analyzed have "analyzed": false. With "analyze" the statistics
+    are refreshed on the primary first.
+    """
+    ensure_is_admin(current_user)
+    wanted = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    try:
+        identifier = table_identifier(schema, table)
+        column_list = f" ({', '.join(quote_ident(c) for c in wanted)})" if wanted else ""
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    params = {"schema": schema, "table": table}
+
+    async def _load(engine: AsyncEngine) -> Dict[str, Any]:
+        async with request_session(engine) as session:
+            rel = (await session.execute(column_stats.TABLE_Q, params)).mappings().first()
+            if rel is None:
+                raise HTTPException(status_code=404, detail=f"Table {schema}.{table} not found")
+            rows = (await session.execute(column_stats.COLUMNS_Q, params)).mappings().all()
+        by_name = {r["name"]: r for r in rows}
+        unknown = [c for c in wanted or [] if c not in by_name]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown column(s): {', '.join(unknown)}")
+        reltuples = rel["reltuples"]
+        return {
+            "schema": schema,
+            "table": table,
+            "estimated_rows": int(reltuples) if reltuples is not None and reltuples >= 0 else None,
+            "last_analyzed": rel["last_analyzed"],
+            "modified_since_analyze": rel["modified_since_analyze"],
+            "columns": [
+                column_stats.column_profile(by_name[name], reltuples) for name in (wanted or list(by_name))
+            ],
+        }
+
+    if not analyze:
+        return await run_active_read(_load, response)
+
+    # ANALYZE writes pg_statistic: primary only, and read the fresh numbers from there
+    ensure_writable()
+    engine = await get_active_engine()
+    async with request_session(engine) as session:
+        try:
+            await session.execute(text(f"ANALYZE {identifier}{column_list}"))
+            await session.commit()
+        except Exception as exc:
+            if is_connection_error(exc):
+                raise
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response.headers[NODE_HEADER] = "primary"
+    return await _load(engine)
 
 
 @router.post("/table/{schema}/{table}/rows")
@@ -466,25 +912,31 @@ async def insert_row(
     if not values:
         # Simple case: rely purely on defaults
         q = text(f"INSERT INTO {identifier} DEFAULT VALUES RETURNING *")
-        async with AsyncSession(engine) as session:
+        async with request_session(engine) as session:
             result = await session.execute(q)
             row = result.mappings().first()
             await session.commit()
-        return {"row": dict(row) if row is not None else None}
+        row_dict = dict(row) if row is not None else None
+        invalidate_table_caches(_active_connection_key(), schema, table)
+        await record_audit(current_user, "insert", schema, table, after=row_dict)
+        return {"row": row_dict}
 
     cols = list(values.keys())
     col_names = ", ".join(f'"{c}"' for c in cols)
     col_params = ", ".join(f':{c}' for c in cols)
     q = text(f"INSERT INTO {identifier} ({col_names}) VALUES ({col_params}) RETURNING *")
     try:
-        async with AsyncSession(engine) as session:
+        async with request_session(engine) as session:
             result = await session.execute(q, values)
             row = result.mappings().first()
             await session.commit()
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    return {"row": dict(row) if row is not None else None}
+    row_dict = dict(row) if row is not None else None
+    invalidate_table_caches(_active_connection_key(), schema, table)
+    await record_audit(current_user, "insert", schema, table, after=row_dict)
+    return {"row": row_dict}
 
 
 @router.put("/table/{schema}/{table}/rows")
@@ -526,8 +978,19 @@ async def update_row(
         + " RETURNING *"
     )
 
+    # previous values of the changed columns for the audit trail, locked so
+    # they cannot change between this read and the update
+    before_q = text(
+        "SELECT "
+        + ", ".join(f'"{col}"' for col in values.keys())
+        + f" FROM {identifier} WHERE "
+        + " AND ".join(where_parts)
+        + " FOR UPDATE"
+    )
+
     try:
-        async with AsyncSession(engine) as session:
+        async with request_session(engine) as session:
+            before_rows = (await session.execute(before_q, params)).mappings().all()
             result = await session.execute(q, params)
             rows = result.mappings().all()
             await session.commit()
@@ -536,6 +999,19 @@ async def update_row(
 
     if not rows:
         raise HTTPException(status_code=404, detail="Row not found")
+    invalidate_table_caches(_active_connection_key(), schema, table)
+    # the update is committed even when the key matched several rows, so audit it first
+    before = [dict(r) for r in before_rows]
+    after = [{col: r[col] for col in values.keys() if col in r} for r in rows]
+    await record_audit(
+        current_user,
+        "update",
+        schema,
+        table,
+        key=key,
+        before=before[0] if len(before) == 1 else before,
+        after=after[0] if len(after) == 1 else after,
+    )
     if len(rows) > 1:
         raise HTTPException(status_code=409, detail="Row not uniquely identified by key")
 
@@ -566,18 +1042,804 @@ async def delete_row(
     q = text(
         f"DELETE FROM {identifier} WHERE "
         + " AND ".join(where_parts)
+        + " RETURNING *"
     )
 
     try:
-        async with AsyncSession(engine) as session:
+        async with request_session(engine) as session:
             result = await session.execute(q, params)
-            deleted = result.rowcount or 0
+            deleted_rows = [dict(r) for r in result.mappings().all()]
             await session.commit()
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    deleted = len(deleted_rows)
     if deleted == 0:
         raise HTTPException(status_code=404, detail="Row not found")
+    invalidate_table_caches(_active_connection_key(), schema, table)
+    await record_audit(
+        current_user,
+        "delete",
+        schema,
+        table,
+        key=key,
+        before=deleted_rows[0] if deleted == 1 else deleted_rows,
+    )
     # If deleted > 1, это всё равно действие пользователя; можно предупредить, но не ошибка
 
     return {"deleted": deleted}
+
+
+@router.post("/table/{schema}/{table}/bulk", status_code=202)
+async def bulk_rows(
+    schema: str,
+    table: str,
+    payload: Dict[str, Any],
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Update or delete all rows matching a predicate, in primary-key chunks.
+
+    Body: {
+      "action": "delete" | "update",
+      "where": [{"column": "status", "op": "=", "value": "stale"}, ...],
+      "values": {"col": newValue, ...},   # update only
+      "chunk_size": int?, "throttle_ms": int?, "dry_run": bool?
+    }
+
+    Dry run returns the planner's estimate of matching rows. Otherwise the
+    operation starts as a background job; poll /admin/db/jobs/{id} for progress.
+    """
+    ensure_is_admin(current_user)
+    engine = await get_active_engine()
+    chunk_size = _int_field(payload, "chunk_size", settings.bulk_chunk_size)
+    throttle_ms = _int_field(payload, "throttle_ms", settings.bulk_throttle_ms)
+    if chunk_size < 1 or chunk_size > 1_000_000:
+        raise HTTPException(status_code=400, detail="'chunk_size' must be between 1 and 1000000")
+    if throttle_ms < 0:
+        raise HTTPException(status_code=400, detail="'throttle_ms' must be >= 0")
+
+    try:
+        plan = await prepare_bulk(
+            engine,
+            schema,
+            table,
+            str(payload.get("action") or ""),
+            payload.get("where"),
+            payload.get("values"),
+        )
+        if payload.get("dry_run"):
+            estimated = await estimate_matching_rows(engine, plan.identifier, plan.where_sql, plan.params)
+            return {"dry_run": True, "estimated_rows": estimated, "primary_key": plan.pk_column}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # table might not exist, bad column, etc.
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    ensure_writable()
+    # the "bulk" admission slot stays taken until the job finishes
+    release_slot = ticket.detach()
+
+    conn_key = _active_connection_key()
+
+    async def _runner(job: jobs.Job) -> Dict[str, Any]:
+        try:
+            return await run_bulk(job, engine, plan, chunk_size, throttle_ms / 1000.0)
+        finally:
+            invalidate_table_caches(conn_key, schema, table)
+            await release_slot()
+
+    job = jobs.start_job(
+        f"bulk_{plan.action}",
+        current_user.email,
+        {"schema": schema, "table": table, "where": payload.get("where"), "chunk_size": chunk_size},
+        _runner,
+    )
+    return job.to_dict()
+
+
+@router.get("/jobs")
+async def list_jobs(current_user=Depends(get_current_user)):
+    """List background jobs (bulk operations etc.) of this process."""
+    ensure_is_admin(current_user)
+    return [job.to_dict() for job in jobs.list_jobs()]
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int, current_user=Depends(get_current_user)):
+    """Return status and progress of a background job."""
+    ensure_is_admin(current_user)
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: int, current_user=Depends(get_current_user)):
+    """Cancel a running job; work committed so far is kept."""
+    ensure_is_admin(current_user)
+    if jobs.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not jobs.cancel_job(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return {"cancelled": job_id}
+
+
+@router.post("/table/{schema}/{table}/feed")
+async def enable_change_feed(
+    schema: str,
+    table: str,
+    current_user=Depends(get_current_user),
+):
+    """Install the change-feed trigger (pg_notify on insert/update/delete) on a table."""
+    ensure_is_admin(current_user)
+    ensure_writable()
+    engine = await get_active_engine()
+    try:
+        key_columns = await change_feed.install_trigger(engine, schema, table)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"enabled": True, "key": key_columns}
+
+
+@router.delete("/table/{schema}/{table}/feed")
+async def disable_change_feed(
+    schema: str,
+    table: str,
+    current_user=Depends(get_current_user),
+):
+    """Remove the change-feed trigger from a table."""
+    ensure_is_admin(current_user)
+    ensure_writable()
+    engine = await get_active_engine()
+    try:
+        await change_feed.uninstall_trigger(engine, schema, table)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"enabled": False}
+
+
+@router.get("/table/{schema}/{table}/feed/events")
+async def change_feed_events(
+    schema: str,
+    table: str,
+    request: Request,
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Server-Sent Events stream of row changes of a table.
+
+    Each event is a batch: {"type": "changes", "changes": [{"op", "key", "row"?}, ...]}.
+    A {"type": "reset"} event means the client missed changes and should reload
+    the page. Requires the feed to be enabled for the table.
+    """
+    ensure_is_admin(current_user)
+    # a long-lived stream must not hold an admission slot
+    release_slot = ticket.detach()
+    await release_slot()
+    engine = await get_active_engine()
+    try:
+        installed = await change_feed.trigger_installed(engine, schema, table)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not installed:
+        raise HTTPException(status_code=409, detail="Change feed is not enabled for this table")
+
+    hub = change_feed.get_hub(
+        _active_connection_key(), engine, settings.change_feed_debounce_ms / 1000.0
+    )
+    try:
+        sub = await hub.subscribe(schema, table)
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"Cannot start LISTEN: {exc}") from exc
+
+    async def _events():
+        try:
+            yield "retry: 3000\n\n"
+            # a closed subscription ends the stream once its last reset is sent
+            while not (sub.closed and sub.queue.empty()) and not await request.is_disconnected():
+                try:
+                    batch = await asyncio.wait_for(sub.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # keep proxies from closing an idle stream
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {json.dumps(jsonable_encoder(batch))}\n\n"
+        finally:
+            await hub.unsubscribe(sub)
+
+    await release_request_sessions()
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/table/{schema}/{table}/search")
+async def search_rows(
+    schema: str,
+    table: str,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=500),
+    columns: Optional[str] = Query(None, description="Comma-separated text columns; default all"),
+    current_user=Depends(get_current_user),
+):
+    """Search text columns of a table.
+
+    Uses pg_trgm / full-text indexes when present (ranked by "_score"); otherwise
+    scans a bounded number of rows with ILIKE and sets "partial": true.
+    """
+    ensure_is_admin(current_user)
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+    async def _search(engine: AsyncEngine) -> Dict[str, Any]:
+        return await search_table(
+            engine,
+            schema,
+            table,
+            q,
+            limit,
+            column_list,
+            settings.search_scan_budget_rows,
+            settings.search_timeout_ms,
+        )
+
+    try:
+        return await run_active_read(_search, response)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        if is_connection_error(exc):
+            raise
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.post("/table/{schema}/{table}/search/index", status_code=202)
+async def create_search_indexes(
+    schema: str,
+    table: str,
+    payload: Dict[str, Any],
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Create search indexes in the background (CREATE INDEX CONCURRENTLY).
+
+    Body: {"columns": ["title", ...], "kind": "trgm" | "fts"}
+    """
+    ensure_is_admin(current_user)
+    ensure_writable()
+    columns = payload.get("columns")
+    kind = payload.get("kind") or "trgm"
+    if not isinstance(columns, list) or not columns or not all(isinstance(c, str) for c in columns):
+        raise HTTPException(status_code=400, detail="'columns' must be a non-empty array of column names")
+    if kind not in ("trgm", "fts"):
+        raise HTTPException(status_code=400, detail="'kind' must be 'trgm' or 'fts'")
+    engine = await get_active_engine()
+    release_slot = ticket.detach()
+
+    async def _runner(job: jobs.Job) -> Dict[str, Any]:
+        try:
+            return await create_search_index(job, engine, schema, table, columns, kind)
+        finally:
+            await release_slot()
+
+    job = jobs.start_job(
+        "search_index",
+        current_user.email,
+        {"schema": schema, "table": table, "columns": columns, "kind": kind},
+        _runner,
+    )
+    return job.to_dict()
+
+
+@router.post("/table/{schema}/{table}/maintenance", status_code=202)
+async def table_maintenance(
+    schema: str,
+    table: str,
+    payload: Dict[str, Any],
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Run VACUUM (ANALYZE), ANALYZE or REINDEX CONCURRENTLY in the background.
+
+    Body: {"operation": "vacuum" | "analyze" | "reindex"}
+
+    Progress (phase, blocks done/total, percent) comes from pg_stat_progress_*;
+    cancelling the job cancels the backend.
+    """
+    ensure_is_admin(current_user)
+    ensure_writable()
+    operation = payload.get("operation")
+    if operation not in maintenance.OPERATIONS:
+        raise HTTPException(
+            status_code=400, detail=f"'operation' must be one of: {', '.join(maintenance.OPERATIONS)}"
+        )
+    try:
+        table_identifier(schema, table)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    engine = await get_active_engine()
+    conn_key = _active_connection_key()
+    if not maintenance.try_reserve(conn_key, settings.maintenance_max_per_database):
+        raise HTTPException(
+            status_code=409,
+            detail=f"{maintenance.running(conn_key)} maintenance operation(s) already running on this database",
+        )
+    release_slot = ticket.detach()
+
+    async def _runner(job: jobs.Job) -> Dict[str, Any]:
+        try:
+            return await maintenance.run_maintenance(
+                job, engine, schema, table, operation, settings.maintenance_progress_interval_seconds
+            )
+        finally:
+            maintenance.release(conn_key)
+            await release_slot()
+
+    job = jobs.start_job(
+        f"maintenance_{operation}",
+        current_user.email,
+        {"schema": schema, "table": table, "operation": operation},
+        _runner,
+    )
+    return job.to_dict()
+
+
+@router.get("/table/{schema}/{table}/export")
+async def export_table(
+    schema: str,
+    table: str,
+    format: str = Query("arrow", pattern="^(arrow|parquet)$"),
+    batch_size: int = Query(10_000, ge=100, le=200_000),
+    columns: Optional[str] = Query(None, description="Comma-separated columns; default all"),
+    where: Optional[str] = Query(None, description='JSON array of filters, e.g. [{"column": "id", "op": ">", "value": 10}]'),
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Stream a table (or a filtered subset) as an Arrow IPC stream or Parquet file.
+
+    Rows are fetched with a server-side cursor and written in record batches of
+    "batch_size" rows, so memory use does not depend on the table size.
+    """
+    ensure_is_admin(current_user)
+    if not arrow_available():
+        raise HTTPException(status_code=501, detail="Export requires the optional 'pyarrow' package")
+    projection = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    try:
+        filters = json.loads(where) if where else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="'where' must be a JSON array") from exc
+
+    engine, node = await active_read_engine()
+    try:
+        plan = await prepare_export(engine, schema, table, projection, filters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    # the stream outlives the handler: keep the "bulk" slot until it ends
+    release_slot = ticket.detach()
+
+    async def _body():
+        try:
+            async for chunk in stream_export(engine, plan, format, batch_size):
+                yield chunk
+        finally:
+            await release_slot()
+
+    media_type, extension = FORMATS[format]
+    await release_request_sessions()
+    return StreamingResponse(
+        _body(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{schema}.{table}.{extension}"',
+            NODE_HEADER: node,
+        },
+    )
+
+
+def _ensure_database_scope() -> None:
+    """Backends belong to the whole database, not to a tenant schema."""
+    if current_tenant_schema.get() is not None:
+        raise HTTPException(status_code=403, detail="Not available within a tenant scope")
+
+
+@router.get("/activity")
+async def database_activity(
+    response: Response,
+    include_idle: bool = Query(False, description="Also list idle sessions that block nobody"),
+    current_user=Depends(get_current_user),
+):
+    """Sessions of the active database with durations, waits and blocking chains.
+
+    Each session has "blocked_by"/"blocking" pids and "flags" (long_transaction,
+    idle_in_transaction, blocked, blocking); "chains" are the who-blocks-whom
+    trees, largest first. Snapshots are reused for activity_cache_seconds, so
+    polling every few seconds is cheap. Refused within a tenant scope.
+    """
+    ensure_is_admin(current_user)
+    _ensure_database_scope()
+    engine = await get_active_engine()
+
+    async def _load() -> List[Dict[str, Any]]:
+        async with engine.connect() as conn:
+            result = await conn.execute(activity.ACTIVITY_Q, {"max_chars": settings.activity_query_max_chars})
+            return [dict(r) for r in result.mappings().all()]
+
+    rows, cache_status = await activity_cache.get_or_load((_active_connection_key(),), "sessions", _load)
+    response.headers[CACHE_HEADER] = cache_status
+    report = activity.build_report(
+        rows,
+        settings.activity_long_transaction_seconds,
+        settings.activity_idle_in_transaction_seconds,
+        include_idle=include_idle,
+    )
+    report["thresholds"] = {
+        "long_transaction_seconds": settings.activity_long_transaction_seconds,
+        "idle_in_transaction_seconds": settings.activity_idle_in_transaction_seconds,
+    }
+    return report
+
+
+@router.post("/activity/{pid}/{action}")
+async def signal_backend(pid: int, action: str, current_user=Depends(get_current_user)):
+    """Cancel the running query of a backend ("cancel") or end its session ("terminate")."""
+    ensure_is_admin(current_user)
+    _ensure_database_scope()
+    ensure_writable()
+    if action not in ("cancel", "terminate"):
+        raise HTTPException(status_code=400, detail="Action must be 'cancel' or 'terminate'")
+    engine = await get_active_engine()
+    try:
+        async with engine.connect() as conn:
+            row = (
+                await conn.execute(activity.SIGNAL_Q, {"pid": pid, "terminate": action == "terminate"})
+            ).mappings().first()
+    except DBAPIError as exc:
+        # e.g. a superuser's backend, or another role's without pg_signal_backend
+        if sqlstate(exc) == INSUFFICIENT_PRIVILEGE:
+            raise HTTPException(status_code=403, detail=f"Not permitted to {action} backend {pid}") from exc
+        raise
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"No backend {pid} on this database")
+    if not row["signalled"]:
+        # the backend exited between the lookup and the signal
+        raise HTTPException(status_code=404, detail=f"Backend {pid} has already exited")
+    activity_cache.invalidate((_active_connection_key(),))
+    await record_audit(
+        current_user,
+        f"{action}_backend",
+        "pg_catalog",
+        "pg_stat_activity",
+        key={"pid": pid},
+        before={"user": row["user"], "state": row["state"], "query": row["query"]},
+    )
+    return {"pid": pid, "action": action, "signalled": True}
+
+
+@router.get("/audit")
+async def audit_log(
+    limit: int = Query(50, ge=1, le=500),
+    before_id: Optional[int] = Query(None, description="Return events older than this id (next page cursor)"),
+    user: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    connection_id: Optional[int] = Query(None),
+    schema: Optional[str] = Query(None),
+    table: Optional[str] = Query(None),
+    current_user=Depends(get_current_user),
+):
+    """Audit trail of data changes, newest first.
+
+    Pages are keyset-based: pass "next_before_id" of a page as "before_id"
+    to get the next one. Events still queued in memory are not visible yet;
+    their number is reported in "writer.queued". Within a tenant scope only
+    the tenant's schema is listed.
+    """
+    ensure_is_admin(current_user)
+    tenant = current_tenant_schema.get()
+    if tenant:
+        if schema and schema != tenant:
+            raise HTTPException(status_code=403, detail="Schema is outside of the tenant")
+        schema = tenant
+    q = select(AuditEvent).order_by(AuditEvent.id.desc()).limit(limit)
+    if before_id is not None:
+        q = q.where(AuditEvent.id < before_id)
+    if user:
+        q = q.where(AuditEvent.user_email == user)
+    if action:
+        q = q.where(AuditEvent.action == action)
+    if connection_id is not None:
+        q = q.where(AuditEvent.connection_id == connection_id)
+    if schema:
+        q = q.where(AuditEvent.schema_name == schema)
+    if table:
+        q = q.where(AuditEvent.table_name == table)
+
+    async with request_session(app_engine) as session:
+        events = (await session.execute(q)).scalars().all()
+
+    items = [
+        {
+            "id": e.id,
+            "at": e.at,
+            "user": e.user_email,
+            "connection_id": e.connection_id,
+            "connection_name": e.connection_name,
+            "action": e.action,
+            "schema": e.schema_name,
+            "table": e.table_name,
+            "key": e.key,
+            "before": e.before,
+            "after": e.after,
+        }
+        for e in events
+    ]
+    return {
+        "items": items,
+        "next_before_id": items[-1]["id"] if len(items) == limit else None,
+        "writer": audit.stats(),
+    }
+
+
+def _registered_engines() -> Dict[int, Tuple[str, AsyncEngine]]:
+    """{connection id: (name, engine)}; id 0 is the app database."""
+    known: Dict[int, Tuple[str, AsyncEngine]] = {0: ("default", default_engine)}
+    known.update({conn_id: (conn.name, conn.engine) for conn_id, conn in _connections.items()})
+    return known
+
+
+def _fanout_targets(ids: Optional[List[int]]) -> List[fanout.Target]:
+    """Targets for the given connection ids (0 is the app database), default all."""
+    known = _registered_engines()
+    if ids is None:
+        ids = list(known)
+    targets: List[fanout.Target] = []
+    for conn_id in ids:
+        if conn_id not in known:
+            raise HTTPException(status_code=400, detail=f"Unknown connection: {conn_id}")
+        name, engine = known[conn_id]
+        health = db_monitor.get_health(conn_id)
+        unavailable = f"Database is unavailable: {health.last_error}" if health and health.state == "open" else None
+        targets.append(fanout.Target(conn_id, name, engine, unavailable))
+    return targets
+
+
+@router.post("/fanout")
+async def fanout_query(
+    payload: Dict[str, Any],
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Run a read-only query or a built-in probe on several connections at once.
+
+    Body: {"probe": "tables" | "sizes" | "row_estimates"} or {"sql": "...", "params": {...}},
+    plus optional "connections": [ids] (default all), "timeout_ms", "max_rows".
+    Streams NDJSON, one line per connection in completion order:
+    {"connection_id", "name", "ok", "rows", "truncated", "error", "elapsed_ms"}.
+    """
+    ensure_is_admin(current_user)
+    tenant = current_tenant_schema.get()
+    probe = payload.get("probe")
+    sql = payload.get("sql")
+    params = payload.get("params") or {}
+    if bool(probe) == bool(sql):
+        raise HTTPException(status_code=400, detail="Exactly one of 'probe' and 'sql' is required")
+    if not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="'params' must be an object")
+    if sql:
+        if tenant:
+            # the search_path is not a security boundary for arbitrary SQL
+            raise HTTPException(status_code=403, detail="Custom SQL is not allowed with tenancy enabled")
+        if not isinstance(sql, str):
+            raise HTTPException(status_code=400, detail="'sql' must be a string")
+    else:
+        try:
+            sql = fanout.probe_sql(str(probe), tenant)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        params = {"tenant": tenant} if tenant else {}
+
+    ids = payload.get("connections")
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        raise HTTPException(status_code=400, detail="'connections' must be an array of connection ids")
+    targets = _fanout_targets(ids)
+    timeout_ms = _int_field(payload, "timeout_ms", settings.fanout_timeout_ms)
+    max_rows = min(_int_field(payload, "max_rows", settings.fanout_max_rows), settings.fanout_max_rows)
+    if timeout_ms <= 0 or max_rows <= 0:
+        raise HTTPException(status_code=400, detail="'timeout_ms' and 'max_rows' must be positive")
+
+    release_slot = ticket.detach()
+
+    async def _lines():
+        try:
+            async for item in fanout.fan_out(targets, sql, params, timeout_ms, max_rows):
+                yield json.dumps(jsonable_encoder(item), default=str) + "\n"
+        finally:
+            await release_slot()
+
+    await release_request_sessions()
+    return StreamingResponse(_lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+@router.post("/table/{schema}/{table}/diff", status_code=202)
+async def diff_table(
+    schema: str,
+    table: str,
+    payload: Dict[str, Any],
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Compare the table with the same table on another connection.
+
+    Body: {
+      "target": connId,                    # 0 is the app database
+      "source": connId?,                   # default: active connection
+      "target_schema": str?, "target_table": str?,
+      "parts": int?, "leaf_rows": int?, "max_keys": int?
+    }
+
+    Runs as a background job; the result lists primary keys found only in
+    the source, only in the target, or with different values.
+    """
+    ensure_is_admin(current_user)
+    source_id = payload.get("source")
+    target_id = payload.get("target")
+    if source_id is None:
+        source_id = _active_connection_key()
+    if not isinstance(source_id, int) or not isinstance(target_id, int):
+        raise HTTPException(status_code=400, detail="'source' and 'target' must be connection ids")
+    target_schema = str(payload.get("target_schema") or schema)
+    target_table = str(payload.get("target_table") or table)
+    tenant = current_tenant_schema.get()
+    if tenant and target_schema != tenant:
+        raise HTTPException(status_code=403, detail="Schema is outside of the tenant")
+    if source_id == target_id and (schema, table) == (target_schema, target_table):
+        raise HTTPException(status_code=400, detail="Source and target are the same table")
+    parts = _int_field(payload, "parts", settings.diff_parts)
+    leaf_rows = _int_field(payload, "leaf_rows", settings.diff_leaf_rows)
+    max_keys = _int_field(payload, "max_keys", settings.diff_max_keys)
+    if not 2 <= parts <= 256:
+        raise HTTPException(status_code=400, detail="'parts' must be between 2 and 256")
+    if leaf_rows < 1 or max_keys < 1:
+        raise HTTPException(status_code=400, detail="'leaf_rows' and 'max_keys' must be positive")
+
+    known = _registered_engines()
+    for conn_id in (source_id, target_id):
+        if conn_id not in known:
+            raise HTTPException(status_code=400, detail=f"Unknown connection: {conn_id}")
+        db_monitor.ensure_available(conn_id)
+    try:
+        plan = await table_diff.prepare_diff(
+            table_diff.DiffSide(source_id, known[source_id][1], schema, table),
+            table_diff.DiffSide(target_id, known[target_id][1], target_schema, target_table),
+        )
+    except Exception as exc:  # table might not exist, columns differ, etc.
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    release_slot = ticket.detach()
+
+    async def _runner(job: jobs.Job) -> Dict[str, Any]:
+        try:
+            return await table_diff.run_diff(job, plan, parts, leaf_rows, max_keys)
+        finally:
+            await release_slot()
+
+    job = jobs.start_job(
+        "diff_table",
+        current_user.email,
+        {
+            "source": {"connection": source_id, "schema": schema, "table": table},
+            "target": {"connection": target_id, "schema": target_schema, "table": target_table},
+            "parts": parts,
+            "leaf_rows": leaf_rows,
+        },
+        _runner,
+    )
+    return job.to_dict()
+
+
+@router.post("/table/{schema}/{table}/copy", status_code=202)
+async def copy_table(
+    schema: str,
+    table: str,
+    payload: Dict[str, Any],
+    current_user=Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(db_admission),
+):
+    """Copy the table to another connection with streaming COPY.
+
+    Body: {
+      "target": connId,                    # 0 is the app database
+      "source": connId?,                   # default: active connection
+      "target_schema": str?, "target_table": str?,
+      "create": bool?,                     # create a missing target from the source columns and PK
+      "truncate": bool?,                   # empty an existing target first
+      "workers": int?,                     # parallel PK ranges (single-column PK)
+      "format": "binary" | "text" | "csv"
+    }
+
+    Runs as a background job; progress reports rows, bytes and throughput.
+    """
+    ensure_is_admin(current_user)
+    source_id = payload.get("source")
+    target_id = payload.get("target")
+    if source_id is None:
+        source_id = _active_connection_key()
+    if not isinstance(source_id, int) or not isinstance(target_id, int):
+        raise HTTPException(status_code=400, detail="'source' and 'target' must be connection ids")
+    target_schema = str(payload.get("target_schema") or schema)
+    target_table = str(payload.get("target_table") or table)
+    tenant = current_tenant_schema.get()
+    if tenant and target_schema != tenant:
+        raise HTTPException(status_code=403, detail="Schema is outside of the tenant")
+    if source_id == target_id and (schema, table) == (target_schema, target_table):
+        raise HTTPException(status_code=400, detail="Source and target are the same table")
+    workers = _int_field(payload, "workers", 1)
+    fmt = str(payload.get("format") or "binary")
+    if not 1 <= workers <= settings.copy_max_workers:
+        raise HTTPException(status_code=400, detail=f"'workers' must be between 1 and {settings.copy_max_workers}")
+    if fmt not in table_copy.FORMATS:
+        raise HTTPException(status_code=400, detail=f"'format' must be one of: {', '.join(table_copy.FORMATS)}")
+
+    known = _registered_engines()
+    for conn_id in (source_id, target_id):
+        if conn_id not in known:
+            raise HTTPException(status_code=400, detail=f"Unknown connection: {conn_id}")
+        db_monitor.ensure_available(conn_id)
+    target_conn = _connections.get(target_id)
+    if target_conn is not None and target_conn.read_only:
+        raise HTTPException(status_code=409, detail="Target connection is read-only")
+    try:
+        plan = await table_copy.prepare_copy(
+            table_copy.CopySide(source_id, known[source_id][1], schema, table),
+            table_copy.CopySide(target_id, known[target_id][1], target_schema, target_table),
+            create=bool(payload.get("create")),
+            workers=workers,
+        )
+    except Exception as exc:  # table might not exist, target lacks columns, etc.
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    release_slot = ticket.detach()
+    truncate = bool(payload.get("truncate"))
+    source_ref = {"connection": source_id, "schema": schema, "table": table}
+
+    async def _runner(job: jobs.Job) -> Dict[str, Any]:
+        try:
+            result = await table_copy.run_copy(job, plan, workers, fmt, truncate, settings.copy_buffer_chunks)
+            await audit.record(
+                current_user.email,
+                target_id,
+                known[target_id][0],
+                "copy_table",
+                target_schema,
+                target_table,
+                after={"source": source_ref, "rows": result["rows"], "truncate": truncate},
+            )
+            return result
+        finally:
+            invalidate_table_caches(target_id, target_schema, target_table)
+            await release_slot()
+
+    job = jobs.start_job(
+        "copy_table",
+        current_user.email,
+        {
+            "source": source_ref,
+            "target": {"connection": target_id, "schema": target_schema, "table": target_table},
+            "workers": workers,
+            "format": fmt,
+        },
+        _runner,
+    )
+    return job.to_dict()
@@ -1,19 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.db import get_db
-from app.core.security import get_current_user
+from app.core.admission import AdmissionTicket, admission_guard
+from app.core.config import get_settings
+from app.core.db import engine, get_db
+from app.core.replica import get_read_db
+from app.core.security import ensure_is_admin, get_current_user
 from app.models.user import User
 from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.services import jobs
+from app.services.user_import import import_users, parse_records
 from app.services.user_service import (
     list_users, get_user, create_user, update_user, delete_user
 )
 
-router = APIRouter(prefix="/admin/users", tags=["users"])
+settings = get_settings()
+
+# Endpoints not listed here are "cheap"
+COST_CLASSES = {"users_list": "scan", "users_import": "bulk"}
+users_admission = admission_guard(COST_CLASSES, admin_only={"users_import", "users_import_status"})
+
+router = APIRouter(
+    prefix="/admin/users",
+    tags=["users"],
+    dependencies=[Depends(users_admission)],
+)
 
 @router.get("/", response_model=list[UserRead])
-async def users_list(db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def users_list(db: AsyncSession = Depends(get_read_db), current: User = Depends(get_current_user)):
     return await list_users(db)
 
+@router.post("/import", status_code=status.HTTP_202_ACCEPTED)
+async def users_import(
+    request: Request,
+    current: User = Depends(get_current_user),
+    ticket: AdmissionTicket = Depends(users_admission),
+):
+    """Import users from a CSV (email,password,full_name), NDJSON or JSON array body.
+
+    Runs as a background job; poll /admin/users/import/{job_id} for the
+    created/skipped/failed counters and throughput.
+    """
+    ensure_is_admin(current)
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.user_import_max_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Import file is too large")
+    try:
+        records = parse_records(bytes(body), request.headers.get("content-type", ""))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    release_slot = ticket.detach()
+
+    async def _runner(job: jobs.Job):
+        try:
+            return await import_users(job, engine, records, settings.user_import_batch_size)
+        finally:
+            await release_slot()
+
+    job = jobs.start_job("user_import", current.email, {"rows": len(records)}, _runner)
+    return job.to_dict()
+
+@router.get("/import/{job_id}")
+async def users_import_status(job_id: int, current: User = Depends(get_current_user)):
+    ensure_is_admin(current)
+    job = jobs.get_job(job_id)
+    if job is None or job.kind != "user_import":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+    return job.to_dict()
+
 @router.get("/{user_id}", response_model=UserRead)
 async def users_get(user_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
     user = await get_user(db, user_id)
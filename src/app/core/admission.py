@@ -0,0 +1,191 @@
+"""Admission control for expensive admin endpoints.
+
+Every endpoint of a guarded router is assigned a cost class:
+
+- "cheap" — catalog/metadata lookups and single-row writes;
+- "scan"  — queries whose cost grows with table size (paging, COUNT(*));
+- "bulk"  — long-running jobs (bulk update/delete, exports).
+
+Each (database connection, cost class) pair has its own concurrency limit,
+and every user may hold only a few non-cheap slots at once. Requests over the
+limit wait in a bounded queue; when the queue is full or the wait times out
+the request is rejected with 429 and a Retry-After estimate.
+"""
+import asyncio
+import math
+import time
+from typing import AbstractSet, Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.core.config import get_settings
+from app.core.security import ensure_is_admin, get_current_user
+
+settings = get_settings()
+
+COST_CLASSES = ("cheap", "scan", "bulk")
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        class_limits: Dict[str, int],
+        per_user_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        self.class_limits = class_limits
+        self.per_user_limit = per_user_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = asyncio.Condition()
+        self._running: Dict[Tuple[Hashable, str], int] = {}
+        self._running_user: Dict[Hashable, int] = {}
+        self._waiting: Dict[Tuple[Hashable, str], int] = {}
+        # moving average of how long a slot is held, per class (seconds)
+        self._hold_avg: Dict[str, float] = {}
+
+    def _can_run(self, cost: str, conn: Hashable, user: Hashable) -> bool:
+        if self._running.get((conn, cost), 0) >= self.class_limits[cost]:
+            return False
+        if cost != "cheap" and self._running_user.get(user, 0) >= self.per_user_limit:
+            return False
+        return True
+
+    def _take(self, cost: str, conn: Hashable, user: Hashable) -> None:
+        self._running[(conn, cost)] = self._running.get((conn, cost), 0) + 1
+        if cost != "cheap":
+            self._running_user[user] = self._running_user.get(user, 0) + 1
+
+    def retry_after(self, cost: str, conn: Hashable) -> int:
+        avg = self._hold_avg.get(cost, 1.0)
+        waiting = self._waiting.get((conn, cost), 0)
+        return max(1, math.ceil(avg * (waiting + 1) / max(1, self.class_limits[cost])))
+
+    async def acquire(self, cost: str, conn: Hashable, user: Hashable) -> None:
+        """Wait for a slot; raises Overloaded when it cannot be granted in time."""
+        if cost not in self.class_limits:
+            raise ValueError(f"Unknown cost class: {cost}")
+        key = (conn, cost)
+        async with self._cond:
+            if self._can_run(cost, conn, user):
+                self._take(cost, conn, user)
+                return
+            if self._waiting.get(key, 0) >= self.max_queue:
+                raise Overloaded(self.retry_after(cost, conn), f"Too many queued '{cost}' requests")
+            self._waiting[key] = self._waiting.get(key, 0) + 1
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._can_run(cost, conn, user)),
+                    timeout=self.queue_timeout,
+                )
+            except asyncio.TimeoutError:
+                raise Overloaded(self.retry_after(cost, conn), f"Timed out waiting for a '{cost}' slot") from None
+            finally:
+                self._waiting[key] -= 1
+            self._take(cost, conn, user)
+
+    async def release(self, cost: str, conn: Hashable, user: Hashable, held_seconds: float) -> None:
+        async with self._cond:
+            self._running[(conn, cost)] -= 1
+            if cost != "cheap":
+                self._running_user[user] -= 1
+            prev = self._hold_avg.get(cost)
+            self._hold_avg[cost] = held_seconds if prev is None else prev * 0.8 + held_seconds * 0.2
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": {f"{conn}:{cost}": n for (conn, cost), n in self._running.items() if n},
+            "waiting": {f"{conn}:{cost}": n for (conn, cost), n in self._waiting.items() if n},
+            "avg_hold_seconds": {cost: round(v, 3) for cost, v in self._hold_avg.items()},
+        }
+
+
+class AdmissionTicket:
+    """A granted slot; released when the request finishes unless detached."""
+
+    def __init__(self, controller: AdmissionController, cost: str, conn: Hashable, user: Hashable):
+        self.controller = controller
+        self.cost = cost
+        self.conn = conn
+        self.user = user
+        self.detached = False
+        self._released = False
+        self._started = time.monotonic()
+
+    def detach(self) -> Callable[[], Any]:
+        """Keep the slot after the response, e.g. for a background job.
+
+        Returns the coroutine function the job must await when it finishes.
+        """
+        self.detached = True
+        return self.release
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        await self.controller.release(self.cost, self.conn, self.user, time.monotonic() - self._started)
+
+
+controller = AdmissionController(
+    class_limits={
+        "cheap": settings.admission_cheap_limit,
+        "scan": settings.admission_scan_limit,
+        "bulk": settings.admission_bulk_limit,
+    },
+    per_user_limit=settings.admission_per_user_limit,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+)
+
+
+def admission_guard(
+    costs: Dict[str, str],
+    connection_key: Optional[Callable[[], Hashable]] = None,
+    default: str = "cheap",
+    admin_only: Union[bool, AbstractSet[str]] = False,
+):
+    """Build a router-level dependency that admits requests by cost class.
+
+    costs maps endpoint function names to cost classes; connection_key returns
+    the id of the database the request will hit. Endpoints that need to keep
+    their slot (background jobs) can declare the same dependency to receive
+    the AdmissionTicket and detach it.
+
+    admin_only (True for every endpoint, or a set of endpoint names) rejects
+    non-admins with 403 before a slot is taken, so they cannot queue up and
+    crowd out admins.
+    """
+    async def _guard(request: Request, current_user=Depends(get_current_user)):
+        route = request.scope.get("route")
+        name = getattr(route, "name", "")
+        if admin_only is True or (admin_only and name in admin_only):
+            ensure_is_admin(current_user)
+        cost = costs.get(name, default)
+        conn = connection_key() if connection_key is not None else 0
+        user = getattr(current_user, "id", None)
+        try:
+            await controller.acquire(cost, conn, user)
+        except Overloaded as exc:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=exc.reason,
+                headers={"Retry-After": str(exc.retry_after)},
+            ) from exc
+        ticket = AdmissionTicket(controller, cost, conn, user)
+        try:
+            yield ticket
+        finally:
+            if not ticket.detached:
+                await ticket.release()
+
+    return _guard
@@ -15,6 +15,89 @@ class Settings(BaseSettings):
     secret_key: str = Field(default="CHANGE_ME_SUPER_SECRET")
     jwt_algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=60)
+    # threads for bcrypt hashing/verification outside the event loop
+    password_hash_workers: int = Field(default=2)
+    # bulk user import: hashing processes (0 = all cores), rows per insert batch, upload limit
+    bulk_hash_processes: int = Field(default=0)
+    user_import_batch_size: int = Field(default=1000)
+    user_import_max_bytes: int = Field(default=50 * 1024 * 1024)
+    # db_admin bulk update/delete: keys per committed chunk and pause between chunks
+    bulk_chunk_size: int = Field(default=5000)
+    bulk_throttle_ms: int = Field(default=50)
+    # read replica of the app database (postgresql+asyncpg DSN); unset disables routing
+    replica_dsn: str | None = Field(default=None)
+    replica_pool_size: int = Field(default=5)
+    replica_max_lag_seconds: float = Field(default=10.0)
+    replica_check_interval_seconds: float = Field(default=5.0)
+    # admission control: concurrent requests per database and cost class, per user, queueing
+    admission_cheap_limit: int = Field(default=32)
+    admission_scan_limit: int = Field(default=8)
+    admission_bulk_limit: int = Field(default=2)
+    admission_per_user_limit: int = Field(default=4)
+    admission_max_queue: int = Field(default=16)
+    admission_queue_timeout_seconds: float = Field(default=5.0)
+    # live change feed: notifications are coalesced for this long before fan-out
+    change_feed_debounce_ms: int = Field(default=200)
+    # health monitor / circuit breaker for the app DB and registered connections
+    db_monitor_interval_seconds: float = Field(default=10.0)
+    db_monitor_timeout_seconds: float = Field(default=3.0)
+    db_breaker_failure_threshold: int = Field(default=3)
+    db_breaker_cooldown_seconds: int = Field(default=30)
+    # readiness probe thresholds (/health/ready)
+    readiness_max_loop_lag_ms: float = Field(default=500.0)
+    readiness_max_pool_saturation: float = Field(default=0.95)
+    readiness_max_hash_backlog: int = Field(default=50)
+    readiness_db_stale_seconds: float = Field(default=60.0)
+    loop_lag_interval_seconds: float = Field(default=0.5)
+    # audit trail of db_admin data changes: in-memory queue and batched writer
+    audit_queue_size: int = Field(default=10000)
+    audit_batch_size: int = Field(default=500)
+    audit_flush_interval_ms: int = Field(default=1000)
+    audit_enqueue_timeout_ms: int = Field(default=200)
+    # schema-per-tenant routing of db_admin (see app/core/tenancy.py)
+    tenancy_enabled: bool = Field(default=False)
+    tenant_header: str = Field(default="X-Tenant")
+    tenant_schema_prefix: str = Field(default="")
+    # opt-in shared cache of read_table pages
+    table_cache_enabled: bool = Field(default=False)
+    table_cache_ttl_seconds: float = Field(default=5.0)
+    table_cache_max_entries: int = Field(default=500)
+    # fan-out queries across registered connections
+    fanout_max_concurrency: int = Field(default=8)
+    fanout_timeout_ms: int = Field(default=5000)
+    fanout_max_rows: int = Field(default=1000)
+    # table diff between connections: sub-ranges per split, rows compared row by row, keys reported
+    diff_parts: int = Field(default=16)
+    diff_leaf_rows: int = Field(default=2000)
+    diff_max_keys: int = Field(default=1000)
+    # table copy between connections: parallel PK ranges at most, COPY chunks buffered per range
+    copy_max_workers: int = Field(default=4)
+    copy_buffer_chunks: int = Field(default=16)
+    # VACUUM/ANALYZE/REINDEX jobs: concurrent operations per database, progress poll interval
+    maintenance_max_per_database: int = Field(default=1)
+    maintenance_progress_interval_seconds: float = Field(default=1.0)
+    # activity monitor: session flag thresholds, query text cut-off, snapshot reuse window for pollers
+    activity_long_transaction_seconds: float = Field(default=60.0)
+    activity_idle_in_transaction_seconds: float = Field(default=10.0)
+    activity_query_max_chars: int = Field(default=2000)
+    activity_cache_seconds: float = Field(default=1.0)
+    # opt-in request profiler (X-Profile header / _profile=1 for admins): sampling period,
+    # global rate limit, sampling cut-off per request, profiles kept in memory
+    profiling_enabled: bool = Field(default=True)
+    profiling_header: str = Field(default="X-Profile")
+    profiling_interval_ms: float = Field(default=10.0)
+    profiling_max_per_minute: int = Field(default=6)
+    profiling_max_seconds: float = Field(default=30.0)
+    profiling_keep: int = Field(default=20)
+    # guarded Alembic upgrades: per-statement timeouts, lock retries, "large table" for pre-flight risk
+    migration_lock_timeout_ms: int = Field(default=2000)
+    migration_statement_timeout_ms: int = Field(default=600000)
+    migration_lock_retries: int = Field(default=5)
+    migration_retry_backoff_ms: int = Field(default=500)
+    migration_large_table_bytes: int = Field(default=100 * 1024 * 1024)
+    # table search fallback without an index: rows scanned at most and time limit
+    search_scan_budget_rows: int = Field(default=50000)
+    search_timeout_ms: int = Field(default=2000)
 
     @property
     def database_url_async(self) -> str:
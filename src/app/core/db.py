@@ -1,10 +1,115 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from .config import get_settings
+from .tenancy import install_search_path
 
 settings = get_settings()
 engine = create_async_engine(settings.database_url_async, echo=settings.debug, future=True)
 SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
 
+# Target of db_admin for the app database. With tenancy its pool follows the
+# tenant's search_path, so it must not serve the app's own tables (users,
+# audit): a tenant table of the same name would shadow them. Those stay on
+# `engine`, whose connections always use the default search_path.
+admin_engine = (
+    create_async_engine(settings.database_url_async, echo=settings.debug, future=True)
+    if settings.tenancy_enabled
+    else engine
+)
+install_search_path(admin_engine)
+
+# Optional streaming replica for read-only endpoints, with a pool of its own
+replica_engine = (
+    create_async_engine(
+        settings.replica_dsn,
+        echo=settings.debug,
+        future=True,
+        pool_size=settings.replica_pool_size,
+        pool_pre_ping=True,
+    )
+    if settings.replica_dsn
+    else None
+)
+if replica_engine is not None:
+    install_search_path(replica_engine)
+
+
+class RequestSessions:
+    """Sessions pinned to one request: one per engine, closed when it ends."""
+
+    def __init__(self) -> None:
+        self.task = asyncio.current_task()
+        self.sessions: Dict[AsyncEngine, AsyncSession] = {}
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+        for session in self.sessions.values():
+            try:
+                await session.close()
+            except Exception as exc:  # e.g. the connection was already lost
+                logging.getLogger(__name__).warning("Closing request session failed: %s", exc)
+        self.sessions.clear()
+
+
+_request_sessions: ContextVar[Optional[RequestSessions]] = ContextVar("request_sessions", default=None)
+
+
+async def pin_request_sessions() -> AsyncIterator[None]:
+    """Router dependency: queries of a request share one connection per engine.
+
+    Must be declared before dependencies that use the database (get_db), so
+    the user lookup shares the connection with the handler's queries.
+    """
+    scope = RequestSessions()
+    _request_sessions.set(scope)
+    try:
+        yield
+    finally:
+        await scope.close()
+
+
+async def release_request_sessions() -> None:
+    """Close the request's pinned sessions now, before a streaming response.
+
+    Yield dependencies exit only after the response body has been sent, so a
+    stream would otherwise hold the pool connection, and the transaction of
+    the user lookup with its locks on the user table, for as long as it runs.
+    Later queries of the request get sessions of their own.
+    """
+    scope = _request_sessions.get()
+    if scope is not None and not scope.closed:
+        await scope.close()
+
+
+@asynccontextmanager
+async def request_session(engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
+    """Session of the request for the engine, or a fresh one outside a request scope.
+
+    A pinned session is not closed on exit; it is rolled back on error so the
+    next query of the request does not hit an aborted transaction. Background
+    tasks started by the request inherit the context but get their own session.
+    """
+    scope = _request_sessions.get()
+    if scope is None or scope.closed or scope.task is not asyncio.current_task():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+        return
+    session = scope.sessions.get(engine)
+    if session is None:
+        session = scope.sessions[engine] = AsyncSession(engine, expire_on_commit=False)
+    try:
+        yield session
+    except BaseException:
+        await session.rollback()
+        raise
+
+
 async def get_db():
-    async with SessionLocal() as session:
+    async with request_session(engine) as session:
         yield session
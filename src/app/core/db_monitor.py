@@ -0,0 +1,154 @@
+"""Background health monitor and circuit breaker for registered databases.
+
+Every engine registered here (the app database as id 0 plus connections
+created through db_admin) is pinged with `SELECT 1` every
+`db_monitor_interval_seconds`. After `db_breaker_failure_threshold`
+consecutive failures the breaker opens and requests for that database fail
+fast with 503 instead of waiting for the driver's connect timeout. Once
+`db_breaker_cooldown_seconds` have passed the next ping is a half-open probe:
+success closes the breaker, failure keeps it open for another cooldown.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Ping results kept per database
+HISTORY_SIZE = 30
+
+
+class DbHealth:
+    def __init__(self, conn_id: int, engine: AsyncEngine):
+        self.conn_id = conn_id
+        self.engine = engine
+        self.state = "closed"  # closed | open | half_open
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=HISTORY_SIZE)
+
+    def record(self, ok: bool, latency_ms: Optional[float], error: Optional[str]) -> None:
+        now = time.time()
+        self.last_check = now
+        self.history.append({"at": now, "ok": ok, "latency_ms": latency_ms, "error": error})
+        if ok:
+            if self.state != "closed":
+                logger.info("Database %s is reachable again; closing breaker", self.conn_id)
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.last_latency_ms = latency_ms
+            self.last_error = None
+            return
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == "half_open" or self.consecutive_failures >= settings.db_breaker_failure_threshold:
+            if self.state != "open":
+                logger.warning("Opening breaker for database %s: %s", self.conn_id, error)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        failures = sum(1 for h in self.history if not h["ok"])
+        return {
+            "state": self.state,
+            "last_latency_ms": self.last_latency_ms,
+            "last_error": self.last_error,
+            "last_check": self.last_check,
+            "consecutive_failures": self.consecutive_failures,
+            "recent_failure_rate": round(failures / len(self.history), 3) if self.history else None,
+            "history": list(self.history),
+        }
+
+
+_health: Dict[int, DbHealth] = {}
+_monitor_task: Optional["asyncio.Task[None]"] = None
+
+
+def register(conn_id: int, engine: AsyncEngine) -> None:
+    _health[conn_id] = DbHealth(conn_id, engine)
+
+
+def get_health(conn_id: int) -> Optional[DbHealth]:
+    return _health.get(conn_id)
+
+
+def ensure_available(conn_id: int) -> None:
+    """Fail fast with 503 while the breaker of the database is open."""
+    health = _health.get(conn_id)
+    if health is None or health.state != "open":
+        return
+    retry_after = settings.db_breaker_cooldown_seconds
+    if health.opened_at is not None:
+        retry_after = max(1, int(settings.db_breaker_cooldown_seconds - (time.monotonic() - health.opened_at)))
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Database is unavailable: {health.last_error}",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def _select_one(engine: AsyncEngine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def ping(health: DbHealth) -> None:
+    started = time.perf_counter()
+    try:
+        # the timeout covers connecting, which is where dead hosts hang
+        await asyncio.wait_for(_select_one(health.engine), timeout=settings.db_monitor_timeout_seconds)
+    except Exception as exc:
+        health.record(False, None, str(exc) or exc.__class__.__name__)
+        return
+    health.record(True, round((time.perf_counter() - started) * 1000, 2), None)
+
+
+async def _check_all() -> None:
+    probes = []
+    for health in list(_health.values()):
+        if health.state == "open":
+            if time.monotonic() - (health.opened_at or 0) < settings.db_breaker_cooldown_seconds:
+                continue
+            health.state = "half_open"
+        probes.append(ping(health))
+    # probes run concurrently so an unreachable database does not delay the others
+    await asyncio.gather(*probes, return_exceptions=True)
+
+
+async def run_monitor() -> None:
+    while True:
+        try:
+            await _check_all()
+        except Exception as exc:  # keep monitoring whatever happens
+            logger.warning("Database monitor iteration failed: %s", exc)
+        await asyncio.sleep(settings.db_monitor_interval_seconds)
+
+
+def start_monitor() -> None:
+    global _monitor_task
+    if _monitor_task is None or _monitor_task.done():
+        _monitor_task = asyncio.create_task(run_monitor())
+
+
+async def stop_monitor() -> None:
+    global _monitor_task
+    if _monitor_task is not None:
+        _monitor_task.cancel()
+        try:
+            await _monitor_task
+        except asyncio.CancelledError:
+            pass
+        _monitor_task = None
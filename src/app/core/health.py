@@ -0,0 +1,129 @@
+"""Liveness and readiness checks for the load balancer.
+
+Liveness only says the process and its event loop respond. Readiness says
+whether this worker should receive traffic, and does no I/O per request:
+
+- database: the last result of the db_monitor ping (id 0), which must be
+  recent and with the breaker not open;
+- pool: checked-out connections of the app engine against its capacity;
+- event loop: lag measured by a background sampler that sleeps for
+  `loop_lag_interval_seconds` and records how late it woke up;
+- password hashing: bcrypt calls waiting for the hashing threads.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import db_init, db_monitor
+from app.core.config import get_settings
+from app.core.security import hashing_backlog
+
+settings = get_settings()
+
+# lag samples older than this window no longer count towards the maximum
+LAG_WINDOW_SECONDS = 10.0
+
+_lag_samples: Deque[Tuple[float, float]] = deque()
+_last_lag_ms: Optional[float] = None
+_sampler_task: Optional["asyncio.Task[None]"] = None
+
+
+def _record_lag(lag_ms: float) -> None:
+    global _last_lag_ms
+    now = time.monotonic()
+    _last_lag_ms = lag_ms
+    _lag_samples.append((now, lag_ms))
+    while _lag_samples and now - _lag_samples[0][0] > LAG_WINDOW_SECONDS:
+        _lag_samples.popleft()
+
+
+async def run_lag_sampler() -> None:
+    interval = settings.loop_lag_interval_seconds
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        _record_lag(max(0.0, (time.monotonic() - started - interval) * 1000))
+
+
+def start_lag_sampler() -> None:
+    global _sampler_task
+    if _sampler_task is None or _sampler_task.done():
+        _sampler_task = asyncio.create_task(run_lag_sampler())
+
+
+async def stop_lag_sampler() -> None:
+    global _sampler_task
+    if _sampler_task is not None:
+        _sampler_task.cancel()
+        try:
+            await _sampler_task
+        except asyncio.CancelledError:
+            pass
+        _sampler_task = None
+
+
+def loop_lag() -> Dict[str, Any]:
+    recent_max = max(lag for _, lag in _lag_samples) if _lag_samples else None
+    return {"last_ms": _round(_last_lag_ms), "max_recent_ms": _round(recent_max)}
+
+
+def pool_usage(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.pool
+    size = pool.size() if hasattr(pool, "size") else None
+    checked_out = pool.checkedout() if hasattr(pool, "checkedout") else None
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    if size is None or checked_out is None or max_overflow < 0:
+        # NullPool/StaticPool or unlimited overflow: saturation is meaningless
+        return {"checked_out": checked_out, "capacity": None, "saturation": None}
+    capacity = size + max_overflow
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def readiness(engine: AsyncEngine) -> Dict[str, Any]:
+    """Evaluate all readiness checks; "ready" is False if any check fails."""
+    checks: Dict[str, Dict[str, Any]] = {}
+
+    health = db_monitor.get_health(0)
+    db_check: Dict[str, Any] = {"initialized": db_init.db_initialized}
+    if health is None or health.last_check is None:
+        db_check.update(ok=False, reason="no probe result yet")
+    else:
+        age = time.time() - health.last_check
+        db_check.update(state=health.state, checked_seconds_ago=round(age, 1), last_error=health.last_error)
+        if not db_init.db_initialized:
+            db_check.update(ok=False, reason="schema not initialized")
+        elif health.state != "closed":
+            db_check.update(ok=False, reason=f"breaker {health.state}")
+        elif age > settings.readiness_db_stale_seconds:
+            db_check.update(ok=False, reason="probe result is stale")
+        else:
+            db_check["ok"] = True
+    checks["database"] = db_check
+
+    pool = pool_usage(engine)
+    pool["ok"] = pool["saturation"] is None or pool["saturation"] < settings.readiness_max_pool_saturation
+    checks["pool"] = pool
+
+    lag = loop_lag()
+    worst = lag["max_recent_ms"]
+    lag["ok"] = worst is None or worst <= settings.readiness_max_loop_lag_ms
+    checks["event_loop"] = lag
+
+    backlog = hashing_backlog()
+    checks["password_hashing"] = {
+        "backlog": backlog,
+        "ok": backlog <= settings.readiness_max_hash_backlog,
+    }
+
+    return {"ready": all(c["ok"] for c in checks.values()), "checks": checks}
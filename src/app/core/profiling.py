@@ -0,0 +1,361 @@
+"""Opt-in sampling profiler for single requests.
+
+An admin sends the `profiling_header` header (any value) or the `_profile=1`
+query flag; that one request is then profiled and its response carries the
+profile id in `X-Profile-Id`. Everyone else pays only the header lookup.
+
+A sampler thread wakes every `profiling_interval_ms` and looks at the event
+loop thread:
+
+- if the request's middleware frame is on the thread's stack, the request is
+  running Python code and that stack is recorded;
+- otherwise the request's task is suspended, and its coroutine await chain
+  (`cr_await`) is recorded with an "[await]" leaf — time spent waiting for
+  the database, executor threads (bcrypt) and so on — or a "[ready]" leaf
+  when it is runnable but the loop is busy with other tasks.
+
+Stacks are kept in the collapsed ("folded") format understood by
+flamegraph.pl, speedscope and inferno. SQL statements executed through
+SQLAlchemy engines during the request are recorded with their timings;
+statements sent on raw asyncpg connections (COPY, guarded migrations) are not.
+
+Profiling is limited globally: one request at a time and at most
+`profiling_max_per_minute` per minute; refused requests run unprofiled with
+`X-Profile-Id: rate-limited`. The last `profiling_keep` profiles stay in memory.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from jose import JWTError, jwt
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROFILE_ID_HEADER = "X-Profile-Id"
+QUERY_FLAG = "_profile"
+# statements per profile and characters per statement kept
+MAX_STATEMENTS = 1000
+MAX_STATEMENT_CHARS = 2000
+
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar("current_profile", default=None)
+_profiles: "OrderedDict[str, Profile]" = OrderedDict()
+_started: Deque[float] = deque()
+_active = 0
+
+
+class Profile:
+    def __init__(self, method: str, path: str, user: str, interval: float):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.user = user
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self.duration: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.samples: Dict[str, int] = {}
+        self.statements: List[Dict[str, Any]] = []
+        self.statements_dropped = 0
+        self.finished = False
+
+    def add_sample(self, stack: str) -> None:
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def add_statement(self, statement: str, seconds: float, rows: Optional[int], error: Optional[str]) -> None:
+        if len(self.statements) >= MAX_STATEMENTS:
+            self.statements_dropped += 1
+            return
+        self.statements.append(
+            {
+                "sql": statement[:MAX_STATEMENT_CHARS],
+                "seconds": round(seconds, 6),
+                "rows": rows,
+                "error": error,
+            }
+        )
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "user": self.user,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "status_code": self.status_code,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = sum(self.samples.values())
+        awaiting = sum(c for s, c in self.samples.items() if s.endswith("[await]"))
+        ready = sum(c for s, c in self.samples.items() if s.endswith("[ready]"))
+        return {
+            **self.summary(),
+            "interval_ms": self.interval * 1000,
+            "samples": total,
+            "samples_running": total - awaiting - ready,
+            "samples_await": awaiting,
+            "samples_ready": ready,
+            "sql": {
+                "count": len(self.statements) + self.statements_dropped,
+                "seconds": round(sum(s["seconds"] for s in self.statements), 6),
+                "statements": self.statements,
+                "dropped": self.statements_dropped,
+            },
+            "folded": self.folded(),
+        }
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    return _profiles.get(profile_id)
+
+
+def list_profiles() -> List[Profile]:
+    return list(reversed(_profiles.values()))
+
+
+def _try_acquire(now: float) -> bool:
+    global _active
+    while _started and _started[0] <= now - 60:
+        _started.popleft()
+    if _active or len(_started) >= settings.profiling_max_per_minute:
+        return False
+    _started.append(now)
+    _active += 1
+    return True
+
+
+def _release() -> None:
+    global _active
+    _active -= 1
+
+
+def _store(profile: Profile) -> None:
+    _profiles[profile.id] = profile
+    while len(_profiles) > settings.profiling_keep:
+        _profiles.popitem(last=False)
+
+
+# --- stack sampling ---
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Path relative to the longest matching sys.path entry (stdlib, site-packages, the app)."""
+    best = ""
+    for entry in sys.path:
+        entry = os.path.abspath(entry or ".")
+        if filename.startswith(entry + os.sep) and len(entry) > len(best):
+            best = entry
+    return filename[len(best) + 1:] if best else filename
+
+
+def _label(frame: Any) -> str:
+    code = frame.f_code
+    # ";" separates frames in the folded format
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _running_stack(frame: Any, root: Any) -> Optional[List[str]]:
+    """Labels from `root` down to `frame`, or None if `root` is not on the stack."""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        if frame is root:
+            return labels[::-1]
+        frame = frame.f_back
+    return None
+
+
+def _await_stack(coro: Any, root: Any) -> Optional[List[str]]:
+    """Labels of a suspended task's await chain from `root` down, with a state leaf."""
+    labels: List[str] = []
+    seen_root = False
+    obj = coro
+    while True:
+        frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None)
+        if frame is None:
+            labels.append("[await]")
+            break
+        if frame is root:
+            seen_root = True
+        if seen_root:
+            labels.append(_label(frame))
+        awaited = getattr(obj, "cr_await", None)
+        if awaited is None:
+            awaited = getattr(obj, "gi_yieldfrom", None)
+        if awaited is None:
+            labels.append("[ready]")
+            break
+        obj = awaited
+    return labels if seen_root else None
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: Profile, task: "asyncio.Task[Any]", root: Any, max_seconds: float):
+        super().__init__(name=f"profiler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.task = task
+        self.root = root
+        self.loop_thread_id = threading.get_ident()
+        self.deadline = time.monotonic() + max_seconds
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.profile.interval):
+            if time.monotonic() > self.deadline:
+                break
+            try:
+                self._sample()
+            except Exception:
+                # the loop thread mutates frames and coroutines while we read them
+                continue
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        labels = _running_stack(frame, self.root)
+        if labels is None:
+            labels = _await_stack(self.task.get_coro(), self.root)
+        if labels:
+            self.profile.add_sample(";".join(labels))
+
+
+# --- SQL statements ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_profile.get() is not None and context is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current_profile.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is None or profile.finished or started is None:
+        return
+    rows = getattr(cursor, "rowcount", None)
+    profile.add_statement(statement, time.perf_counter() - started, rows if rows is not None and rows >= 0 else None, None)
+
+
+def _handle_error(exception_context: Any) -> None:
+    profile = _current_profile.get()
+    context = exception_context.execution_context
+    started = getattr(context, "_profile_started", None)
+    if profile is None or profile.finished or started is None:
+        return
+    profile.add_statement(
+        exception_context.statement or "",
+        time.perf_counter() - started,
+        None,
+        str(exception_context.original_exception)[:500],
+    )
+
+
+def _install_sql_listeners() -> None:
+    # class-level: covers the app engine, the replica and registered connections
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+# --- middleware ---
+
+def _requested(scope: Dict[str, Any]) -> bool:
+    header = settings.profiling_header.lower().encode("latin-1")
+    if any(name == header for name, _ in scope.get("headers", [])):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get(QUERY_FLAG, ["0"])[-1] not in ("", "0", "false")
+
+
+async def _admin_email(scope: Dict[str, Any]) -> Optional[str]:
+    """Email of the admin the bearer token belongs to, else None."""
+    from app.core.db import SessionLocal
+    from app.models.user import User
+
+    auth = dict(scope.get("headers", [])).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        email = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm]).get("sub")
+    except JWTError:
+        return None
+    if not email:
+        return None
+    async with SessionLocal() as session:
+        is_admin = (await session.execute(select(User.is_admin).where(User.email == email))).scalar_one_or_none()
+    return email if is_admin else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests that ask for it (see module docstring)."""
+
+    def __init__(self, app: Any):
+        self.app = app
+        _install_sql_listeners()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not settings.profiling_enabled or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+        try:
+            email = await _admin_email(scope)
+        except Exception as exc:  # e.g. the database is down: the request itself decides how to fail
+            logger.warning("Profiling check failed, running unprofiled: %s", exc)
+            email = None
+        if email is None:
+            await self.app(scope, receive, send)
+            return
+        if not _try_acquire(time.monotonic()):
+            await self.app(scope, receive, _with_header(send, "rate-limited"))
+            return
+
+        profile = Profile(scope["method"], scope["path"], email, settings.profiling_interval_ms / 1000)
+        sampler = _Sampler(profile, asyncio.current_task(), sys._getframe(), settings.profiling_max_seconds)
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+
+        async def _send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, _with_header(_send, profile.id))
+        finally:
+            sampler.stop_event.set()
+            # at most one sample in progress; the profile must not change once stored
+            sampler.join(timeout=0.1)
+            profile.duration = round(time.perf_counter() - started, 6)
+            profile.finished = True
+            _current_profile.reset(token)
+            _release()
+            _store(profile)
+
+
+def _with_header(send: Any, value: str) -> Any:
+    async def _send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), value.encode())]}
+        await send(message)
+
+    return _send
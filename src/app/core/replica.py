@@ -0,0 +1,159 @@
+"""Routing of read-only queries to a streaming replica of the app database.
+
+The replica is used only when `ADMIN_REPLICA_DSN` is configured, it answers
+and its replay lag is below `replica_max_lag_seconds`. The lag probe result
+is cached for `replica_check_interval_seconds`, so routing costs no extra
+round-trip on most requests. Any failure sends reads to the primary until the
+next probe.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple, TypeVar
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.db import SessionLocal, engine, replica_engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+NODE_HEADER = "X-DB-Node"
+# connect plus lag query of one probe
+PROBE_TIMEOUT_SECONDS = 2.0
+
+ReplicaSessionLocal = (
+    async_sessionmaker(bind=replica_engine, expire_on_commit=False, class_=AsyncSession)
+    if replica_engine is not None
+    else None
+)
+
+# Cached probe state
+replica_healthy: bool = False
+replica_lag_seconds: Optional[float] = None
+replica_last_error: Optional[str] = None
+_last_check: float = 0.0
+_check_lock = asyncio.Lock()
+
+LAG_Q = text(
+    """
+    SELECT
+      pg_is_in_recovery() AS in_recovery,
+      CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+      END AS lag
+    """
+)
+
+
+def mark_replica_failed(exc: BaseException) -> None:
+    """Take the replica out of rotation until the next probe."""
+    global replica_healthy, replica_last_error, _last_check
+    replica_healthy = False
+    replica_last_error = str(exc)
+    _last_check = time.monotonic()
+    logger.warning("Replica marked unavailable: %s", exc)
+
+
+async def _probe() -> None:
+    global replica_healthy, replica_lag_seconds, replica_last_error, _last_check
+    assert replica_engine is not None
+
+    async def _lag_row() -> Any:
+        async with replica_engine.connect() as conn:
+            return (await conn.execute(LAG_Q)).one()
+
+    try:
+        # the connect is bounded too: reads wait for the probe while it holds _check_lock
+        row = await asyncio.wait_for(_lag_row(), timeout=PROBE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        mark_replica_failed(TimeoutError(f"probe timed out after {PROBE_TIMEOUT_SECONDS}s"))
+        return
+    except Exception as exc:
+        mark_replica_failed(exc)
+        return
+    _last_check = time.monotonic()
+    # lag is NULL if nothing has been replayed yet
+    lag = float(row.lag) if row.lag is not None else None
+    replica_lag_seconds = lag
+    if not row.in_recovery:
+        replica_healthy = False
+        replica_last_error = "replica DSN points to a server that is not in recovery"
+    elif lag is None or lag > settings.replica_max_lag_seconds:
+        replica_healthy = False
+        replica_last_error = f"replication lag {lag}s exceeds {settings.replica_max_lag_seconds}s"
+    else:
+        replica_healthy = True
+        replica_last_error = None
+
+
+async def get_read_engine(primary: AsyncEngine = engine) -> Tuple[AsyncEngine, str]:
+    """Return (engine, node) for a read-only query against the app database.
+
+    `primary` is the engine used when the replica is not; db_admin passes its
+    tenant-aware `admin_engine`.
+    """
+    if replica_engine is None:
+        return primary, "primary"
+    if time.monotonic() - _last_check >= settings.replica_check_interval_seconds:
+        async with _check_lock:
+            # another request may have refreshed the probe while we waited
+            if time.monotonic() - _last_check >= settings.replica_check_interval_seconds:
+                await _probe()
+    if replica_healthy:
+        return replica_engine, "replica"
+    return primary, "primary"
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    if isinstance(exc, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return isinstance(exc, DBAPIError) and bool(exc.connection_invalidated)
+
+
+async def run_read(fn: Callable[[AsyncEngine], Awaitable[T]], primary: AsyncEngine = engine) -> Tuple[T, str]:
+    """Run fn(engine) on the replica if available, retrying on the primary
+    when the replica connection fails. Returns (result, node)."""
+    read_engine, node = await get_read_engine(primary)
+    if node == "primary":
+        return await fn(read_engine), node
+    try:
+        return await fn(read_engine), node
+    except Exception as exc:
+        if not is_connection_error(exc):
+            raise
+        mark_replica_failed(exc)
+    return await fn(primary), "primary"
+
+
+async def get_read_db(response: Response):
+    """Like get_db, but the session is bound to the replica when it is usable.
+
+    The replica connection is checked out before the handler runs, so a
+    replica that cannot be reached sends the request to the primary instead
+    of failing it. Sets the X-DB-Node response header to the node that
+    served the request.
+    """
+    _, node = await get_read_engine()
+    if node == "replica" and ReplicaSessionLocal is not None:
+        async with ReplicaSessionLocal() as session:
+            try:
+                await session.connection()
+            except Exception as exc:
+                if not is_connection_error(exc):
+                    raise
+                mark_replica_failed(exc)
+            else:
+                response.headers[NODE_HEADER] = node
+                yield session
+                return
+    response.headers[NODE_HEADER] = "primary"
+    async with SessionLocal() as session:
+        yield session
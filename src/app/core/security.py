@@ -1,5 +1,9 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Callable, List, Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -16,6 +20,11 @@ settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
+# bcrypt is CPU-bound and releases the GIL: run it off the event loop
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_hash_backlog: int = 0
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -24,6 +33,70 @@ def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
 
+async def _run_hashing(fn: Callable[..., Any], *args: Any) -> Any:
+    global _hash_backlog
+    _hash_backlog += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_backlog -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_hashing(verify_password, password, hashed)
+
+
+def hashing_backlog() -> int:
+    """Password hash/verify calls submitted and not yet finished."""
+    return _hash_backlog
+
+
+# Bulk imports hash thousands of passwords: spread them over all cores in
+# worker processes, separate from the threads that serve logins
+_bulk_hash_pool: Optional[ProcessPoolExecutor] = None
+_bulk_hash_processes = settings.bulk_hash_processes or os.cpu_count() or 1
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(p) for p in passwords]
+
+
+def _get_bulk_hash_pool() -> ProcessPoolExecutor:
+    global _bulk_hash_pool
+    if _bulk_hash_pool is None:
+        _bulk_hash_pool = ProcessPoolExecutor(
+            max_workers=_bulk_hash_processes,
+            # spawn: do not fork the event loop and open DB sockets into workers
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _bulk_hash_pool
+
+
+async def hash_passwords_bulk(passwords: List[str]) -> List[str]:
+    """Hash many passwords in the process pool; order is preserved."""
+    if not passwords:
+        return []
+    pool = _get_bulk_hash_pool()
+    # a few chunks per worker keeps all cores busy without per-password IPC
+    chunk = max(1, -(-len(passwords) // (_bulk_hash_processes * 4)))
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(
+        *(loop.run_in_executor(pool, _hash_many, passwords[i : i + chunk]) for i in range(0, len(passwords), chunk))
+    )
+    return [h for part in parts for h in part]
+
+
+def shutdown_bulk_hash_pool() -> None:
+    global _bulk_hash_pool
+    if _bulk_hash_pool is not None:
+        _bulk_hash_pool.shutdown(wait=False, cancel_futures=True)
+        _bulk_hash_pool = None
+
+
 def create_access_token(subject: str, expires_delta: Optional[int] = None) -> str:
     expire_minutes = expires_delta or settings.access_token_expire_minutes
     expire = datetime.now(timezone.utc) + timedelta(minutes=expire_minutes)
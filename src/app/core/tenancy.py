@@ -0,0 +1,76 @@
+"""Schema-per-tenant routing for the embedded admin module.
+
+With `tenancy_enabled`, every db_admin request must name its tenant in the
+`tenant_header` header; the tenant lives in the schema
+`<tenant_schema_prefix><tenant>`. The schema is kept in a context variable
+for the duration of the request, and a pool `checkout` listener points the
+connection's `search_path` at it. All tenants share the one pool of their
+database: the `SET` is issued only when the connection was last used for a
+different tenant, which is tracked in the pool's connection record.
+
+Requests may only address tables of their own schema (403 otherwise);
+`list_tables` and the schema snapshot are scoped to it.
+"""
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# key in the pool's ConnectionRecord.info with the schema the connection is set to
+SEARCH_PATH_INFO_KEY = "tenant_search_path"
+
+current_tenant_schema: ContextVar[Optional[str]] = ContextVar("current_tenant_schema", default=None)
+
+
+def tenant_schema(tenant: str) -> str:
+    """Schema name of a tenant; raises ValueError for invalid tenant ids."""
+    if not tenant or not all(c.isalnum() or c == "_" for c in tenant):
+        raise ValueError("Tenant id must contain only latin letters, digits or '_'")
+    schema = f"{settings.tenant_schema_prefix}{tenant}"
+    if len(schema) > 63:
+        raise ValueError("Tenant schema name is too long (max 63 characters)")
+    return schema
+
+
+def _on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+    wanted = current_tenant_schema.get()
+    if connection_record.info.get(SEARCH_PATH_INFO_KEY) == wanted:
+        return
+    if wanted is None:
+        sql = "RESET search_path"
+    else:
+        sql = f'SET search_path TO "{wanted}", public'
+    # on the raw driver connection, outside of any transaction: a rollback of
+    # the request's transaction must not undo the SET
+    dbapi_connection.run_async(lambda conn: conn.execute(sql))
+    connection_record.info[SEARCH_PATH_INFO_KEY] = wanted
+
+
+def install_search_path(engine: AsyncEngine) -> None:
+    """Route checkouts of the engine's pool to the current tenant's schema."""
+    if settings.tenancy_enabled:
+        event.listen(engine.sync_engine, "checkout", _on_checkout)
+
+
+async def tenant_scope(request: Request) -> Optional[str]:
+    """Router dependency: resolve the tenant schema and guard path schemas."""
+    if not settings.tenancy_enabled:
+        return None
+    tenant = request.headers.get(settings.tenant_header)
+    if not tenant:
+        raise HTTPException(status_code=400, detail=f"Missing {settings.tenant_header} header")
+    try:
+        schema = tenant_schema(tenant)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    requested = request.path_params.get("schema")
+    if requested is not None and requested != schema:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Schema is outside of the tenant")
+    current_tenant_schema.set(schema)
+    return schema
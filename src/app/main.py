@@ -1,15 +1,19 @@
 from fastapi import FastAPI, Request
 import asyncio
 import logging
-from fastapi.responses import RedirectResponse, HTMLResponse, FileResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.api.routes.admin import router as admin_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.users import router as users_router
 from app.api.routes.db_admin import router as db_admin_router
+from app.core import db_init, db_monitor, health as health_checks
 from app.core.config import get_settings
+from app.core.profiling import PROFILE_ID_HEADER, ProfilingMiddleware
 from app.core.db import engine
-from app.core.db_init import background_db_initializer, db_initialized, db_last_error, db_attempts, try_initialize
+from app.core.db_init import background_db_initializer, try_initialize
+from app.core.security import shutdown_bulk_hash_pool
+from app.services import audit
 from fastapi.exceptions import HTTPException
 from fastapi import status
 from pathlib import Path
@@ -36,12 +40,16 @@ origins = [
     "http://localhost",       # Caddy/SPA на локалхосте
 ]
 
+# Профилирование отдельных запросов по заголовку/флагу (только для админов)
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", settings.tenant_header, settings.profiling_header],
+    expose_headers=["X-DB-Node", "X-Cache", "Retry-After", PROFILE_ID_HEADER],
 )
 
 # Роуты
@@ -57,6 +65,7 @@ async def custom_http_exception_handler(request: Request, exc: HTTPException):
     return HTMLResponse(
         content=f"<h1>{exc.status_code}</h1><p>{exc.detail}</p>",
         status_code=exc.status_code,
+        headers=getattr(exc, "headers", None),
     )
 # Статика (CSS/JS)
 # Общая статика (старые стили/ресурсы)
@@ -71,13 +80,28 @@ app.mount(
 
 @app.get("/health")
 async def health():
+    # значения читаются из модуля: импорт имён зафиксировал бы их на старте
     return {
         "status": "ok",
-        "db_initialized": db_initialized,
-        "db_error": db_last_error,
-        "db_attempts": db_attempts,
+        "db_initialized": db_init.db_initialized,
+        "db_error": db_init.db_last_error,
+        "db_attempts": db_init.db_attempts,
     }
 
+@app.get("/health/live")
+async def health_live():
+    # Процесс жив и цикл событий отвечает; зависимости не проверяются
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def health_ready():
+    # Без запросов к БД: используются закэшированные результаты мониторинга
+    result = health_checks.readiness(engine)
+    return JSONResponse(
+        content={"status": "ready" if result["ready"] else "degraded", **result},
+        status_code=status.HTTP_200_OK if result["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
 @app.get("/", include_in_schema=False)
 async def root_redirect():
     return RedirectResponse(url="/admin/")
@@ -98,6 +122,21 @@ async def on_startup():
         logger.warning("DB not available on startup; starting background retry task.")
         # Фоновые повторные попытки пока не удастся подключиться
         asyncio.create_task(background_db_initializer(engine, interval_seconds=10))
+    # Мониторинг доступности БД (id 0 — основная БД приложения)
+    db_monitor.register(0, engine)
+    db_monitor.start_monitor()
+    health_checks.start_lag_sampler()
+    # Фоновая запись журнала аудита пачками
+    audit.start_writer(engine)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await db_monitor.stop_monitor()
+    await health_checks.stop_lag_sampler()
+    # Дописываем накопленные события аудита перед остановкой
+    await audit.stop_writer()
+    shutdown_bulk_hash_pool()
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
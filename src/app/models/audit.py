@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, String, DateTime, Integer, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime, timezone
+from typing import Any
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+class AuditEvent(Base):
+    """Data change made through the DB admin (written in batches by app.services.audit)."""
+    __tablename__ = "admin_audit_events"
+    __table_args__ = (Index("ix_admin_audit_events_table", "schema_name", "table_name", "id"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    user_email: Mapped[str] = mapped_column(String(255), index=True)
+    connection_id: Mapped[int] = mapped_column(Integer)
+    connection_name: Mapped[str | None] = mapped_column(String(255), default=None)
+    action: Mapped[str] = mapped_column(String(32))
+    schema_name: Mapped[str] = mapped_column(String(63))
+    table_name: Mapped[str] = mapped_column(String(63))
+    key: Mapped[Any | None] = mapped_column(JSONB, default=None)
+    before: Mapped[Any | None] = mapped_column(JSONB, default=None)
+    after: Mapped[Any | None] = mapped_column(JSONB, default=None)
@@ -0,0 +1,140 @@
+"""Sessions, waits and the blocking chain of a database.
+
+One query over `pg_stat_activity` returns every backend of the current
+database with its durations and wait event. `pg_blocking_pids()` briefly
+takes the lock manager's shared state exclusively, so it is only called for
+backends actually waiting on a heavyweight lock, and `pg_locks` is read once
+for the lock each of them waits for; an idle database therefore costs one
+cheap catalog scan per poll. The "who blocks whom" trees are assembled here.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text
+
+ACTIVITY_Q = text(
+    """
+    WITH waiting AS (
+        SELECT DISTINCT ON (pid) pid, locktype, mode, relation::regclass::text AS relation
+        FROM pg_locks
+        WHERE NOT granted
+        ORDER BY pid
+    )
+    SELECT a.pid, a.usename AS "user", a.application_name, a.client_addr::text AS client_addr,
+           a.backend_type, a.state, a.wait_event_type, a.wait_event,
+           EXTRACT(EPOCH FROM now() - a.backend_start)::float8 AS session_seconds,
+           EXTRACT(EPOCH FROM now() - a.xact_start)::float8 AS transaction_seconds,
+           EXTRACT(EPOCH FROM now() - a.query_start)::float8 AS query_seconds,
+           EXTRACT(EPOCH FROM now() - a.state_change)::float8 AS state_seconds,
+           a.backend_xmin IS NOT NULL AS holds_xmin,
+           left(a.query, :max_chars) AS query,
+           CASE WHEN a.wait_event_type = 'Lock' THEN pg_blocking_pids(a.pid) ELSE '{}'::int[] END AS blocked_by,
+           w.locktype AS lock_type, w.mode AS lock_mode, w.relation AS lock_relation
+    FROM pg_stat_activity a
+    LEFT JOIN waiting w ON w.pid = a.pid
+    WHERE a.datname = current_database() AND a.pid <> pg_backend_pid()
+    ORDER BY a.xact_start NULLS LAST, a.pid
+    """
+)
+# the pool connection running this query is never a valid target
+SIGNAL_Q = text(
+    """
+    SELECT a.pid, a.usename AS "user", a.state, left(a.query, 500) AS query,
+           CASE WHEN :terminate THEN pg_terminate_backend(a.pid) ELSE pg_cancel_backend(a.pid) END AS signalled
+    FROM pg_stat_activity a
+    WHERE a.pid = :pid AND a.datname = current_database() AND a.pid <> pg_backend_pid()
+    """
+)
+
+IDLE_IN_TRANSACTION = ("idle in transaction", "idle in transaction (aborted)")
+
+
+def _flags(session: Dict[str, Any], long_transaction_seconds: float, idle_in_transaction_seconds: float) -> List[str]:
+    flags = []
+    if (session["transaction_seconds"] or 0) >= long_transaction_seconds:
+        flags.append("long_transaction")
+    if session["state"] in IDLE_IN_TRANSACTION and (session["state_seconds"] or 0) >= idle_in_transaction_seconds:
+        flags.append("idle_in_transaction")
+    if session["blocked_by"]:
+        flags.append("blocked")
+    if session["blocking"]:
+        flags.append("blocking")
+    return flags
+
+
+def _chains(sessions: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Trees of {"pid", "blocked": [...]} rooted at the sessions nobody blocks.
+
+    A root may be a pid missing from `sessions` (a backend of another database
+    holding a shared lock). Waits that form a cycle have no root; each cycle is
+    reported once from an arbitrary member until the deadlock detector breaks it.
+    """
+    blocked_by_pid: Dict[int, List[int]] = {}
+    for pid, session in sessions.items():
+        for blocker in session["blocked_by"]:
+            blocked_by_pid.setdefault(blocker, []).append(pid)
+
+    seen: Set[int] = set()
+
+    def _tree(pid: int) -> Dict[str, Any]:
+        seen.add(pid)
+        children = [_tree(child) for child in sorted(blocked_by_pid.get(pid, [])) if child not in seen]
+        return {"pid": pid, "blocked": children}
+
+    roots = [pid for pid in blocked_by_pid if not sessions.get(pid, {}).get("blocked_by")]
+    trees = [_tree(pid) for pid in sorted(roots)]
+    for pid in sorted(blocked_by_pid):
+        if pid not in seen:
+            trees.append(_tree(pid))
+    return trees
+
+
+def _count(tree: Dict[str, Any]) -> int:
+    return sum(1 + _count(child) for child in tree["blocked"])
+
+
+def build_report(
+    rows: Iterable[Dict[str, Any]],
+    long_transaction_seconds: float,
+    idle_in_transaction_seconds: float,
+    include_idle: bool = False,
+) -> Dict[str, Any]:
+    """Sessions with flags, blocking trees and a summary from ACTIVITY_Q rows."""
+    sessions: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        session = dict(row)
+        session["blocked_by"] = list(session["blocked_by"] or [])
+        session["blocking"] = []
+        sessions[session["pid"]] = session
+    for pid, session in sessions.items():
+        for blocker in session["blocked_by"]:
+            if blocker in sessions:
+                sessions[blocker]["blocking"].append(pid)
+
+    states: Dict[str, int] = {}
+    oldest: Optional[float] = None
+    for session in sessions.values():
+        session["flags"] = _flags(session, long_transaction_seconds, idle_in_transaction_seconds)
+        state = session["state"] or "unknown"
+        states[state] = states.get(state, 0) + 1
+        if session["transaction_seconds"] is not None:
+            oldest = max(oldest or 0.0, session["transaction_seconds"])
+
+    chains = [{"root": tree, "blocked_sessions": _count(tree)} for tree in _chains(sessions)]
+    chains.sort(key=lambda c: -c["blocked_sessions"])
+    listed = [
+        s for s in sessions.values()
+        # plain idle sessions are only noise unless they take part in a chain
+        if include_idle or s["state"] != "idle" or s["flags"]
+    ]
+    return {
+        "sessions": listed,
+        "chains": chains,
+        "summary": {
+            "total": len(sessions),
+            "states": states,
+            "blocked": sum(1 for s in sessions.values() if s["blocked_by"]),
+            "long_transactions": sum(1 for s in sessions.values() if "long_transaction" in s["flags"]),
+            "idle_in_transaction": sum(1 for s in sessions.values() if "idle_in_transaction" in s["flags"]),
+            "oldest_transaction_seconds": oldest,
+        },
+    }
@@ -0,0 +1,178 @@
+"""Asynchronous, batched audit trail of data changes made through db_admin.
+
+Mutating endpoints call `record()`, which only puts the event on an
+in-memory queue; a background writer drains the queue and inserts events
+into `admin_audit_events` of the app database in batches of up to
+`audit_batch_size` (or whatever arrived within `audit_flush_interval_ms`).
+
+When the queue is full `record()` waits up to `audit_enqueue_timeout_ms` for
+room (backpressure on the mutating requests); if the writer still does not
+catch up, the event is dropped and counted in `stats()["dropped"]`. A batch
+that fails to insert is retried with backoff, during which the queue fills
+and backpressure applies. `stop_writer()` flushes what is queued on shutdown.
+"""
+import asyncio
+import base64
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+from app.models.audit import AuditEvent
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# backoff between retries of a batch that failed to insert
+RETRY_BACKOFF_SECONDS = (0.5, 1, 2, 5, 10)
+
+_queue: Optional["asyncio.Queue[Dict[str, Any]]"] = None
+_writer_task: Optional["asyncio.Task[None]"] = None
+_engine: Optional[AsyncEngine] = None
+# events taken off the queue but not written yet; flushed by stop_writer()
+_in_flight: List[Dict[str, Any]] = []
+_stats: Dict[str, Any] = {"written": 0, "dropped": 0, "failed_batches": 0, "last_error": None}
+
+
+def _get_queue() -> "asyncio.Queue[Dict[str, Any]]":
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=settings.audit_queue_size)
+    return _queue
+
+
+def _json_safe(value: Any) -> Any:
+    if value is None:
+        return None
+    return jsonable_encoder(value, custom_encoder={bytes: lambda b: base64.b64encode(b).decode("ascii")})
+
+
+async def record(
+    user: str,
+    connection_id: int,
+    connection_name: Optional[str],
+    action: str,
+    schema: str,
+    table: str,
+    key: Any = None,
+    before: Any = None,
+    after: Any = None,
+) -> bool:
+    """Queue an audit event; returns False if it had to be dropped."""
+    event = {
+        "at": datetime.now(timezone.utc),
+        "user_email": user,
+        "connection_id": connection_id,
+        "connection_name": connection_name,
+        "action": action,
+        "schema_name": schema,
+        "table_name": table,
+        "key": _json_safe(key),
+        "before": _json_safe(before),
+        "after": _json_safe(after),
+    }
+    queue = _get_queue()
+    try:
+        queue.put_nowait(event)
+        return True
+    except asyncio.QueueFull:
+        pass
+    try:
+        await asyncio.wait_for(queue.put(event), timeout=settings.audit_enqueue_timeout_ms / 1000)
+        return True
+    except asyncio.TimeoutError:
+        _stats["dropped"] += 1
+        logger.warning("Audit queue is full; dropped %s event on %s.%s by %s", action, schema, table, user)
+        return False
+
+
+async def _fill_batch(queue: "asyncio.Queue[Dict[str, Any]]", batch: List[Dict[str, Any]]) -> None:
+    """Wait for one event, then collect more until the batch or the window is full."""
+    batch.append(await queue.get())
+    deadline = time.monotonic() + settings.audit_flush_interval_ms / 1000
+    while len(batch) < settings.audit_batch_size:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+
+
+async def _write(batch: List[Dict[str, Any]]) -> None:
+    assert _engine is not None
+    async with _engine.begin() as conn:
+        # executemany: one round trip per batch
+        await conn.execute(insert(AuditEvent.__table__), batch)
+    _stats["written"] += len(batch)
+
+
+async def _write_with_retry(batch: List[Dict[str, Any]]) -> None:
+    attempt = 0
+    while True:
+        try:
+            await _write(batch)
+            return
+        except Exception as exc:
+            _stats["failed_batches"] += 1
+            _stats["last_error"] = str(exc)
+            delay = RETRY_BACKOFF_SECONDS[min(attempt, len(RETRY_BACKOFF_SECONDS) - 1)]
+            logger.warning("Writing %d audit events failed (retry in %ss): %s", len(batch), delay, exc)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def run_writer() -> None:
+    queue = _get_queue()
+    while True:
+        await _fill_batch(queue, _in_flight)
+        await _write_with_retry(list(_in_flight))
+        _in_flight.clear()
+
+
+def start_writer(engine: AsyncEngine) -> None:
+    global _engine, _writer_task
+    _engine = engine
+    if _writer_task is None or _writer_task.done():
+        _writer_task = asyncio.create_task(run_writer())
+
+
+async def stop_writer(timeout: float = 10.0) -> None:
+    """Stop the writer and flush queued events (best effort within timeout)."""
+    global _writer_task
+    if _writer_task is not None:
+        _writer_task.cancel()
+        try:
+            await _writer_task
+        except asyncio.CancelledError:
+            pass
+        _writer_task = None
+    pending = list(_in_flight)
+    _in_flight.clear()
+    while _queue is not None and not _queue.empty():
+        pending.append(_queue.get_nowait())
+    if _engine is None or not pending:
+        return
+    start = 0
+    try:
+        for start in range(0, len(pending), settings.audit_batch_size):
+            await asyncio.wait_for(_write(pending[start:start + settings.audit_batch_size]), timeout=timeout)
+    except Exception as exc:
+        _stats["dropped"] += len(pending) - start
+        logger.error("Audit flush on shutdown failed, %d events lost: %s", len(pending) - start, exc)
+
+
+def stats() -> Dict[str, Any]:
+    queued = (_queue.qsize() if _queue is not None else 0) + len(_in_flight)
+    return {**_stats, "queued": queued}
@@ -0,0 +1,171 @@
+"""Predicate-based bulk UPDATE/DELETE executed in primary-key ranges.
+
+Instead of one huge statement the table is walked by its primary key in
+ranges of `chunk_size` keys; each range is modified and committed in its own
+transaction so locks are short-lived and WAL/vacuum can keep up.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services.db_utils import build_where, fetch_primary_key, quote_ident, table_identifier
+from app.services.jobs import Job
+
+
+async def estimate_matching_rows(engine: AsyncEngine, identifier: str, where_sql: str, params: Dict[str, Any]) -> int:
+    """Planner estimate of rows matching the predicate (no table scan)."""
+    q = text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {identifier} WHERE {where_sql}")
+    async with engine.connect() as conn:
+        result = await conn.execute(q, params)
+        plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class BulkPlan:
+    """Validated bulk operation, ready to be estimated or executed."""
+
+    def __init__(
+        self,
+        schema: str,
+        table: str,
+        action: str,
+        pk_column: str,
+        where_sql: str,
+        params: Dict[str, Any],
+        set_sql: Optional[str],
+    ):
+        self.schema = schema
+        self.table = table
+        self.identifier = table_identifier(schema, table)
+        self.action = action
+        self.pk_column = pk_column
+        self.where_sql = where_sql
+        self.params = params
+        self.set_sql = set_sql
+
+
+async def prepare_bulk(
+    engine: AsyncEngine,
+    schema: str,
+    table: str,
+    action: str,
+    filters: Any,
+    values: Any,
+) -> BulkPlan:
+    """Validate the request and resolve the table's primary key.
+
+    Raises ValueError on invalid input.
+    """
+    if action not in ("update", "delete"):
+        raise ValueError("'action' must be 'update' or 'delete'")
+    if not isinstance(filters, list) or not filters:
+        raise ValueError("'where' must be a non-empty array of filters")
+    where_sql, params = build_where(filters)
+    table_identifier(schema, table)
+
+    async with engine.connect() as conn:
+        pk_columns = await fetch_primary_key(conn, schema, table)
+    if len(pk_columns) != 1:
+        raise ValueError("Bulk operations require a single-column primary key")
+    pk_column = pk_columns[0]
+
+    set_sql: Optional[str] = None
+    if action == "update":
+        if not isinstance(values, dict) or not values:
+            raise ValueError("'values' must be a non-empty object")
+        if pk_column in values:
+            raise ValueError("Primary key column cannot be changed by a bulk update")
+        set_parts: List[str] = []
+        for idx, (col, val) in enumerate(values.items()):
+            set_parts.append(f"{quote_ident(col)} = :set{idx}")
+            params[f"set{idx}"] = val
+        set_sql = ", ".join(set_parts)
+
+    return BulkPlan(schema, table, action, pk_column, where_sql, params, set_sql)
+
+
+async def run_bulk(
+    job: Job,
+    engine: AsyncEngine,
+    plan: BulkPlan,
+    chunk_size: int,
+    throttle_seconds: float,
+) -> Dict[str, Any]:
+    """Walk the table in PK ranges and apply the operation per range.
+
+    Progress (chunks, affected rows, last key, percent for numeric keys) is
+    published in job.progress after every committed chunk. Cancelling the job
+    rolls back only the chunk that is in flight.
+    """
+    pk = quote_ident(plan.pk_column)
+    ident = plan.identifier
+
+    async with engine.connect() as conn:
+        bounds = await conn.execute(text(f"SELECT min({pk}), max({pk}) FROM {ident}"))
+        min_key, max_key = bounds.one()
+    estimated = await estimate_matching_rows(engine, ident, plan.where_sql, plan.params)
+
+    job.progress = {
+        "chunks": 0,
+        "affected": 0,
+        "estimated_rows": estimated,
+        "last_key": None,
+        "max_key": max_key,
+        "percent": 0.0,
+    }
+    if max_key is None:
+        return {"affected": 0, "chunks": 0}
+
+    if plan.action == "delete":
+        head = f"DELETE FROM {ident}"
+    else:
+        head = f"UPDATE {ident} SET {plan.set_sql}"
+
+    numeric = isinstance(min_key, (int, float)) and isinstance(max_key, (int, float))
+    last_key: Any = None
+    affected = 0
+    chunks = 0
+    while True:
+        if last_key is None:
+            bound_q = text(f"SELECT max(k) FROM (SELECT {pk} AS k FROM {ident} ORDER BY {pk} LIMIT :chunk) s")
+            range_sql = f"{pk} <= :hi"
+            bound_params: Dict[str, Any] = {"chunk": chunk_size}
+        else:
+            bound_q = text(
+                f"SELECT max(k) FROM (SELECT {pk} AS k FROM {ident} WHERE {pk} > :lo ORDER BY {pk} LIMIT :chunk) s"
+            )
+            range_sql = f"{pk} > :lo AND {pk} <= :hi"
+            bound_params = {"chunk": chunk_size, "lo": last_key}
+
+        async with engine.begin() as conn:
+            hi = (await conn.execute(bound_q, bound_params)).scalar_one()
+            if hi is None:
+                break
+            stmt = text(f"{head} WHERE {range_sql} AND ({plan.where_sql})")
+            stmt_params = dict(plan.params)
+            stmt_params["hi"] = hi
+            if last_key is not None:
+                stmt_params["lo"] = last_key
+            result = await conn.execute(stmt, stmt_params)
+            affected += result.rowcount or 0
+
+        chunks += 1
+        last_key = hi
+        percent = 100.0
+        if numeric and max_key != min_key:
+            percent = min(100.0, round((hi - min_key) * 100.0 / (max_key - min_key), 2))
+        job.progress.update(chunks=chunks, affected=affected, last_key=hi, percent=percent)
+
+        # rows inserted after the job started are out of scope
+        if hi >= max_key:
+            break
+        if throttle_seconds > 0:
+            await asyncio.sleep(throttle_seconds)
+
+    job.progress["percent"] = 100.0
+    return {"affected": affected, "chunks": chunks}
@@ -0,0 +1,276 @@
+"""Opt-in live change feed for tables, built on LISTEN/NOTIFY.
+
+`install_trigger` adds a row-level trigger that sends
+`pg_notify('admin_module_changes', {"schema", "table", "op", "key"})` on every
+INSERT/UPDATE/DELETE. For every database connection the module keeps one
+`ChangeFeedHub` with a single dedicated LISTEN connection (outside the
+SQLAlchemy pool); notifications are coalesced per row for `debounce` seconds
+and then fanned out to all subscribers of the table in one batch. Rows of a
+single-column primary key are re-read once per batch, so clients can patch
+their grid in place without re-polling read_table.
+
+When the LISTEN connection is lost (e.g. a server restart) subscribers get a
+"reset" and the hub reconnects in the background with exponential backoff
+for as long as anyone is subscribed; once it listens again another "reset"
+tells clients to reload the changes they missed in between.
+
+When the engine behind a connection id changes, the old hub is retired: its
+subscribers get a final "reset" ("connection_changed") and their streams end,
+so clients reconnect to the new hub; its LISTEN connection is closed.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services.db_utils import fetch_primary_key, quote_ident, table_identifier
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "admin_module_changes"
+TRIGGER_NAME = "admin_module_change_feed"
+FUNCTION_NAME = "public.admin_module_notify_change"
+
+# Batches buffered per subscriber before it is told to reload instead
+SUBSCRIBER_QUEUE_SIZE = 100
+# LISTEN reconnect backoff: first delay, doubling up to the maximum
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30.0
+
+NOTIFY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION {FUNCTION_NAME}() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+  doc jsonb;
+  key jsonb := '{{}}'::jsonb;
+  col text;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    doc := to_jsonb(OLD);
+  ELSE
+    doc := to_jsonb(NEW);
+  END IF;
+  FOREACH col IN ARRAY TG_ARGV LOOP
+    key := key || jsonb_build_object(col, doc -> col);
+  END LOOP;
+  PERFORM pg_notify(
+    '{CHANNEL}',
+    json_build_object('schema', TG_TABLE_SCHEMA, 'table', TG_TABLE_NAME, 'op', TG_OP, 'key', key)::text
+  );
+  RETURN NULL;
+END
+$$
+"""
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+async def install_trigger(engine: AsyncEngine, schema: str, table: str) -> List[str]:
+    """Create (or replace) the notify trigger on the table; returns key columns."""
+    identifier = table_identifier(schema, table)
+    async with engine.begin() as conn:
+        pk_columns = await fetch_primary_key(conn, schema, table)
+        if not pk_columns:
+            raise ValueError("Change feed requires a primary key")
+        args = ", ".join(_literal(c) for c in pk_columns)
+        await conn.execute(text(NOTIFY_FUNCTION_SQL))
+        await conn.execute(text(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON {identifier}"))
+        await conn.execute(
+            text(
+                f"CREATE TRIGGER {TRIGGER_NAME} AFTER INSERT OR UPDATE OR DELETE ON {identifier} "
+                f"FOR EACH ROW EXECUTE FUNCTION {FUNCTION_NAME}({args})"
+            )
+        )
+    return pk_columns
+
+
+async def uninstall_trigger(engine: AsyncEngine, schema: str, table: str) -> None:
+    identifier = table_identifier(schema, table)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON {identifier}"))
+
+
+async def trigger_installed(engine: AsyncEngine, schema: str, table: str) -> bool:
+    q = text(
+        """
+        SELECT EXISTS (
+          SELECT 1 FROM pg_trigger
+          WHERE tgrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+            AND tgname = :name
+        )
+        """
+    )
+    async with engine.connect() as conn:
+        result = await conn.execute(q, {"schema": schema, "table": table, "name": TRIGGER_NAME})
+        return bool(result.scalar_one())
+
+
+class Subscription:
+    def __init__(self, schema: str, table: str):
+        self.schema = schema
+        self.table = table
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # set when the hub is retired: nothing arrives after what is queued
+        self.closed = False
+
+    def offer(self, batch: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            # slow client: drop what it has not read and ask it to reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "reset", "reason": "overflow"})
+
+
+class ChangeFeedHub:
+    """Single LISTEN connection + fan-out for one registered database."""
+
+    def __init__(self, engine: AsyncEngine, debounce: float):
+        self.engine = engine
+        self.debounce = debounce
+        self._conn: Optional[asyncpg.Connection] = None
+        self._subs: Set[Subscription] = set()
+        self._pending: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self._reconnect_task: Optional["asyncio.Task[None]"] = None
+        self._lock = asyncio.Lock()
+
+    def _dsn(self) -> str:
+        return self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def _ensure_listening(self) -> None:
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            self._conn = await asyncpg.connect(self._dsn())
+            self._conn.add_termination_listener(self._on_terminated)
+            await self._conn.add_listener(CHANNEL, self._on_notify)
+
+    async def _stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        async with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+
+    def _on_terminated(self, conn: Any) -> None:
+        # also called for connections closed on purpose by _stop
+        if conn is not self._conn:
+            return
+        logger.warning("Change feed LISTEN connection lost")
+        self._conn = None
+        self._broadcast_reset("listener_lost")
+        if self._subs and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    def _retire(self) -> "asyncio.Task[None]":
+        """Send subscribers a final reset and stop listening; the hub is not used again."""
+        for sub in list(self._subs):
+            sub.offer({"type": "reset", "reason": "connection_changed"})
+            sub.closed = True
+        self._subs.clear()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        return asyncio.create_task(self._stop())
+
+    def _broadcast_reset(self, reason: str) -> None:
+        for sub in list(self._subs):
+            sub.offer({"type": "reset", "reason": reason})
+
+    async def _reconnect(self) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        while self._subs:
+            await asyncio.sleep(delay)
+            if not self._subs:
+                return
+            try:
+                await self._ensure_listening()
+            except Exception as exc:
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                logger.warning("Change feed LISTEN reconnect failed (retry in %ss): %s", delay, exc)
+                continue
+            logger.info("Change feed LISTEN connection restored")
+            # changes made while nobody listened are lost: clients reload
+            self._broadcast_reset("listener_restored")
+            return
+
+    def _on_notify(self, _conn: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        table_key = (event.get("schema"), event.get("table"))
+        row_key = json.dumps(event.get("key"), sort_keys=True, default=str)
+        # last operation on a row within the debounce window wins
+        self._pending.setdefault(table_key, {})[row_key] = event
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.debounce)
+        pending, self._pending = self._pending, {}
+        for (schema, table), events in pending.items():
+            subs = [s for s in self._subs if s.schema == schema and s.table == table]
+            if not subs:
+                continue
+            changes = list(events.values())
+            try:
+                await self._attach_rows(schema, table, changes)
+            except Exception as exc:
+                logger.warning("Change feed row fetch failed for %s.%s: %s", schema, table, exc)
+            batch = {"type": "changes", "schema": schema, "table": table, "changes": changes}
+            for sub in subs:
+                sub.offer(batch)
+
+    async def _attach_rows(self, schema: str, table: str, changes: List[Dict[str, Any]]) -> None:
+        """Load current rows for inserted/updated keys with one query per batch."""
+        wanted = [c for c in changes if c.get("op") != "DELETE" and len(c.get("key") or {}) == 1]
+        if not wanted:
+            return
+        pk_col = next(iter(wanted[0]["key"]))
+        pk = quote_ident(pk_col)
+        keys = list({c["key"][pk_col] for c in wanted})
+        q = text(f"SELECT * FROM {table_identifier(schema, table)} WHERE {pk} = ANY(:keys)")
+        async with self.engine.connect() as conn:
+            result = await conn.execute(q, {"keys": keys})
+            rows = {str(r[pk_col]): dict(r) for r in result.mappings().all()}
+        for change in wanted:
+            change["row"] = rows.get(str(change["key"][pk_col]))
+
+    async def subscribe(self, schema: str, table: str) -> Subscription:
+        await self._ensure_listening()
+        sub = Subscription(schema, table)
+        self._subs.add(sub)
+        return sub
+
+    async def unsubscribe(self, sub: Subscription) -> None:
+        self._subs.discard(sub)
+        if not self._subs:
+            await self._stop()
+
+
+_hubs: Dict[Any, ChangeFeedHub] = {}
+# stops of retired hubs, referenced until they finish
+_stopping: Set["asyncio.Task[None]"] = set()
+
+
+def get_hub(conn_key: Any, engine: AsyncEngine, debounce: float) -> ChangeFeedHub:
+    """Return the hub of the given database connection, creating it lazily."""
+    hub = _hubs.get(conn_key)
+    if hub is None or hub.engine is not engine:
+        if hub is not None:
+            task = hub._retire()
+            _stopping.add(task)
+            task.add_done_callback(_stopping.discard)
+        hub = ChangeFeedHub(engine, debounce)
+        _hubs[conn_key] = hub
+    return hub
@@ -0,0 +1,180 @@
+"""Column value profiles from the planner's statistics (`pg_stats`).
+
+Null fraction, distinct estimate, most common values with frequencies and
+histogram bounds are what ANALYZE sampled last time; reading them touches
+the catalog only, never the table. Negative `n_distinct` (a fraction of the
+rows, used when the distinct count scales with the table) is turned into an
+estimate with `pg_class.reltuples`. For partitioned and inheritance parents
+the statistics of the whole tree (`inherited = true`) are preferred.
+
+`most_common_vals` and `histogram_bounds` are `anyarray`, which cannot be
+returned as such; they are read as text and parsed here. Integer, float and
+boolean values are converted, everything else stays in its text form; so do
+`Infinity`, `-Infinity` and `NaN`, which JSON cannot represent as numbers.
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+TABLE_Q = text(
+    """
+    SELECT c.reltuples, c.relkind,
+           greatest(s.last_analyze, s.last_autoanalyze) AS last_analyzed,
+           s.n_mod_since_analyze AS modified_since_analyze
+    FROM pg_class c
+    LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+    WHERE c.oid = to_regclass(quote_ident(:schema) || '.' || quote_ident(:table))
+    """
+)
+COLUMNS_Q = text(
+    """
+    SELECT a.attname AS name, t.typname, format_type(a.atttypid, a.atttypmod) AS data_type,
+           st.null_frac, st.n_distinct, st.avg_width, st.correlation,
+           st.most_common_vals::text AS most_common_vals, st.most_common_freqs,
+           st.histogram_bounds::text AS histogram_bounds
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    LEFT JOIN LATERAL (
+        SELECT * FROM pg_stats s
+        WHERE s.schemaname = :schema AND s.tablename = :table AND s.attname = a.attname
+        ORDER BY s.inherited DESC
+        LIMIT 1
+    ) st ON true
+    WHERE a.attrelid = to_regclass(quote_ident(:schema) || '.' || quote_ident(:table))
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY a.attnum
+    """
+)
+
+
+def _float(value: str) -> Any:
+    number = float(value)
+    return number if math.isfinite(number) else value
+
+
+_CONVERTERS = {
+    "int2": int,
+    "int4": int,
+    "int8": int,
+    "float4": _float,
+    "float8": _float,
+    "bool": lambda v: v == "t",
+}
+
+
+def parse_array(literal: Optional[str]) -> Optional[List[Optional[str]]]:
+    """Elements of a one-dimensional array literal such as '{a,"b c",NULL}'.
+
+    Nested arrays (statistics of array-typed columns) are kept as their
+    literal text. Raises ValueError for malformed input.
+    """
+    if literal is None:
+        return None
+    s = literal
+    if s.startswith("["):  # explicit bounds, e.g. "[0:2]={...}"
+        s = s[s.index("=") + 1:]
+    if not (s.startswith("{") and s.endswith("}")):
+        raise ValueError(f"Not an array literal: {literal[:50]!r}")
+    items: List[Optional[str]] = []
+    i, end = 1, len(s) - 1
+    while i < end:
+        if s[i] == '"':
+            buf = []
+            i += 1
+            while s[i] != '"':
+                if s[i] == "\\":
+                    i += 1
+                buf.append(s[i])
+                i += 1
+            i += 1
+            items.append("".join(buf))
+        elif s[i] == "{":
+            start, depth, quoted = i, 0, False
+            while True:
+                ch = s[i]
+                if ch == "\\":
+                    i += 1
+                elif ch == '"':
+                    quoted = not quoted
+                elif not quoted and ch == "{":
+                    depth += 1
+                elif not quoted and ch == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            i += 1
+            items.append(s[start:i])
+        else:
+            buf = []
+            while i < end and s[i] != ",":
+                if s[i] == "\\":
+                    i += 1
+                buf.append(s[i])
+                i += 1
+            value = "".join(buf).strip()
+            items.append(None if value.upper() == "NULL" else value)
+        if i < end:
+            if s[i] != ",":
+                raise ValueError(f"Malformed array literal: {literal[:50]!r}")
+            i += 1
+    return items
+
+
+def _values(literal: Optional[str], typname: str) -> Optional[List[Any]]:
+    items = parse_array(literal)
+    convert = _CONVERTERS.get(typname)
+    if items is None or convert is None:
+        return items
+    return [None if v is None else convert(v) for v in items]
+
+
+def distinct_estimate(n_distinct: Optional[float], reltuples: Optional[float]) -> Optional[int]:
+    """Absolute distinct count; negative n_distinct is a fraction of the rows."""
+    if n_distinct is None:
+        return None
+    if n_distinct >= 0:
+        return int(n_distinct)
+    if reltuples is None or reltuples < 0:  # -1: never vacuumed or analyzed
+        return None
+    return max(1, round(-n_distinct * reltuples))
+
+
+def column_profile(row: Dict[str, Any], reltuples: Optional[float]) -> Dict[str, Any]:
+    """Profile of one COLUMNS_Q row; "analyzed" is False when pg_stats has nothing."""
+    profile: Dict[str, Any] = {"name": row["name"], "data_type": row["data_type"]}
+    if row["null_frac"] is None:
+        profile["analyzed"] = False
+        return profile
+
+    rows = reltuples if reltuples is not None and reltuples >= 0 else None
+    values = _values(row["most_common_vals"], row["typname"]) or []
+    freqs = list(row["most_common_freqs"] or [])
+    bounds = _values(row["histogram_bounds"], row["typname"]) or []
+    other = max(0.0, 1.0 - row["null_frac"] - sum(freqs))
+    profile.update(
+        {
+            "analyzed": True,
+            "null_fraction": row["null_frac"],
+            "distinct_estimate": distinct_estimate(row["n_distinct"], rows),
+            "distinct_scales_with_rows": row["n_distinct"] < 0,
+            "avg_width": row["avg_width"],
+            "correlation": row["correlation"],
+            "most_common": [
+                {
+                    "value": value,
+                    "frequency": freq,
+                    "estimated_rows": round(freq * rows) if rows is not None else None,
+                }
+                for value, freq in zip(values, freqs)
+            ],
+            # values that are neither NULL nor among the most common ones
+            "other_fraction": round(other, 6),
+            "histogram_bounds": bounds,
+            # every histogram bucket holds the same share of the "other" values
+            "histogram_bucket_fraction": round(other / (len(bounds) - 1), 6) if len(bounds) > 1 else None,
+        }
+    )
+    return profile
@@ -0,0 +1,106 @@
+"""Small helpers shared by the db_admin routes and services.
+
+Identifiers coming from the URL or request body are validated here before
+they are interpolated into SQL; values always go through bound parameters.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# SQLSTATE codes checked by services
+QUERY_CANCELED = "57014"  # statement_timeout or pg_cancel_backend
+INSUFFICIENT_PRIVILEGE = "42501"
+
+
+def quote_ident(value: str) -> str:
+    """Return value as a double-quoted SQL identifier.
+
+    Raises ValueError for empty identifiers or ones containing characters
+    that could break out of the quotes.
+    """
+    if not value or not isinstance(value, str):
+        raise ValueError("Identifiers must be non-empty strings")
+    if any(c in value for c in ('"', ';', '\\', '\x00')):
+        raise ValueError("Invalid characters in identifier")
+    return f'"{value}"'
+
+
+def table_identifier(schema: str, table: str) -> str:
+    return f"{quote_ident(schema)}.{quote_ident(table)}"
+
+
+def sqlstate(exc: DBAPIError) -> Optional[str]:
+    """Return the PostgreSQL SQLSTATE of a wrapped driver error, if any."""
+    orig = getattr(exc, "orig", None)
+    return getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+
+
+# op -> SQL template; "{col}" is the quoted column, "{param}" the bind name
+FILTER_OPS: Dict[str, str] = {
+    "=": "{col} = :{param}",
+    "!=": "{col} <> :{param}",
+    "<": "{col} < :{param}",
+    "<=": "{col} <= :{param}",
+    ">": "{col} > :{param}",
+    ">=": "{col} >= :{param}",
+    "like": "{col} LIKE :{param}",
+    "ilike": "{col} ILIKE :{param}",
+    "in": "{col} = ANY(:{param})",
+    "is_null": "{col} IS NULL",
+    "not_null": "{col} IS NOT NULL",
+}
+
+
+def build_where(filters: Any, prefix: str = "f") -> Tuple[str, Dict[str, Any]]:
+    """Build a WHERE clause body from a list of structured filters.
+
+    Each filter looks like {"column": "status", "op": "=", "value": "stale"};
+    all filters are combined with AND. Returns ("TRUE", {}) for an empty list.
+    """
+    if filters is None:
+        return "TRUE", {}
+    if not isinstance(filters, list):
+        raise ValueError("'where' must be an array of filters")
+
+    parts: List[str] = []
+    params: Dict[str, Any] = {}
+    for idx, flt in enumerate(filters):
+        if not isinstance(flt, dict):
+            raise ValueError("Each filter must be an object")
+        op = str(flt.get("op") or "=").lower()
+        template = FILTER_OPS.get(op)
+        if template is None:
+            raise ValueError(f"Unsupported filter op: {op}")
+        col = quote_ident(str(flt.get("column") or ""))
+        param = f"{prefix}{idx}"
+        if "{param}" in template:
+            value = flt.get("value")
+            if op == "in" and not isinstance(value, list):
+                raise ValueError("'in' filter expects an array value")
+            params[param] = value
+        parts.append(template.format(col=col, param=param))
+
+    if not parts:
+        return "TRUE", {}
+    return " AND ".join(f"({p})" for p in parts), params
+
+
+async def fetch_primary_key(conn: AsyncConnection, schema: str, table: str) -> List[str]:
+    """Return primary key column names of the table in key order."""
+    q = text(
+        """
+        SELECT a.attname
+        FROM pg_index i
+        JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord) ON TRUE
+        JOIN pg_attribute a
+          ON a.attrelid = i.indrelid
+         AND a.attnum   = k.attnum
+        WHERE i.indrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+          AND i.indisprimary
+        ORDER BY k.ord
+        """
+    )
+    result = await conn.execute(q, {"schema": schema, "table": table})
+    return [r[0] for r in result.fetchall()]
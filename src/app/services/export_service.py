@@ -0,0 +1,188 @@
+"""Columnar export of a table to Arrow IPC stream or Parquet.
+
+Rows are read through a server-side cursor in partitions of `batch_size`,
+each partition becomes one Arrow record batch and is written straight into
+the HTTP response, so memory stays bounded by the batch size regardless of
+the table size. Requires the optional `pyarrow` dependency
+(`pip install admin-module[export]`).
+"""
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services.db_utils import build_where, quote_ident, table_identifier
+from app.services.table_read import column_types
+
+try:  # optional dependency
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def arrow_type(typname: str) -> Tuple[Any, Optional[Callable[[Any], Any]]]:
+    """Map a Postgres type name to (Arrow type, value converter or None).
+
+    Types without an exact Arrow counterpart (numeric, uuid, arrays, ...) are
+    exported as strings. json/jsonb arrive decoded (dicts, lists) and are
+    written back as JSON text.
+    """
+    mapping = {
+        "bool": pa.bool_(),
+        "int2": pa.int16(),
+        "int4": pa.int32(),
+        "int8": pa.int64(),
+        "float4": pa.float32(),
+        "float8": pa.float64(),
+        "text": pa.string(),
+        "varchar": pa.string(),
+        "bpchar": pa.string(),
+        "name": pa.string(),
+        "citext": pa.string(),
+        "bytea": pa.binary(),
+        "date": pa.date32(),
+        "time": pa.time64("us"),
+        "timestamp": pa.timestamp("us"),
+        "timestamptz": pa.timestamp("us", tz="UTC"),
+        "interval": pa.duration("us"),
+    }
+    if typname in ("json", "jsonb"):
+        return pa.string(), json.dumps
+    arrow = mapping.get(typname)
+    if arrow is not None:
+        return arrow, None
+    return pa.string(), str
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportPlan:
+    def __init__(
+        self,
+        select_sql: str,
+        params: Dict[str, Any],
+        arrow_schema: Any,
+        converters: List[Optional[Callable[[Any], Any]]],
+    ):
+        self.select_sql = select_sql
+        self.params = params
+        self.arrow_schema = arrow_schema
+        self.converters = converters
+
+
+async def prepare_export(
+    engine: AsyncEngine,
+    schema: str,
+    table: str,
+    projection: Optional[List[str]],
+    filters: Any,
+) -> ExportPlan:
+    """Resolve columns and their Arrow types; raises ValueError on bad input."""
+    identifier = table_identifier(schema, table)
+    where_sql, params = build_where(filters)
+    async with engine.connect() as conn:
+        types = await column_types(conn, schema, table)
+    if not types:
+        raise ValueError("Table not found or has no columns")
+    if projection:
+        known = dict(types)
+        unknown = [c for c in projection if c not in known]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        types = [(c, known[c]) for c in projection]
+
+    fields = []
+    converters: List[Optional[Callable[[Any], Any]]] = []
+    for name, typname in types:
+        arrow, convert = arrow_type(typname)
+        fields.append(pa.field(name, arrow))
+        converters.append(convert)
+    select_sql = (
+        f"SELECT {', '.join(quote_ident(name) for name, _ in types)} FROM {identifier} WHERE {where_sql}"
+    )
+    return ExportPlan(select_sql, params, pa.schema(fields), converters)
+
+
+def _record_batch(plan: ExportPlan, rows: List[Any]) -> Any:
+    arrays = []
+    for idx, field in enumerate(plan.arrow_schema):
+        convert = plan.converters[idx]
+        values = [r[idx] for r in rows]
+        if convert is not None:
+            values = [None if v is None else convert(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=plan.arrow_schema)
+
+
+async def stream_export(
+    engine: AsyncEngine,
+    plan: ExportPlan,
+    fmt: str,
+    batch_size: int,
+) -> AsyncIterator[bytes]:
+    """Yield the encoded file chunk by chunk, one record batch at a time."""
+    sink = _ChunkSink()
+    out = pa.PythonFile(sink, mode="w")
+    if fmt == "parquet":
+        writer: Any = pq.ParquetWriter(out, plan.arrow_schema)
+    else:
+        writer = pa.ipc.new_stream(out, plan.arrow_schema)
+    try:
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                text(plan.select_sql).execution_options(yield_per=batch_size), plan.params
+            )
+            async for partition in result.partitions(batch_size):
+                batch = _record_batch(plan, partition)
+                if fmt == "parquet":
+                    # one row group per batch keeps the writer's buffer bounded
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    finally:
+        writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
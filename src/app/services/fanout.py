@@ -0,0 +1,125 @@
+"""Run one read-only query or built-in probe against many connections.
+
+Every target runs in its own task under a process-wide semaphore
+(`fanout_max_concurrency`), inside a `READ ONLY` transaction with a
+`statement_timeout`, and additionally bounded by a client-side timeout that
+also covers connecting. Results are yielded in completion order, so a slow
+or dead database delays only its own entry; failures are reported per
+target instead of failing the whole request.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# {tenant_filter} is replaced with a schema condition when tenancy is enabled
+PROBES: Dict[str, str] = {
+    "tables": """
+        SELECT n.nspname AS schema, c.relname AS name
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+          AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+          AND n.nspname NOT LIKE 'pg_toast%'
+          {tenant_filter}
+        ORDER BY 1, 2
+    """,
+    "sizes": """
+        SELECT n.nspname AS schema, c.relname AS name,
+               pg_total_relation_size(c.oid) AS total_bytes,
+               pg_relation_size(c.oid) AS table_bytes
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+          AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+          AND n.nspname NOT LIKE 'pg_toast%'
+          {tenant_filter}
+        ORDER BY total_bytes DESC
+    """,
+    "row_estimates": """
+        SELECT n.nspname AS schema, c.relname AS name,
+               greatest(c.reltuples, 0)::bigint AS estimated_rows
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+          AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+          AND n.nspname NOT LIKE 'pg_toast%'
+          {tenant_filter}
+        ORDER BY estimated_rows DESC
+    """,
+}
+
+_semaphore = asyncio.Semaphore(settings.fanout_max_concurrency)
+
+
+class Target:
+    def __init__(self, conn_id: int, name: str, engine: Optional[AsyncEngine], unavailable: Optional[str] = None):
+        self.id = conn_id
+        self.name = name
+        self.engine = engine
+        # reason to skip the target without querying it (e.g. open breaker)
+        self.unavailable = unavailable
+
+
+def probe_sql(probe: str, tenant: Optional[str]) -> str:
+    """SQL of a built-in probe; raises ValueError for unknown probes."""
+    sql = PROBES.get(probe)
+    if sql is None:
+        raise ValueError(f"Unknown probe: {probe}. Expected one of: {', '.join(PROBES)}")
+    return sql.format(tenant_filter="AND n.nspname = :tenant" if tenant else "")
+
+
+async def _query(engine: AsyncEngine, sql: str, params: Dict[str, Any], timeout_ms: int, max_rows: int) -> Dict[str, Any]:
+    async with engine.connect() as conn:
+        # both must come first in the implicit transaction
+        await conn.execute(text("SET TRANSACTION READ ONLY"))
+        await conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        result = await conn.execute(text(sql), params)
+        rows = [dict(r) for r in result.mappings().fetchmany(max_rows + 1)]
+    return {"rows": rows[:max_rows], "truncated": len(rows) > max_rows}
+
+
+async def _run_target(target: Target, sql: str, params: Dict[str, Any], timeout_ms: int, max_rows: int) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"connection_id": target.id, "name": target.name}
+    if target.unavailable is not None or target.engine is None:
+        return {**item, "ok": False, "error": target.unavailable or "Unknown connection", "elapsed_ms": 0}
+    async with _semaphore:
+        started = time.perf_counter()
+        try:
+            # the server-side timeout does not cover connecting to a dead host
+            data = await asyncio.wait_for(
+                _query(target.engine, sql, params, timeout_ms, max_rows), timeout=timeout_ms / 1000 + 1
+            )
+        except asyncio.TimeoutError:
+            return {**item, "ok": False, "error": "Timed out", "elapsed_ms": _elapsed(started)}
+        except Exception as exc:
+            return {**item, "ok": False, "error": str(exc) or exc.__class__.__name__, "elapsed_ms": _elapsed(started)}
+    return {**item, "ok": True, **data, "elapsed_ms": _elapsed(started)}
+
+
+def _elapsed(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+async def fan_out(
+    targets: List[Target],
+    sql: str,
+    params: Dict[str, Any],
+    timeout_ms: int,
+    max_rows: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one result per target as soon as it finishes."""
+    tasks = [asyncio.create_task(_run_target(t, sql, params, timeout_ms, max_rows)) for t in targets]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # client went away: stop querying the remaining targets
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,112 @@
+"""Process-local registry of long-running admin operations.
+
+Jobs run as asyncio tasks; handlers start them and return immediately, the
+UI polls the job for progress and may cancel it. Like the connection
+registry in db_admin, state is in-memory and lost on restart.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for polling; the oldest are evicted beyond this number
+MAX_FINISHED_JOBS = 200
+
+
+class Job:
+    def __init__(self, job_id: int, kind: str, owner: str, params: Dict[str, Any]):
+        self.id = job_id
+        self.kind = kind
+        self.owner = owner
+        self.params = params
+        self.status = "pending"  # pending | running | done | failed | cancelled
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional["asyncio.Task[Any]"] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "owner": self.owner,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "elapsed_seconds": round(end - self.started_at, 3) if self.started_at else None,
+        }
+
+
+_jobs: Dict[int, Job] = {}
+_next_job_id: int = 1
+
+
+def _evict_finished() -> None:
+    finished = [j for j in _jobs.values() if j.finished]
+    overflow = len(finished) - MAX_FINISHED_JOBS
+    if overflow <= 0:
+        return
+    for job in sorted(finished, key=lambda j: j.finished_at or 0)[:overflow]:
+        _jobs.pop(job.id, None)
+
+
+async def _run(job: Job, runner: Callable[[Job], Awaitable[Any]]) -> None:
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        job.result = await runner(job)
+        job.status = "done"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+    except Exception as exc:
+        logger.warning("Job %s (%s) failed: %s", job.id, job.kind, exc)
+        job.status = "failed"
+        job.error = str(exc)
+    finally:
+        job.finished_at = time.time()
+        _evict_finished()
+
+
+def start_job(
+    kind: str,
+    owner: str,
+    params: Dict[str, Any],
+    runner: Callable[[Job], Awaitable[Any]],
+) -> Job:
+    """Register a job and schedule runner(job) on the running event loop."""
+    global _next_job_id
+    job = Job(_next_job_id, kind, owner, params)
+    _next_job_id += 1
+    _jobs[job.id] = job
+    job.task = asyncio.create_task(_run(job, runner))
+    return job
+
+
+def get_job(job_id: int) -> Optional[Job]:
+    return _jobs.get(job_id)
+
+
+def list_jobs(kind: Optional[str] = None) -> List[Job]:
+    return [j for j in _jobs.values() if kind is None or j.kind == kind]
+
+
+def cancel_job(job_id: int) -> bool:
+    """Request cancellation; returns False if the job is unknown or finished."""
+    job = _jobs.get(job_id)
+    if job is None or job.finished or job.task is None:
+        return False
+    job.task.cancel()
+    return True
@@ -0,0 +1,151 @@
+"""VACUUM / ANALYZE / REINDEX CONCURRENTLY of a table as background jobs.
+
+The command runs on its own autocommit connection (none of them may run in
+a transaction block) while a second connection polls the matching
+`pg_stat_progress_*` view by the backend pid and publishes it in
+job.progress. `VACUUM (ANALYZE)` leaves `pg_stat_progress_vacuum` for its
+final analyze pass, which is then followed in `pg_stat_progress_analyze`. Cancelling the job cancels the backend with
+`pg_cancel_backend`, so the server stops working too, not just the client.
+
+At most `maintenance_max_per_database` operations run on one database at a
+time; further requests are refused rather than queued, since maintenance
+competes with the application for I/O.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services.db_utils import table_identifier
+from app.services.jobs import Job
+
+# operation -> SQL template; progress comes from the matching pg_stat_progress_* view
+OPERATIONS: Dict[str, str] = {
+    "vacuum": "VACUUM (ANALYZE) {table}",
+    "analyze": "ANALYZE {table}",
+    "reindex": "REINDEX TABLE CONCURRENTLY {table}",
+}
+PROGRESS_Q: Dict[str, Any] = {
+    "vacuum": text(
+        """
+        SELECT phase, heap_blks_total AS total, heap_blks_vacuumed AS done,
+               heap_blks_scanned AS scanned, index_vacuum_count
+        FROM pg_stat_progress_vacuum WHERE pid = :pid
+        """
+    ),
+    "analyze": text(
+        """
+        SELECT phase, sample_blks_total AS total, sample_blks_scanned AS done,
+               child_tables_total, child_tables_done
+        FROM pg_stat_progress_analyze WHERE pid = :pid
+        """
+    ),
+    "reindex": text(
+        """
+        SELECT phase, blocks_total AS total, blocks_done AS done,
+               tuples_total, tuples_done, partitions_total, partitions_done
+        FROM pg_stat_progress_create_index WHERE pid = :pid
+        """
+    ),
+}
+# progress views polled per operation, in the order the command goes through them
+PROGRESS_VIEWS: Dict[str, Tuple[str, ...]] = {
+    "vacuum": ("vacuum", "analyze"),
+    "analyze": ("analyze",),
+    "reindex": ("reindex",),
+}
+TABLE_STATS_Q = text(
+    """
+    SELECT s.n_live_tup AS live_tuples, s.n_dead_tup AS dead_tuples,
+           pg_total_relation_size(s.relid) AS total_bytes,
+           s.last_vacuum, s.last_autovacuum, s.last_analyze, s.last_autoanalyze
+    FROM pg_stat_user_tables s
+    WHERE s.relid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+    """
+)
+
+_running: Dict[Hashable, int] = {}
+
+
+def try_reserve(conn_key: Hashable, limit: int) -> bool:
+    """Take a maintenance slot of the database; False if all are busy."""
+    if _running.get(conn_key, 0) >= limit:
+        return False
+    _running[conn_key] = _running.get(conn_key, 0) + 1
+    return True
+
+
+def release(conn_key: Hashable) -> None:
+    left = _running.get(conn_key, 0) - 1
+    if left > 0:
+        _running[conn_key] = left
+    else:
+        _running.pop(conn_key, None)
+
+
+def running(conn_key: Hashable) -> int:
+    return _running.get(conn_key, 0)
+
+
+async def _table_stats(engine: AsyncEngine, schema: str, table: str) -> Optional[Dict[str, Any]]:
+    async with engine.connect() as conn:
+        row = (await conn.execute(TABLE_STATS_Q, {"schema": schema, "table": table})).mappings().first()
+    return dict(row) if row else None
+
+
+def _with_percent(progress: Dict[str, Any]) -> Dict[str, Any]:
+    total, done = progress.get("total"), progress.get("done")
+    progress["percent"] = round(done * 100.0 / total, 1) if total and done is not None else None
+    return progress
+
+
+async def run_maintenance(
+    job: Job,
+    engine: AsyncEngine,
+    schema: str,
+    table: str,
+    operation: str,
+    poll_seconds: float,
+) -> Dict[str, Any]:
+    sql = text(OPERATIONS[operation].format(table=table_identifier(schema, table)))
+    before = await _table_stats(engine, schema, table)
+    job.progress = {"operation": operation, "phase": "starting", "percent": None}
+    started = time.monotonic()
+
+    async with engine.connect() as worker, engine.connect() as monitor:
+        worker = await worker.execution_options(isolation_level="AUTOCOMMIT")
+        monitor = await monitor.execution_options(isolation_level="AUTOCOMMIT")
+        pid = (await worker.execute(text("SELECT pg_backend_pid()"))).scalar_one()
+        command = asyncio.create_task(worker.execute(sql))
+        try:
+            while not command.done():
+                await asyncio.wait({command}, timeout=poll_seconds)
+                if command.done():
+                    break
+                for view in PROGRESS_VIEWS[operation]:
+                    row = (await monitor.execute(PROGRESS_Q[view], {"pid": pid})).mappings().first()
+                    if row is not None:
+                        job.progress = {"operation": operation, **_with_percent(dict(row))}
+                        break
+            await command
+        except BaseException:
+            # job cancelled or progress polling failed: stop the server-side
+            # work too, not only our wait for it
+            if not command.done():
+                try:
+                    await monitor.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": pid})
+                except Exception:
+                    pass
+                command.cancel()
+                await asyncio.gather(command, return_exceptions=True)
+            raise
+
+    job.progress = {"operation": operation, "phase": "done", "percent": 100.0}
+    return {
+        "operation": operation,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "before": before,
+        "after": await _table_stats(engine, schema, table),
+    }
@@ -0,0 +1,306 @@
+"""Pre-flight analysis and lock-aware execution of pending Alembic revisions.
+
+Pending revisions are rendered to SQL with Alembic's offline mode
+(`upgrade --sql`), so nothing touches the database while planning. Every
+statement is classified by the lock it takes and by the work it does under
+that lock (metadata only, full scan, table rewrite, index build), weighted
+with the size of the table from the catalog.
+
+Guarded execution runs exactly that SQL. Each statement gets `lock_timeout`
+and `statement_timeout`; when a lock cannot be acquired in time the current
+transaction block (or the single statement outside a block) is rolled back
+and retried with exponential backoff, so a migration queued behind a long
+transaction gives up its place in the lock queue instead of stalling every
+query on the table behind it. Nothing is held while backing off.
+"""
+import asyncio
+import io
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+VERSION_TABLE_Q = text("SELECT to_regclass('alembic_version') IS NOT NULL")
+CURRENT_REVISION_Q = text("SELECT version_num FROM alembic_version")
+TABLE_SIZES_Q = text(
+    """
+    SELECT t.name, pg_total_relation_size(c.oid) AS bytes, greatest(c.reltuples, 0)::bigint AS rows
+    FROM unnest(CAST(:names AS text[])) AS t(name)
+    JOIN pg_class c ON c.oid = to_regclass(t.name)
+    """
+)
+
+# Lock levels in increasing strength; the first three let reads and writes go on
+LOCKS = (
+    "ACCESS SHARE",
+    "ROW EXCLUSIVE",
+    "SHARE UPDATE EXCLUSIVE",
+    "SHARE",
+    "SHARE ROW EXCLUSIVE",
+    "ACCESS EXCLUSIVE",
+)
+# cost: none | metadata | scan | rewrite | index_build | dml | unknown
+_IDENT = r'((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)'
+RULES: List[Tuple[re.Pattern, str, str]] = [
+    (re.compile(rf"^CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?{_IDENT}", re.I), "ACCESS EXCLUSIVE", "none"),
+    (re.compile(rf"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+.*?\bON\s+(?:ONLY\s+)?{_IDENT}", re.I | re.S), "SHARE UPDATE EXCLUSIVE", "index_build"),
+    (re.compile(rf"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+.*?\bON\s+(?:ONLY\s+)?{_IDENT}", re.I | re.S), "SHARE", "index_build"),
+    (re.compile(rf"^DROP\s+INDEX\s+CONCURRENTLY\s+(?:IF\s+EXISTS\s+)?{_IDENT}", re.I), "SHARE UPDATE EXCLUSIVE", "metadata"),
+    (re.compile(rf"^DROP\s+INDEX\s+(?:IF\s+EXISTS\s+)?{_IDENT}", re.I), "ACCESS EXCLUSIVE", "metadata"),
+    (re.compile(rf"^(?:DROP|TRUNCATE)\s+(?:TABLE\s+)?(?:IF\s+EXISTS\s+)?{_IDENT}", re.I), "ACCESS EXCLUSIVE", "metadata"),
+    (re.compile(rf"^(?:VACUUM\s+FULL|CLUSTER)\s+(?:\w+\s+)*?{_IDENT}", re.I), "ACCESS EXCLUSIVE", "rewrite"),
+    (re.compile(rf"^INSERT\s+INTO\s+{_IDENT}", re.I), "ROW EXCLUSIVE", "dml"),
+    (re.compile(rf"^UPDATE\s+{_IDENT}", re.I), "ROW EXCLUSIVE", "dml"),
+    (re.compile(rf"^DELETE\s+FROM\s+{_IDENT}", re.I), "ROW EXCLUSIVE", "dml"),
+]
+ALTER_TABLE = re.compile(rf"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?{_IDENT}\s+(.*)$", re.I | re.S)
+# ALTER TABLE subcommands, most expensive first; the first match wins
+ALTER_RULES: List[Tuple[re.Pattern, str, str]] = [
+    (re.compile(r"\bALTER\s+(?:COLUMN\s+)?\S+\s+(?:SET\s+DATA\s+)?TYPE\b", re.I), "ACCESS EXCLUSIVE", "rewrite"),
+    (re.compile(r"\bADD\s+(?:COLUMN\s+)?.*\bDEFAULT\s+.*\b(?:now|random|gen_random_uuid|uuid_generate_v4|clock_timestamp|nextval)\s*\(", re.I | re.S), "ACCESS EXCLUSIVE", "rewrite"),
+    (re.compile(r"\bADD\s+(?:CONSTRAINT\s+\S+\s+)?(?:PRIMARY\s+KEY|UNIQUE)\s*\(", re.I), "ACCESS EXCLUSIVE", "index_build"),
+    (re.compile(r"\bADD\s+(?:CONSTRAINT\s+\S+\s+)?FOREIGN\s+KEY\b(?!.*\bNOT\s+VALID\b)", re.I | re.S), "SHARE ROW EXCLUSIVE", "scan"),
+    (re.compile(r"\bADD\s+(?:CONSTRAINT\s+\S+\s+)?CHECK\b(?!.*\bNOT\s+VALID\b)", re.I | re.S), "ACCESS EXCLUSIVE", "scan"),
+    (re.compile(r"\bSET\s+NOT\s+NULL\b", re.I), "ACCESS EXCLUSIVE", "scan"),
+    (re.compile(r"\bVALIDATE\s+CONSTRAINT\b", re.I), "SHARE UPDATE EXCLUSIVE", "scan"),
+    (re.compile(r"\bADD\s+(?:CONSTRAINT\s+\S+\s+)?FOREIGN\s+KEY\b", re.I), "SHARE ROW EXCLUSIVE", "metadata"),
+]
+
+
+class Statement:
+    def __init__(self, sql: str, revision: Optional[str]):
+        self.sql = sql
+        self.revision = revision
+        self.lock: Optional[str] = None
+        self.cost = "unknown"
+        self.table: Optional[str] = None
+
+    @property
+    def keyword(self) -> str:
+        return self.sql.split(None, 1)[0].upper().rstrip(";") if self.sql else ""
+
+
+def split_statements(sql: str) -> List[Statement]:
+    """Split `alembic upgrade --sql` output into statements with their revision.
+
+    Offline output ends every statement with ";" followed by a blank line;
+    dollar-quoted bodies (functions, DO blocks) are kept whole.
+    """
+    statements: List[Statement] = []
+    revision: Optional[str] = None
+    buf: List[str] = []
+    in_dollar = False
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not buf and stripped.startswith("-- Running upgrade"):
+            revision = stripped.rsplit("->", 1)[-1].strip()
+            continue
+        if not buf and (not stripped or stripped.startswith("--")):
+            continue
+        buf.append(line)
+        if line.count("$$") % 2:
+            in_dollar = not in_dollar
+        if not in_dollar and stripped.endswith(";"):
+            statements.append(Statement("\n".join(buf).strip().rstrip(";").strip(), revision))
+            buf = []
+    if buf:
+        statements.append(Statement("\n".join(buf).strip().rstrip(";").strip(), revision))
+    return statements
+
+
+def classify(stmt: Statement) -> None:
+    """Set lock level, cost class and target table of a statement."""
+    sql = stmt.sql.strip()
+    match = ALTER_TABLE.match(sql)
+    if match:
+        stmt.table = match.group(1)
+        action = match.group(2)
+        # rename, drop column, plain add column etc.: catalog change under ACCESS EXCLUSIVE
+        stmt.lock, stmt.cost = "ACCESS EXCLUSIVE", "metadata"
+        for pattern, lock, cost in ALTER_RULES:
+            if pattern.search(action):
+                stmt.lock, stmt.cost = lock, cost
+                break
+        return
+    for pattern, lock, cost in RULES:
+        match = pattern.match(sql)
+        if match:
+            stmt.table, stmt.lock, stmt.cost = match.group(1), lock, cost
+            return
+
+
+def risk(stmt: Statement, table_bytes: Optional[int], large_table_bytes: int) -> str:
+    """low | medium | high for running the statement on a live database."""
+    if stmt.lock is None:
+        return "medium"
+    if table_bytes is None or stmt.cost == "none":
+        # table created by this very migration or not in the catalog
+        return "low"
+    blocks_writes = LOCKS.index(stmt.lock) >= LOCKS.index("SHARE")
+    heavy = stmt.cost in ("scan", "rewrite", "index_build", "dml")
+    if blocks_writes and heavy:
+        return "high" if table_bytes >= large_table_bytes else "medium"
+    if stmt.lock == "ACCESS EXCLUSIVE":
+        # short, but queues behind long transactions and blocks readers meanwhile
+        return "medium"
+    return "medium" if heavy and table_bytes >= large_table_bytes else "low"
+
+
+def _normalize(name: str) -> str:
+    return ".".join(p if p.startswith('"') else p.lower() for p in name.split("."))
+
+
+async def current_revisions(engine: AsyncEngine) -> List[str]:
+    async with engine.connect() as conn:
+        if not (await conn.execute(VERSION_TABLE_Q)).scalar_one():
+            return []
+        result = await conn.execute(CURRENT_REVISION_Q)
+        return [r[0] for r in result.fetchall()]
+
+
+def pending_revisions(cfg: Config, current: List[str]) -> List[str]:
+    """Revisions between the database version and head, oldest first."""
+    script = ScriptDirectory.from_config(cfg)
+    lower = current[0] if current else None
+    return [r.revision for r in reversed(list(script.iterate_revisions("heads", lower)))]
+
+
+def render_upgrade_sql(cfg: Config, current: List[str]) -> str:
+    """`alembic upgrade <current>:head --sql` as a string (no database access)."""
+    buf = io.StringIO()
+    # env.py takes the database URL from settings, the file is all we need
+    offline = Config(cfg.config_file_name, output_buffer=buf)
+    start = f"{current[0]}:" if current else ""
+    command.upgrade(offline, f"{start}head", sql=True)
+    return buf.getvalue()
+
+
+async def preflight(engine: AsyncEngine, cfg: Config, large_table_bytes: int) -> Dict[str, Any]:
+    """Render, classify and size every pending statement."""
+    current = await current_revisions(engine)
+    pending = await asyncio.to_thread(pending_revisions, cfg, current)
+    if not pending:
+        return {"current": current, "pending": [], "statements": [], "risk": "low"}
+    sql = await asyncio.to_thread(render_upgrade_sql, cfg, current)
+    statements = [s for s in split_statements(sql) if s.keyword not in ("BEGIN", "COMMIT")]
+    for stmt in statements:
+        classify(stmt)
+
+    names = sorted({_normalize(s.table) for s in statements if s.table})
+    sizes: Dict[str, Tuple[int, int]] = {}
+    if names:
+        async with engine.connect() as conn:
+            result = await conn.execute(TABLE_SIZES_Q, {"names": names})
+            sizes = {r[0]: (r[1], r[2]) for r in result.fetchall()}
+
+    created = set()
+    items: List[Dict[str, Any]] = []
+    for stmt in statements:
+        table = _normalize(stmt.table) if stmt.table else None
+        size = sizes.get(table) if table and table not in created else None
+        if stmt.cost == "none" and table:
+            created.add(table)
+        items.append(
+            {
+                "revision": stmt.revision,
+                "sql": stmt.sql,
+                "table": table,
+                "lock": stmt.lock,
+                "cost": stmt.cost,
+                "table_bytes": size[0] if size else None,
+                "table_rows": size[1] if size else None,
+                "risk": risk(stmt, size[0] if size else None, large_table_bytes),
+            }
+        )
+    order = ("low", "medium", "high")
+    overall = max((i["risk"] for i in items), key=order.index, default="low")
+    return {"current": current, "pending": pending, "statements": items, "risk": overall}
+
+
+class LockRetriesExhausted(Exception):
+    def __init__(self, statement: str, attempts: int):
+        super().__init__(f"Lock not acquired after {attempts} attempts: {statement[:200]}")
+        self.statement = statement
+        self.attempts = attempts
+
+
+def _blocks(statements: List[Statement]) -> List[Tuple[bool, List[Statement]]]:
+    """Group statements into (transactional, statements) units of retry."""
+    units: List[Tuple[bool, List[Statement]]] = []
+    block: Optional[List[Statement]] = None
+    for stmt in statements:
+        if stmt.keyword == "BEGIN":
+            block = []
+        elif stmt.keyword == "COMMIT":
+            if block:
+                units.append((True, block))
+            block = None
+        elif block is not None:
+            block.append(stmt)
+        else:
+            units.append((False, [stmt]))
+    if block:
+        units.append((True, block))
+    return units
+
+
+def _sqlstate(exc: BaseException) -> Optional[str]:
+    return getattr(exc, "sqlstate", None) or getattr(getattr(exc, "orig", None), "sqlstate", None)
+
+
+async def run_guarded(
+    engine: AsyncEngine,
+    cfg: Config,
+    lock_timeout_ms: int,
+    statement_timeout_ms: int,
+    retries: int,
+    backoff_ms: int,
+) -> Dict[str, Any]:
+    """Apply the rendered upgrade SQL with lock/statement timeouts and retries."""
+    current = await current_revisions(engine)
+    pending = await asyncio.to_thread(pending_revisions, cfg, current)
+    if not pending:
+        return {"applied": [], "statements": 0, "retries": 0}
+    sql = await asyncio.to_thread(render_upgrade_sql, cfg, current)
+    units = _blocks(split_statements(sql))
+
+    total_retries = 0
+    executed = 0
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        # rendered SQL carries literal values only: run it as-is on the driver
+        driver = (await conn.get_raw_connection()).driver_connection
+        await driver.execute(f"SET lock_timeout = {int(lock_timeout_ms)}")
+        await driver.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+        try:
+            for transactional, stmts in units:
+                attempt = 0
+                while True:
+                    attempt += 1
+                    current_stmt = stmts[0]
+                    try:
+                        if transactional:
+                            async with driver.transaction():
+                                for current_stmt in stmts:
+                                    await driver.execute(current_stmt.sql)
+                        else:
+                            await driver.execute(current_stmt.sql)
+                        executed += len(stmts)
+                        break
+                    except Exception as exc:
+                        if _sqlstate(exc) != LOCK_NOT_AVAILABLE:
+                            raise
+                        if attempt > retries:
+                            raise LockRetriesExhausted(current_stmt.sql, attempt) from exc
+                        total_retries += 1
+                        # the block was rolled back: nothing is locked while waiting
+                        await asyncio.sleep(min(backoff_ms * 2 ** (attempt - 1), 30_000) / 1000)
+        finally:
+            await driver.execute("RESET lock_timeout; RESET statement_timeout")
+    return {"applied": pending, "statements": executed, "retries": total_retries}
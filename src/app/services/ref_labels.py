@@ -0,0 +1,159 @@
+"""Foreign keys of a table and display labels of the rows they reference.
+
+`resolve_labels()` turns the foreign key values of a page of rows into short
+labels (e.g. a customer's name instead of `customer_id = 42`): keys are
+grouped per referenced table and fetched with one `WHERE pk = ANY(:keys)`
+query each, never one query per row. The label column of a referenced table
+is its first text column named like a label ("name", "title", ...) or else
+its first text column. Resolved labels are kept in a small TTL/LRU cache;
+db_admin invalidates a table's entries when it modifies that table.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.services.db_utils import quote_ident, table_identifier
+
+REFS_KEY = "_refs"
+
+# preferred label columns, in order of preference
+LABEL_CANDIDATES = ("name", "title", "label", "display_name", "full_name", "email", "username", "code", "slug")
+MAX_LABEL_LENGTH = 200
+
+CACHE_SIZE = 5000
+CACHE_TTL_SECONDS = 60.0
+
+# Foreign keys with referenced table and its text columns (label candidates)
+FOREIGN_KEYS_SQL = """
+    SELECT
+      co.conname AS name,
+      ARRAY(
+        SELECT a.attname
+        FROM unnest(co.conkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = co.conrelid AND a.attnum = k.attnum
+        ORDER BY k.ord
+      ) AS columns,
+      rn.nspname AS ref_schema,
+      rc.relname AS ref_table,
+      ARRAY(
+        SELECT a.attname
+        FROM unnest(co.confkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = co.confrelid AND a.attnum = k.attnum
+        ORDER BY k.ord
+      ) AS ref_columns,
+      ARRAY(
+        SELECT a.attname
+        FROM pg_attribute a
+        JOIN pg_type t ON t.oid = a.atttypid
+        WHERE a.attrelid = co.confrelid
+          AND a.attnum > 0
+          AND NOT a.attisdropped
+          AND t.typname IN ('text', 'varchar', 'bpchar', 'citext', 'name')
+        ORDER BY a.attnum
+      ) AS ref_text_columns
+    FROM pg_constraint co
+    JOIN pg_class rc ON rc.oid = co.confrelid
+    JOIN pg_namespace rn ON rn.oid = rc.relnamespace
+    WHERE co.conrelid = to_regclass(quote_ident(:schema) || '.' || quote_ident(:table))
+      AND co.contype = 'f'
+    ORDER BY co.conname
+"""
+FOREIGN_KEYS_Q = text(FOREIGN_KEYS_SQL)
+
+
+async def fetch_foreign_keys(conn: AsyncConnection, schema: str, table: str) -> List[Dict[str, Any]]:
+    result = await conn.execute(FOREIGN_KEYS_Q, {"schema": schema, "table": table})
+    return [dict(r) for r in result.mappings().all()]
+
+
+def pick_label_column(text_columns: List[str]) -> Optional[str]:
+    for candidate in LABEL_CANDIDATES:
+        if candidate in text_columns:
+            return candidate
+    return text_columns[0] if text_columns else None
+
+
+class LabelCache:
+    """Labels by (connection, schema, table, key) with TTL and LRU eviction."""
+
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL_SECONDS) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Optional[str]]]" = OrderedDict()
+
+    def get_many(self, table_key: Tuple[Hashable, ...], keys: Iterable[Any]) -> Tuple[Dict[Any, Optional[str]], List[Any]]:
+        """Return ({key: label} found in the cache, keys that are missing)."""
+        now = time.monotonic()
+        found: Dict[Any, Optional[str]] = {}
+        missing: List[Any] = []
+        for key in keys:
+            item = self._items.get((*table_key, key))
+            if item is None or item[0] < now:
+                missing.append(key)
+                continue
+            self._items.move_to_end((*table_key, key))
+            found[key] = item[1]
+        return found, missing
+
+    def put_many(self, table_key: Tuple[Hashable, ...], labels: Dict[Any, Optional[str]]) -> None:
+        expires = time.monotonic() + self.ttl
+        for key, label in labels.items():
+            self._items[(*table_key, key)] = (expires, label)
+            self._items.move_to_end((*table_key, key))
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, table_key: Tuple[Hashable, ...]) -> None:
+        size = len(table_key)
+        for key in [k for k in self._items if k[:size] == table_key]:
+            del self._items[key]
+
+
+label_cache = LabelCache()
+
+
+async def resolve_labels(
+    conn: AsyncConnection,
+    conn_key: Hashable,
+    schema: str,
+    table: str,
+    rows: List[Dict[str, Any]],
+) -> None:
+    """Add {fk column: label} under "_refs" to every row of the page.
+
+    Only single-column foreign keys present in the rows are resolved; a
+    label is None if the referenced row or a label column does not exist.
+    """
+    foreign_keys = await fetch_foreign_keys(conn, schema, table)
+    # (ref schema, ref table, ref column, label column) -> fk columns referencing it
+    groups: Dict[Tuple[str, str, str, str], List[str]] = {}
+    for fk in foreign_keys:
+        if len(fk["columns"]) != 1:
+            continue
+        column = fk["columns"][0]
+        label_column = pick_label_column(list(fk["ref_text_columns"]))
+        if label_column is None or not any(column in row for row in rows):
+            continue
+        groups.setdefault((fk["ref_schema"], fk["ref_table"], fk["ref_columns"][0], label_column), []).append(column)
+
+    for (ref_schema, ref_table, ref_column, label_column), columns in groups.items():
+        keys = {row[c] for row in rows for c in columns if row.get(c) is not None}
+        table_key = (conn_key, ref_schema, ref_table)
+        labels, missing = label_cache.get_many(table_key, keys)
+        if missing:
+            q = text(
+                f"SELECT {quote_ident(ref_column)} AS key, left({quote_ident(label_column)}::text, :max_length) AS label "
+                f"FROM {table_identifier(ref_schema, ref_table)} WHERE {quote_ident(ref_column)} = ANY(:keys)"
+            )
+            result = await conn.execute(q, {"keys": missing, "max_length": MAX_LABEL_LENGTH})
+            fetched: Dict[Any, Optional[str]] = {key: None for key in missing}
+            fetched.update({r[0]: r[1] for r in result.fetchall()})
+            label_cache.put_many(table_key, fetched)
+            labels.update(fetched)
+        for row in rows:
+            for c in columns:
+                if row.get(c) is not None:
+                    row.setdefault(REFS_KEY, {})[c] = labels.get(row[c])
@@ -0,0 +1,89 @@
+"""Shared cache of read_table results for hot table pages.
+
+Entries are keyed by the table (connection, schema, table) and the shape of
+the query (columns, preview, labels, offset, limit), expire after a TTL and
+are evicted least-recently-used beyond `max_entries`. Identical concurrent
+requests are coalesced: the first one starts the load in a task of its own,
+the others await the same task, so a page is read once however many admins
+open it at the same moment.
+
+`invalidate()` drops every entry of a table and bumps its generation, so a
+load that was already running when the table changed does not store its
+now stale result.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+TableKey = Tuple[Hashable, ...]
+
+
+class ResultCache:
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[TableKey, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[TableKey, Hashable], "asyncio.Task[Any]"] = {}
+        self._generations: Dict[TableKey, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(
+        self,
+        table_key: TableKey,
+        shape_key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, str]:
+        """Return (value, "hit" | "miss" | "coalesced")."""
+        key = (table_key, shape_key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], "hit"
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # shield: a waiter going away must not cancel the shared load
+            return await asyncio.shield(task), "coalesced"
+
+        self.misses += 1
+        generation = self._generations.get(table_key, 0)
+        task = asyncio.create_task(loader())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+            else:
+                # the requester was cancelled; drop the slot once the load ends
+                task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        if self._generations.get(table_key, 0) == generation:
+            self._store(key, value)
+        return value, "miss"
+
+    def _store(self, key: Tuple[TableKey, Hashable], value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, table_key: TableKey) -> None:
+        self._generations[table_key] = self._generations.get(table_key, 0) + 1
+        for key in [k for k in self._entries if k[0] == table_key]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
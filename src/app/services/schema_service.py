@@ -0,0 +1,261 @@
+"""Versioned schema snapshots of a database with incremental sync.
+
+A single catalog query computes a signature per table from `pg_class`,
+`pg_attribute`, `pg_attrdef`, `pg_constraint` and `pg_index`. Only tables
+whose signature changed since the last call are re-read, so keeping the
+snapshot current costs one query when nothing changed. The snapshot version
+is a hash over all table signatures; recent versions are remembered so a
+client can ask for just the tables that changed since the version it has.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Versions kept per connection for delta requests
+MAX_VERSIONS = 20
+# Caches kept at most (one per connection and tenant schema), least recently used evicted
+MAX_CACHES = 500
+
+FINGERPRINT_SQL = """
+    SELECT
+      c.oid,
+      n.nspname AS schema,
+      c.relname AS name,
+      md5(
+        coalesce((
+          SELECT string_agg(
+                   a.attname || ':' || format_type(a.atttypid, a.atttypmod) || ':' || a.attnotnull
+                   || ':' || coalesce(pg_get_expr(d.adbin, d.adrelid), ''),
+                   ',' ORDER BY a.attnum)
+          FROM pg_attribute a
+          LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+          WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        ), '')
+        || '|' || coalesce((
+          SELECT string_agg(co.conname || ':' || pg_get_constraintdef(co.oid), ',' ORDER BY co.conname)
+          FROM pg_constraint co
+          WHERE co.conrelid = c.oid
+        ), '')
+        || '|' || coalesce((
+          SELECT string_agg(pg_get_indexdef(i.indexrelid), ',' ORDER BY i.indexrelid)
+          FROM pg_index i
+          WHERE i.indrelid = c.oid
+        ), '')
+      ) AS sig
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname NOT LIKE 'pg_toast%'
+    """
+FINGERPRINT_Q = text(FINGERPRINT_SQL)
+# the same restricted to one (tenant) schema
+FINGERPRINT_SCHEMA_Q = text(FINGERPRINT_SQL + "  AND n.nspname = :schema\n")
+
+COLUMNS_Q = text(
+    """
+    SELECT
+      a.attrelid AS oid,
+      a.attname AS name,
+      format_type(a.atttypid, a.atttypmod) AS data_type,
+      NOT a.attnotnull AS is_nullable,
+      pg_get_expr(d.adbin, d.adrelid) AS column_default
+    FROM pg_attribute a
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE a.attrelid = ANY(:oids) AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attrelid, a.attnum
+    """
+)
+
+CONSTRAINTS_Q = text(
+    """
+    SELECT
+      co.conrelid AS oid,
+      co.conname AS name,
+      co.contype AS kind,
+      ARRAY(
+        SELECT a.attname
+        FROM unnest(co.conkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = co.conrelid AND a.attnum = k.attnum
+        ORDER BY k.ord
+      ) AS columns,
+      fn.nspname AS ref_schema,
+      fc.relname AS ref_table,
+      ARRAY(
+        SELECT a.attname
+        FROM unnest(co.confkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = co.confrelid AND a.attnum = k.attnum
+        ORDER BY k.ord
+      ) AS ref_columns
+    FROM pg_constraint co
+    LEFT JOIN pg_class fc ON fc.oid = co.confrelid
+    LEFT JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+    WHERE co.conrelid = ANY(:oids) AND co.contype IN ('p', 'u', 'f')
+    ORDER BY co.conrelid, co.conname
+    """
+)
+
+INDEXES_Q = text(
+    """
+    SELECT
+      i.indrelid AS oid,
+      ic.relname AS name,
+      i.indisunique AS is_unique,
+      i.indisprimary AS is_primary,
+      pg_get_indexdef(i.indexrelid) AS definition
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    WHERE i.indrelid = ANY(:oids)
+    ORDER BY i.indrelid, ic.relname
+    """
+)
+
+
+async def load_tables(conn: AsyncConnection, oids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Read full metadata (columns, keys, indexes, foreign keys) for tables by oid."""
+    tables: Dict[int, Dict[str, Any]] = {
+        oid: {"columns": [], "primary_key": [], "unique_indexes": [], "foreign_keys": [], "indexes": []}
+        for oid in oids
+    }
+    if not oids:
+        return tables
+
+    for row in (await conn.execute(COLUMNS_Q, {"oids": oids})).mappings():
+        tables[row["oid"]]["columns"].append(
+            {
+                "name": row["name"],
+                "data_type": row["data_type"],
+                "is_nullable": bool(row["is_nullable"]),
+                "has_default": row["column_default"] is not None,
+                "default": row["column_default"],
+                "is_primary_key": False,
+                "is_unique": False,
+            }
+        )
+
+    for row in (await conn.execute(CONSTRAINTS_Q, {"oids": oids})).mappings():
+        table = tables[row["oid"]]
+        if row["kind"] == "p":
+            table["primary_key"] = list(row["columns"])
+        elif row["kind"] == "u":
+            table["unique_indexes"].append({"name": row["name"], "columns": list(row["columns"])})
+        else:
+            table["foreign_keys"].append(
+                {
+                    "name": row["name"],
+                    "columns": list(row["columns"]),
+                    "ref_schema": row["ref_schema"],
+                    "ref_table": row["ref_table"],
+                    "ref_columns": list(row["ref_columns"]),
+                }
+            )
+
+    for row in (await conn.execute(INDEXES_Q, {"oids": oids})).mappings():
+        tables[row["oid"]]["indexes"].append(
+            {
+                "name": row["name"],
+                "is_unique": bool(row["is_unique"]),
+                "is_primary": bool(row["is_primary"]),
+                "definition": row["definition"],
+            }
+        )
+
+    for table in tables.values():
+        pk_set = set(table["primary_key"])
+        uniq_cols = {c for u in table["unique_indexes"] for c in u["columns"]}
+        for col in table["columns"]:
+            col["is_primary_key"] = col["name"] in pk_set
+            col["is_unique"] = col["name"] in uniq_cols
+    return tables
+
+
+def _version(signatures: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for full_name in sorted(signatures):
+        digest.update(f"{full_name}={signatures[full_name]};".encode())
+    return digest.hexdigest()[:16]
+
+
+class SchemaCache:
+    """Current snapshot of one database plus signatures of recent versions."""
+
+    def __init__(self, schema: Optional[str] = None) -> None:
+        self.schema = schema
+        self.version: Optional[str] = None
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.signatures: Dict[str, str] = {}
+        self.history: Dict[str, Dict[str, str]] = {}
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, conn: AsyncConnection) -> None:
+        async with self._lock:
+            if self.schema is None:
+                rows = (await conn.execute(FINGERPRINT_Q)).mappings().all()
+            else:
+                rows = (await conn.execute(FINGERPRINT_SCHEMA_Q, {"schema": self.schema})).mappings().all()
+            current: Dict[str, str] = {}
+            stale: Dict[int, Dict[str, Any]] = {}
+            for row in rows:
+                full_name = f"{row['schema']}.{row['name']}"
+                current[full_name] = row["sig"]
+                if self.signatures.get(full_name) != row["sig"]:
+                    stale[row["oid"]] = {"schema": row["schema"], "name": row["name"], "full_name": full_name}
+
+            loaded = await load_tables(conn, list(stale))
+            for oid, ident in stale.items():
+                self.tables[ident["full_name"]] = {**ident, **loaded[oid]}
+            for full_name in set(self.tables) - set(current):
+                del self.tables[full_name]
+
+            self.signatures = current
+            self.version = _version(current)
+            # a version seen before (e.g. a change that was undone) becomes the newest again
+            self.history.pop(self.version, None)
+            self.history[self.version] = current
+            while len(self.history) > MAX_VERSIONS:
+                # dicts keep insertion order: drop the oldest version
+                del self.history[next(iter(self.history))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "tables": [self.tables[name] for name in sorted(self.tables)],
+        }
+
+    def delta(self, since: str) -> Dict[str, Any]:
+        """Tables changed/removed since a known version, or a full snapshot."""
+        old = self.history.get(since)
+        if old is None:
+            return {"full": True, **self.snapshot()}
+        changed = [
+            self.tables[name]
+            for name in sorted(self.signatures)
+            if old.get(name) != self.signatures[name]
+        ]
+        removed = sorted(set(old) - set(self.signatures))
+        return {"full": False, "since": since, "version": self.version, "changed": changed, "removed": removed}
+
+
+_caches: "OrderedDict[Tuple[Any, Optional[str]], SchemaCache]" = OrderedDict()
+
+
+def get_schema_cache(conn_key: Any, schema: Optional[str] = None) -> SchemaCache:
+    """Cache of one connection, or of one schema of it (tenant-scoped)."""
+    key = (conn_key, schema)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = SchemaCache(schema)
+        while len(_caches) > MAX_CACHES:
+            _caches.popitem(last=False)
+    else:
+        _caches.move_to_end(key)
+    return cache
+
+
+def drop_schema_cache(conn_key: Any) -> None:
+    for key in [k for k in _caches if k[0] == conn_key]:
+        del _caches[key]
@@ -0,0 +1,223 @@
+"""Text search inside a table.
+
+Text columns that have a pg_trgm (GIN/GiST `*_trgm_ops`) index are searched
+with fuzzy matching and ranked by `similarity()`; columns with the full-text
+index created by `create_search_index(kind="fts")` are searched with
+`plainto_tsquery` and ranked by `ts_rank`. Without any usable index the
+search falls back to an `ILIKE` scan over a bounded number of rows under a
+statement timeout, and the result is flagged as partial. The scan is read
+through a cursor in small steps, so when the timeout cancels a step the rows
+matched by the earlier steps are still returned.
+"""
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.services.db_utils import QUERY_CANCELED, quote_ident, sqlstate, table_identifier
+from app.services.jobs import Job
+
+TEXT_TYPES = ("text", "character varying", "character", "citext")
+
+FTS_CONFIG = "simple"
+
+# matches fetched per step of the fallback scan; a cancelled step loses only its own rows
+SCAN_FETCH_ROWS = 20
+
+TEXT_COLUMNS_Q = text(
+    """
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_schema = :schema
+      AND table_name   = :table
+      AND (data_type = ANY(:types) OR udt_name = 'citext')
+    ORDER BY ordinal_position
+    """
+)
+
+TRGM_COLUMNS_Q = text(
+    """
+    SELECT DISTINCT a.attname
+    FROM pg_index i
+    JOIN LATERAL unnest(i.indkey::int2[], i.indclass::oid[]) AS k(attnum, opclass) ON TRUE
+    JOIN pg_opclass opc ON opc.oid = k.opclass
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+    WHERE i.indrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+      AND opc.opcname IN ('gin_trgm_ops', 'gist_trgm_ops')
+      AND i.indisvalid
+    """
+)
+
+INDEX_NAMES_Q = text(
+    """
+    SELECT ic.relname
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    WHERE i.indrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+      AND i.indisvalid
+    """
+)
+
+
+def search_index_name(table: str, column: str, kind: str) -> str:
+    """Deterministic index name (<= 63 chars) used to recognise our indexes."""
+    name = f"{table}_{column}_admin_{kind}"
+    if len(name) <= 63:
+        return name
+    digest = hashlib.md5(name.encode()).hexdigest()[:8]
+    return f"{name[:50]}_{digest}_{kind}"
+
+
+def _fts_expr(col: str) -> str:
+    return f"to_tsvector('{FTS_CONFIG}', coalesce({col}::text, ''))"
+
+
+async def text_columns(conn: AsyncConnection, schema: str, table: str) -> List[str]:
+    result = await conn.execute(TEXT_COLUMNS_Q, {"schema": schema, "table": table, "types": list(TEXT_TYPES)})
+    return [r[0] for r in result.fetchall()]
+
+
+async def search_table(
+    engine: AsyncEngine,
+    schema: str,
+    table: str,
+    query: str,
+    limit: int,
+    columns: Optional[List[str]],
+    scan_budget: int,
+    timeout_ms: int,
+) -> Dict[str, Any]:
+    """Search text columns; returns rows with a "_score" and search metadata."""
+    identifier = table_identifier(schema, table)
+    async with engine.connect() as conn:
+        all_text = await text_columns(conn, schema, table)
+        if columns:
+            unknown = [c for c in columns if c not in all_text]
+            if unknown:
+                raise ValueError(f"Not text columns: {', '.join(unknown)}")
+            candidates = columns
+        else:
+            candidates = all_text
+        if not candidates:
+            raise ValueError("Table has no text columns to search")
+
+        trgm_cols = {r[0] for r in (await conn.execute(TRGM_COLUMNS_Q, {"schema": schema, "table": table})).fetchall()}
+        index_names = {r[0] for r in (await conn.execute(INDEX_NAMES_Q, {"schema": schema, "table": table})).fetchall()}
+        fts_cols = {c for c in candidates if search_index_name(table, c, "fts") in index_names}
+
+        indexed = [c for c in candidates if c in trgm_cols or c in fts_cols]
+        params: Dict[str, Any] = {"q": query, "pattern": f"%{query}%", "limit": limit}
+
+        if indexed:
+            conds: List[str] = []
+            scores: List[str] = []
+            for col_name in indexed:
+                col = quote_ident(col_name)
+                if col_name in trgm_cols:
+                    conds.append(f"({col} % :q OR {col} ILIKE :pattern)")
+                    scores.append(f"coalesce(similarity({col}, :q), 0)")
+                else:
+                    conds.append(f"{_fts_expr(col)} @@ plainto_tsquery('{FTS_CONFIG}', :q)")
+                    scores.append(f"ts_rank({_fts_expr(col)}, plainto_tsquery('{FTS_CONFIG}', :q))")
+            score_sql = scores[0] if len(scores) == 1 else f"greatest({', '.join(scores)})"
+            q = text(
+                f"SELECT t.*, {score_sql} AS _score FROM {identifier} t "
+                f"WHERE {' OR '.join(conds)} ORDER BY _score DESC LIMIT :limit"
+            )
+            result = await conn.execute(q, params)
+            rows = [dict(r) for r in result.mappings().all()]
+            return {
+                "mode": "indexed",
+                "partial": False,
+                "columns_searched": indexed,
+                "unindexed_columns": [c for c in candidates if c not in indexed],
+                "rows": rows,
+            }
+
+        # No index: ILIKE over a bounded prefix of the table, time-limited
+        conds = [f"{quote_ident(c)} ILIKE :pattern" for c in candidates]
+        params["budget"] = scan_budget
+        # the cursor and SET LOCAL live in the implicit transaction of this connection
+        await conn.execute(
+            text(
+                f"DECLARE search_scan NO SCROLL CURSOR FOR "
+                f"SELECT s.*, NULL::float AS _score FROM (SELECT * FROM {identifier} LIMIT :budget) s "
+                f"WHERE {' OR '.join(conds)} LIMIT :limit"
+            ),
+            params,
+        )
+        deadline = time.monotonic() + timeout_ms / 1000
+        timed_out = False
+        scanned_all = False
+        rows: List[Dict[str, Any]] = []
+        try:
+            while len(rows) < limit:
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if remaining_ms <= 0:
+                    timed_out = True
+                    break
+                await conn.execute(text(f"SET LOCAL statement_timeout = {remaining_ms}"))
+                step = min(SCAN_FETCH_ROWS, limit - len(rows))
+                result = await conn.execute(text(f"FETCH FORWARD {step} FROM search_scan"))
+                fetched = [dict(r) for r in result.mappings().all()]
+                rows.extend(fetched)
+                if len(fetched) < step:
+                    break
+            if not timed_out and len(rows) < limit:
+                # fewer matches than asked: partial only if the scan hit its row budget
+                count_q = text(f"SELECT count(*) FROM (SELECT 1 FROM {identifier} LIMIT :budget_plus) s")
+                scanned_all = (await conn.execute(count_q, {"budget_plus": scan_budget + 1})).scalar_one() <= scan_budget
+        except DBAPIError as exc:
+            if sqlstate(exc) != QUERY_CANCELED:
+                raise
+            timed_out = True
+        await conn.rollback()
+        return {
+            "mode": "scan",
+            "partial": timed_out or not scanned_all,
+            "timed_out": timed_out,
+            "scan_budget": scan_budget,
+            "columns_searched": candidates,
+            "unindexed_columns": candidates,
+            "rows": rows,
+        }
+
+
+async def create_search_index(
+    job: Job,
+    engine: AsyncEngine,
+    schema: str,
+    table: str,
+    columns: List[str],
+    kind: str,
+) -> Dict[str, Any]:
+    """Create GIN indexes for search without blocking writes (CONCURRENTLY)."""
+    identifier = table_identifier(schema, table)
+    created: List[str] = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        all_text = await text_columns(conn, schema, table)
+        unknown = [c for c in columns if c not in all_text]
+        if unknown:
+            raise ValueError(f"Not text columns: {', '.join(unknown)}")
+        if kind == "trgm":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        job.progress = {"total": len(columns), "done": 0, "current": None}
+        for col_name in columns:
+            col = quote_ident(col_name)
+            index_name = quote_ident(search_index_name(table, col_name, kind))
+            job.progress["current"] = col_name
+            if kind == "trgm":
+                using = f"gin ({col} gin_trgm_ops)"
+            else:
+                using = f"gin (({_fts_expr(col)}))"
+            await conn.execute(
+                text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {identifier} USING {using}")
+            )
+            created.append(index_name.strip('"'))
+            job.progress["done"] += 1
+    job.progress["current"] = None
+    return {"created": created}
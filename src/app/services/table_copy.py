@@ -0,0 +1,277 @@
+"""Copy a table between connections by piping COPY streams.
+
+`COPY (SELECT ...) TO STDOUT` on the source is fed chunk by chunk into
+`COPY ... FROM STDIN` on the target; nothing is materialised in between.
+Chunks pass through a bounded queue per worker, so a slow target stalls the
+source read instead of filling memory (backpressure).
+
+With several workers the table is split into primary-key ranges of about
+equal size that are copied concurrently. All source readers attach to one
+snapshot exported by a coordinating transaction (`pg_export_snapshot`), so
+the copy is consistent even though it runs over several connections. Each
+range is written in its own target transaction: after a failure or cancel
+ranges already committed stay in the target.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.services.db_utils import fetch_primary_key, quote_ident, table_identifier
+from app.services.jobs import Job
+
+FORMATS = ("binary", "text", "csv")
+
+# Exact column types (format_type keeps lengths/precision, unlike information_schema)
+COLUMNS_Q = text(
+    """
+    SELECT a.attname AS name, format_type(a.atttypid, a.atttypmod) AS type, a.attnotnull AS not_null
+    FROM pg_attribute a
+    WHERE a.attrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY a.attnum
+    """
+)
+EXISTS_Q = text("SELECT to_regclass(quote_ident(:schema) || '.' || quote_ident(:table)) IS NOT NULL")
+
+Bound = Optional[Any]
+
+
+class CopySide:
+    def __init__(self, conn_id: int, engine: AsyncEngine, schema: str, table: str):
+        self.conn_id = conn_id
+        self.engine = engine
+        self.schema = schema
+        self.table = table
+        self.identifier = table_identifier(schema, table)
+
+
+class CopyPlan:
+    """Validated copy: columns to transfer and DDL for a missing target."""
+
+    def __init__(
+        self,
+        source: CopySide,
+        target: CopySide,
+        columns: List[str],
+        pk_columns: List[str],
+        create_sql: Optional[str],
+    ):
+        self.source = source
+        self.target = target
+        self.columns = columns
+        self.pk_columns = pk_columns
+        self.create_sql = create_sql
+        self.columns_sql = ", ".join(quote_ident(c) for c in columns)
+
+
+def create_table_sql(side: CopySide, columns: List[Dict[str, Any]], pk_columns: List[str]) -> str:
+    parts = [f"{quote_ident(c['name'])} {c['type']}{' NOT NULL' if c['not_null'] else ''}" for c in columns]
+    if pk_columns:
+        parts.append(f"PRIMARY KEY ({', '.join(quote_ident(c) for c in pk_columns)})")
+    return f"CREATE TABLE {side.identifier} ({', '.join(parts)})"
+
+
+async def prepare_copy(source: CopySide, target: CopySide, create: bool, workers: int) -> CopyPlan:
+    """Check both sides; raises ValueError when the copy cannot run."""
+    async with source.engine.connect() as conn:
+        pk_columns = await fetch_primary_key(conn, source.schema, source.table)
+        result = await conn.execute(COLUMNS_Q, {"schema": source.schema, "table": source.table})
+        src_columns = [dict(r) for r in result.mappings().all()]
+    if workers > 1 and len(pk_columns) != 1:
+        raise ValueError("Parallel copy requires a single-column primary key")
+
+    async with target.engine.connect() as conn:
+        exists = (await conn.execute(EXISTS_Q, {"schema": target.schema, "table": target.table})).scalar_one()
+        dst_names = set()
+        if exists:
+            result = await conn.execute(COLUMNS_Q, {"schema": target.schema, "table": target.table})
+            dst_names = {r[0] for r in result.fetchall()}
+
+    create_sql = None
+    if not exists:
+        if not create:
+            raise ValueError(f"Target table {target.identifier} does not exist; pass 'create': true")
+        create_sql = create_table_sql(target, src_columns, pk_columns)
+        columns = [c["name"] for c in src_columns]
+    else:
+        columns = [c["name"] for c in src_columns if c["name"] in dst_names]
+        missing = sorted({c["name"] for c in src_columns} - dst_names)
+        if missing:
+            raise ValueError(f"Target table lacks columns: {missing}")
+    return CopyPlan(source, target, columns, pk_columns, create_sql)
+
+
+async def _driver(conn: AsyncConnection) -> Any:
+    """The asyncpg connection behind a SQLAlchemy connection (for COPY)."""
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+
+async def _split_points(src: Any, plan: CopyPlan, workers: int) -> List[Any]:
+    pk = quote_ident(plan.pk_columns[0])
+    fractions = [i / workers for i in range(1, workers)]
+    points = await src.fetchval(
+        f"SELECT percentile_disc($1::float8[]) WITHIN GROUP (ORDER BY {pk}) FROM {plan.source.identifier}",
+        fractions,
+    )
+    # drop duplicates (tiny tables); None means the table is empty
+    return sorted({p for p in points or [] if p is not None})
+
+
+def _range_query(plan: CopyPlan, lo: Bound, hi: Bound) -> Tuple[str, List[Any]]:
+    where: List[str] = []
+    args: List[Any] = []
+    if plan.pk_columns:
+        pk = quote_ident(plan.pk_columns[0])
+        if lo is not None:
+            args.append(lo)
+            where.append(f"{pk} > ${len(args)}")
+        if hi is not None:
+            args.append(hi)
+            where.append(f"{pk} <= ${len(args)}")
+    sql = f"SELECT {plan.columns_sql} FROM {plan.source.identifier}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql, args
+
+
+class _Throughput:
+    def __init__(self, job: Job, ranges: int):
+        self.job = job
+        self.started = time.monotonic()
+        self.bytes = 0
+        self.rows = 0
+        self.ranges_done = 0
+        job.progress = {
+            "ranges": ranges,
+            "ranges_done": 0,
+            "rows": 0,
+            "bytes": 0,
+            "bytes_per_second": 0.0,
+            "rows_per_second": 0.0,
+        }
+
+    def publish(self) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        self.job.progress.update(
+            ranges_done=self.ranges_done,
+            rows=self.rows,
+            bytes=self.bytes,
+            bytes_per_second=round(self.bytes / elapsed, 1),
+            rows_per_second=round(self.rows / elapsed, 1),
+        )
+
+
+async def _copy_range(
+    plan: CopyPlan,
+    snapshot: str,
+    lo: Bound,
+    hi: Bound,
+    fmt: str,
+    buffer_chunks: int,
+    meter: _Throughput,
+) -> int:
+    """Pipe one key range from source to target; returns copied rows."""
+    sql, args = _range_query(plan, lo, hi)
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=buffer_chunks)
+
+    async def _chunks() -> AsyncIterator[bytes]:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            meter.bytes += len(chunk)
+            meter.publish()
+            yield chunk
+
+    async with plan.source.engine.connect() as src_conn, plan.target.engine.connect() as dst_conn:
+        src, dst = await _driver(src_conn), await _driver(dst_conn)
+
+        async def _read() -> None:
+            async with src.transaction(isolation="repeatable_read", readonly=True):
+                await src.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                # queue.put blocks while the target lags behind
+                await src.copy_from_query(sql, *args, output=queue.put, format=fmt)
+            await queue.put(None)
+
+        async def _write() -> str:
+            async with dst.transaction():
+                return await dst.copy_to_table(
+                    plan.target.table,
+                    source=_chunks(),
+                    schema_name=plan.target.schema,
+                    columns=plan.columns,
+                    format=fmt,
+                )
+
+        reader = asyncio.create_task(_read())
+        writer = asyncio.create_task(_write())
+        try:
+            # first failure cancels the other side of the pipe
+            done, _pending = await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            status = await writer
+            await reader
+        finally:
+            for task in (reader, writer):
+                task.cancel()
+            await asyncio.gather(reader, writer, return_exceptions=True)
+
+    rows = int(status.split()[-1]) if status else 0
+    meter.rows += rows
+    meter.ranges_done += 1
+    meter.publish()
+    return rows
+
+
+async def run_copy(
+    job: Job,
+    plan: CopyPlan,
+    workers: int,
+    fmt: str,
+    truncate: bool,
+    buffer_chunks: int,
+) -> Dict[str, Any]:
+    """Create/truncate the target if asked, then copy all ranges concurrently."""
+    async with plan.target.engine.begin() as conn:
+        if plan.create_sql is not None:
+            await conn.execute(text(plan.create_sql))
+        elif truncate:
+            await conn.execute(text(f"TRUNCATE {plan.target.identifier}"))
+
+    async with plan.source.engine.connect() as coord_conn:
+        coord = await _driver(coord_conn)
+        # the exported snapshot stays valid while this transaction is open
+        async with coord.transaction(isolation="repeatable_read", readonly=True):
+            snapshot = await coord.fetchval("SELECT pg_export_snapshot()")
+            points = await _split_points(coord, plan, workers) if workers > 1 else []
+            bounds: List[Bound] = [None, *points, None]
+            ranges = list(zip(bounds[:-1], bounds[1:]))
+            meter = _Throughput(job, len(ranges))
+            tasks = [
+                asyncio.create_task(_copy_range(plan, snapshot, lo, hi, fmt, buffer_chunks, meter))
+                for lo, hi in ranges
+            ]
+            try:
+                rows = await asyncio.gather(*tasks)
+            finally:
+                # one failed range (or a cancelled job) stops the others
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    meter.publish()
+    return {
+        "rows": sum(rows),
+        "ranges": len(ranges),
+        "bytes": meter.bytes,
+        "created": plan.create_sql is not None,
+        "elapsed_seconds": round(time.monotonic() - meter.started, 3),
+        "bytes_per_second": job.progress["bytes_per_second"],
+        "rows_per_second": job.progress["rows_per_second"],
+    }
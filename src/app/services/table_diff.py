@@ -0,0 +1,260 @@
+"""Compare a table on two connections by hashing primary-key ranges.
+
+Both sides compute `count(*)` and an md5 over the ordered row hashes of a
+key range inside Postgres, so only counts and digests cross the network.
+Equal ranges are done; a mismatching range is split into `parts` sub-ranges
+at key boundaries read from the larger side and hashed again, until a range
+holds at most `leaf_rows` rows. Only then keys and per-row hashes of that
+range are fetched and compared row by row.
+
+Each side holds one REPEATABLE READ READ ONLY transaction for the whole
+diff, so all levels see the same snapshot of its table; the two sides are
+queried concurrently. Row text is rendered with fixed session settings
+(UTC, ISO dates, full float precision) so equal values hash equally on
+differently configured servers.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.services.db_utils import fetch_primary_key, quote_ident, table_identifier
+from app.services.jobs import Job
+
+# make the text form of rows independent of server/session configuration
+SESSION_SETTINGS = (
+    "SET LOCAL TimeZone = 'UTC'",
+    "SET LOCAL DateStyle = 'ISO, YMD'",
+    "SET LOCAL IntervalStyle = 'postgres'",
+    "SET LOCAL extra_float_digits = 3",
+    "SET LOCAL bytea_output = 'hex'",
+)
+
+COLUMNS_Q = text(
+    """
+    SELECT a.attname
+    FROM pg_attribute a
+    WHERE a.attrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY a.attname
+    """
+)
+
+Key = Tuple[Any, ...]
+# (exclusive lower bound, inclusive upper bound); None means unbounded
+KeyRange = Tuple[Optional[Key], Optional[Key]]
+
+
+class DiffSide:
+    def __init__(self, conn_id: int, engine: AsyncEngine, schema: str, table: str):
+        self.conn_id = conn_id
+        self.engine = engine
+        self.schema = schema
+        self.table = table
+        self.identifier = table_identifier(schema, table)
+
+
+class DiffPlan:
+    """Validated diff: both tables exist with the same primary key and columns."""
+
+    def __init__(self, source: DiffSide, target: DiffSide, pk_columns: List[str], columns: List[str]):
+        self.source = source
+        self.target = target
+        self.pk_columns = pk_columns
+        self.columns = columns
+        self.pk_sql = ", ".join(quote_ident(c) for c in pk_columns)
+        # columns in name order: physical column order may differ between sides
+        self.row_hash_sql = "md5(ROW({})::text)".format(", ".join(quote_ident(c) for c in columns))
+
+
+async def _describe(side: DiffSide) -> Tuple[List[str], List[str]]:
+    async with side.engine.connect() as conn:
+        pk_columns = await fetch_primary_key(conn, side.schema, side.table)
+        result = await conn.execute(COLUMNS_Q, {"schema": side.schema, "table": side.table})
+        columns = [r[0] for r in result.fetchall()]
+    return pk_columns, columns
+
+
+async def prepare_diff(source: DiffSide, target: DiffSide) -> DiffPlan:
+    """Check that both tables are comparable; raises ValueError otherwise."""
+    (src_pk, src_cols), (dst_pk, dst_cols) = await asyncio.gather(_describe(source), _describe(target))
+    if not src_pk:
+        raise ValueError("Diff requires a primary key")
+    if src_pk != dst_pk:
+        raise ValueError(f"Primary keys differ: {src_pk} vs {dst_pk}")
+    if src_cols != dst_cols:
+        only_source = sorted(set(src_cols) - set(dst_cols))
+        only_target = sorted(set(dst_cols) - set(src_cols))
+        raise ValueError(f"Columns differ: only in source {only_source}, only in target {only_target}")
+    return DiffPlan(source, target, src_pk, src_cols)
+
+
+def _range_sql(plan: DiffPlan, key_range: KeyRange, params: Dict[str, Any]) -> str:
+    lo, hi = key_range
+    parts: List[str] = []
+    for name, op, bound in (("lo", ">", lo), ("hi", "<=", hi)):
+        if bound is None:
+            continue
+        names = [f"{name}{i}" for i in range(len(bound))]
+        params.update(zip(names, bound))
+        parts.append(f"({plan.pk_sql}) {op} ({', '.join(':' + n for n in names)})")
+    return " AND ".join(parts) or "TRUE"
+
+
+async def _hash_buckets(
+    conn: AsyncConnection, plan: DiffPlan, ident: str, key_range: KeyRange, bounds: Sequence[Key]
+) -> Dict[int, Tuple[int, str]]:
+    """{bucket: (rows, hash)} of the range split at bounds (inclusive uppers)."""
+    params: Dict[str, Any] = {}
+    where = _range_sql(plan, key_range, params)
+    whens: List[str] = []
+    for idx, bound in enumerate(bounds):
+        names = [f"b{idx}_{i}" for i in range(len(bound))]
+        params.update(zip(names, bound))
+        whens.append(f"WHEN ({plan.pk_sql}) <= ({', '.join(':' + n for n in names)}) THEN {idx}")
+    bucket = f"CASE {' '.join(whens)} ELSE {len(bounds)} END" if whens else "0"
+    q = text(
+        f"SELECT {bucket} AS bucket, count(*) AS n, "
+        f"md5(string_agg({plan.row_hash_sql}, '' ORDER BY {plan.pk_sql})) AS hash "
+        f"FROM {ident} WHERE {where} GROUP BY 1"
+    )
+    result = await conn.execute(q, params)
+    return {r[0]: (r[1], r[2]) for r in result.fetchall()}
+
+
+async def _split_bounds(
+    conn: AsyncConnection, plan: DiffPlan, ident: str, key_range: KeyRange, rows: int, parts: int
+) -> List[Key]:
+    """Keys splitting the range into `parts` runs of about equal row count."""
+    params: Dict[str, Any] = {"step": max(1, -(-rows // parts))}
+    where = _range_sql(plan, key_range, params)
+    q = text(
+        f"SELECT {plan.pk_sql} FROM ("
+        f"SELECT {plan.pk_sql}, row_number() OVER (ORDER BY {plan.pk_sql}) AS rn FROM {ident} WHERE {where}"
+        f") s WHERE rn % :step = 0 ORDER BY {plan.pk_sql}"
+    )
+    result = await conn.execute(q, params)
+    bounds = [tuple(r) for r in result.fetchall()]
+    # the last run is closed by the range's own upper bound
+    return bounds[: parts - 1]
+
+
+async def _row_hashes(conn: AsyncConnection, plan: DiffPlan, ident: str, key_range: KeyRange) -> Dict[Key, str]:
+    params: Dict[str, Any] = {}
+    where = _range_sql(plan, key_range, params)
+    q = text(f"SELECT {plan.pk_sql}, {plan.row_hash_sql} FROM {ident} WHERE {where}")
+    result = await conn.execute(q, params)
+    width = len(plan.pk_columns)
+    return {tuple(r[:width]): r[width] for r in result.fetchall()}
+
+
+async def _snapshot(engine: AsyncEngine) -> AsyncConnection:
+    conn = await engine.connect()
+    try:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        await conn.execute(text("SET TRANSACTION READ ONLY"))
+        for stmt in SESSION_SETTINGS:
+            await conn.execute(text(stmt))
+    except BaseException:
+        await conn.close()
+        raise
+    return conn
+
+
+async def run_diff(job: Job, plan: DiffPlan, parts: int, leaf_rows: int, max_keys: int) -> Dict[str, Any]:
+    """Narrow down mismatching key ranges level by level and collect differing keys.
+
+    Progress (level, ranges compared, ranges still mismatching, differences)
+    is published in job.progress after every range.
+    """
+    src_ident, dst_ident = plan.source.identifier, plan.target.identifier
+    differences: Dict[str, List[Dict[str, Any]]] = {"only_in_source": [], "only_in_target": [], "changed": []}
+    stats = {"ranges_compared": 0, "rows_fetched": 0}
+    job.progress = {"level": 0, "ranges_compared": 0, "mismatching_ranges": 0, "differences": 0}
+
+    def _found() -> int:
+        return sum(len(v) for v in differences.values())
+
+    src, dst = await asyncio.gather(_snapshot(plan.source.engine), _snapshot(plan.target.engine))
+    try:
+        whole: KeyRange = (None, None)
+        (src_root, dst_root) = await asyncio.gather(
+            _hash_buckets(src, plan, src_ident, whole, []),
+            _hash_buckets(dst, plan, dst_ident, whole, []),
+        )
+        src_rows, _ = src_root.get(0, (0, None))
+        dst_rows, _ = dst_root.get(0, (0, None))
+        stats["ranges_compared"] = 1
+        # (range, rows on source, rows on target) of ranges that still differ
+        pending: List[Tuple[KeyRange, int, int]] = []
+        if src_root.get(0) != dst_root.get(0):
+            pending.append((whole, src_rows, dst_rows))
+
+        level = 0
+        truncated = False
+        while pending:
+            level += 1
+            next_pending: List[Tuple[KeyRange, int, int]] = []
+            for key_range, src_n, dst_n in pending:
+                if _found() >= max_keys:
+                    truncated = True
+                    break
+                if max(src_n, dst_n) <= leaf_rows:
+                    src_hashes, dst_hashes = await asyncio.gather(
+                        _row_hashes(src, plan, src_ident, key_range),
+                        _row_hashes(dst, plan, dst_ident, key_range),
+                    )
+                    stats["rows_fetched"] += len(src_hashes) + len(dst_hashes)
+                    for key in sorted(set(src_hashes) | set(dst_hashes)):
+                        if key not in dst_hashes:
+                            kind = "only_in_source"
+                        elif key not in src_hashes:
+                            kind = "only_in_target"
+                        elif src_hashes[key] != dst_hashes[key]:
+                            kind = "changed"
+                        else:
+                            continue
+                        differences[kind].append(dict(zip(plan.pk_columns, key)))
+                else:
+                    # boundaries come from the side holding more rows of the range
+                    conn, ident = (src, src_ident) if src_n >= dst_n else (dst, dst_ident)
+                    bounds = await _split_bounds(conn, plan, ident, key_range, max(src_n, dst_n), parts)
+                    src_buckets, dst_buckets = await asyncio.gather(
+                        _hash_buckets(src, plan, src_ident, key_range, bounds),
+                        _hash_buckets(dst, plan, dst_ident, key_range, bounds),
+                    )
+                    stats["ranges_compared"] += len(bounds) + 1
+                    lowers = [key_range[0], *bounds]
+                    uppers = [*bounds, key_range[1]]
+                    for idx, (lo, hi) in enumerate(zip(lowers, uppers)):
+                        src_b, dst_b = src_buckets.get(idx), dst_buckets.get(idx)
+                        if src_b != dst_b:
+                            next_pending.append(((lo, hi), src_b[0] if src_b else 0, dst_b[0] if dst_b else 0))
+                job.progress.update(
+                    level=level,
+                    ranges_compared=stats["ranges_compared"],
+                    mismatching_ranges=len(next_pending),
+                    differences=_found(),
+                )
+            if truncated:
+                break
+            pending = next_pending
+    finally:
+        await asyncio.gather(src.close(), dst.close(), return_exceptions=True)
+
+    truncated = truncated or _found() > max_keys
+    budget = max_keys
+    for kind in differences:
+        differences[kind] = differences[kind][:budget]
+        budget -= len(differences[kind])
+    return {
+        "equal": src_root.get(0) == dst_root.get(0),
+        "source_rows": src_rows,
+        "target_rows": dst_rows,
+        **differences,
+        "truncated": truncated,
+        "levels": level,
+        **stats,
+    }
@@ -0,0 +1,121 @@
+"""Column projection and large-value previews for read_table.
+
+Large values (text, json, bytea, ...) are cut to `preview` characters/bytes
+in SQL, so neither the full value is detoasted nor shipped to the browser;
+the full size of every truncated cell is reported in the row's "_truncated"
+map. `octet_length()` on text/bytea reads the TOAST header only, and
+`left()`/`substring()` fetch just the needed slice.
+
+The slice is one character (byte) longer than the preview, which tells a cut
+value from one that fits exactly. Values that fit are returned as they are
+without a preview: json is decoded back into objects and bytea from its hex
+form; only cut values stay text (hex for bytea).
+"""
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.services.db_utils import quote_ident
+
+TRUNCATED_KEY = "_truncated"
+
+# typname -> (preview expression, size expression); "{col}" is the quoted column
+LARGE_TYPES: Dict[str, Tuple[str, str]] = {
+    "text": ("left({col}, :preview + 1)", "octet_length({col})"),
+    "varchar": ("left({col}, :preview + 1)", "octet_length({col})"),
+    "bpchar": ("left({col}, :preview + 1)", "octet_length({col})"),
+    "citext": ("left({col}::text, :preview + 1)", "octet_length({col}::text)"),
+    "xml": ("left({col}::text, :preview + 1)", "pg_column_size({col})"),
+    "json": ("left({col}::text, :preview + 1)", "pg_column_size({col})"),
+    "jsonb": ("left({col}::text, :preview + 1)", "pg_column_size({col})"),
+    "bytea": ("encode(substring({col} from 1 for :preview + 1), 'hex')", "octet_length({col})"),
+}
+
+# previews that fit are turned back into the value the column has without a preview
+_DECODERS: Dict[str, Callable[[str], Any]] = {
+    "json": json.loads,
+    "jsonb": json.loads,
+    "bytea": bytes.fromhex,
+}
+
+COLUMN_TYPES_Q = text(
+    """
+    SELECT a.attname, t.typname
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = (quote_ident(:schema) || '.' || quote_ident(:table))::regclass
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY a.attnum
+    """
+)
+
+
+async def column_types(conn: AsyncConnection, schema: str, table: str) -> List[Tuple[str, str]]:
+    result = await conn.execute(COLUMN_TYPES_Q, {"schema": schema, "table": table})
+    return [(r[0], r[1]) for r in result.fetchall()]
+
+
+def build_select_list(
+    types: List[Tuple[str, str]],
+    projection: Optional[List[str]],
+    preview: Optional[int],
+    always_include: List[str],
+) -> Tuple[str, Dict[str, Tuple[str, str]]]:
+    """Return (select list SQL, {size alias: (column, typname)}) for the requested shape.
+
+    projection=None selects every column; key columns in always_include are
+    added to a projection so rows stay addressable for edits and cell fetches.
+    """
+    known = dict(types)
+    if projection is not None:
+        unknown = [c for c in projection if c not in known]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        wanted = [c for c, _ in types if c in projection or c in always_include]
+    else:
+        wanted = [c for c, _ in types]
+
+    parts: List[str] = []
+    sizes: Dict[str, Tuple[str, str]] = {}
+    for idx, name in enumerate(wanted):
+        col = quote_ident(name)
+        exprs = LARGE_TYPES.get(known[name]) if preview else None
+        if exprs is None:
+            parts.append(col)
+            continue
+        preview_sql, size_sql = exprs
+        alias = f"__size_{idx}"
+        parts.append(f"{preview_sql.format(col=col)} AS {col}")
+        parts.append(f"{size_sql.format(col=col)} AS {alias}")
+        sizes[alias] = (name, known[name])
+    return ", ".join(parts), sizes
+
+
+def attach_sizes(row: Dict[str, Any], sizes: Dict[str, Tuple[str, str]], preview: int) -> Dict[str, Any]:
+    """Cut previews to size, decode the ones that fit and move sizes into "_truncated"."""
+    truncated: Dict[str, int] = {}
+    for alias, (name, typname) in sizes.items():
+        size = row.pop(alias, None)
+        value = row.get(name)
+        if value is None:
+            continue
+        limit = 2 * preview if typname == "bytea" else preview  # hex: two characters per byte
+        if len(value) > limit:
+            row[name] = value[:limit]
+            truncated[name] = int(size)
+        elif typname in _DECODERS:
+            row[name] = _DECODERS[typname](value)
+    if truncated:
+        row[TRUNCATED_KEY] = truncated
+    return row
+
+
+def encode_cell(value: Any) -> Dict[str, Any]:
+    """JSON-friendly representation of a single full cell value."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"value": base64.b64encode(bytes(value)).decode("ascii"), "encoding": "base64"}
+    return {"value": value, "encoding": None}
@@ -0,0 +1,89 @@
+"""Random row samples of large tables with TABLESAMPLE.
+
+The sampling percentage is derived from the estimated row count (summed
+over the partitions of a partitioned table), so a request reads about the
+same number of rows whatever the table size. `SYSTEM` picks whole pages and
+reads only that fraction of the table; `BERNOULLI` picks single rows, which
+is more uniform but still visits every page. Both are asked for a margin of
+extra rows (`OVERSAMPLE`); the result is shuffled deterministically by the
+seed and cut to the requested size, so the same seed returns the same rows
+as long as the table is unchanged (`REPEATABLE`).
+
+When the estimate was too high and fewer rows came back, the percentage is
+raised (`GROWTH`) and the sample retried, at most `MAX_ATTEMPTS` times.
+"""
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+METHODS = ("system", "bernoulli")
+# sampled rows per requested row: SYSTEM varies more, it samples whole pages
+OVERSAMPLE: Dict[str, float] = {"system": 2.0, "bernoulli": 1.2}
+GROWTH = 4.0
+MAX_ATTEMPTS = 3
+# rows per page assumed for tables that were never analyzed
+DEFAULT_ROWS_PER_PAGE = 100
+
+# relpages = 0: never vacuumed or analyzed (reltuples is -1 on PostgreSQL 14+,
+# 0 before), or empty, in which case its size adds nothing either
+SIZE_Q = text(
+    """
+    SELECT r.oid IS NOT NULL AS found, s.known_rows, s.known_pages, s.unknown_pages
+    FROM (SELECT to_regclass(quote_ident(:schema) || '.' || quote_ident(:table)) AS oid) r
+    CROSS JOIN LATERAL (
+        SELECT coalesce(sum(c.reltuples) FILTER (WHERE c.relpages > 0), 0)::float8 AS known_rows,
+               coalesce(sum(c.relpages) FILTER (WHERE c.relpages > 0), 0)::float8 AS known_pages,
+               (coalesce(sum(pg_relation_size(c.oid)) FILTER (WHERE c.relpages = 0), 0)
+                / current_setting('block_size')::bigint)::float8 AS unknown_pages
+        FROM pg_partition_tree(r.oid) t
+        JOIN pg_class c ON c.oid = t.relid
+        WHERE t.isleaf
+    ) s
+    """
+)
+
+
+def estimate_rows(known_rows: float, known_pages: float, unknown_pages: float) -> Tuple[float, str]:
+    """(row estimate, source); never-analyzed partitions are estimated from their size."""
+    if not unknown_pages:
+        return known_rows, "statistics"
+    density = known_rows / known_pages if known_pages else DEFAULT_ROWS_PER_PAGE
+    return known_rows + unknown_pages * density, "relation_size"
+
+
+def sample_percent(rows: int, estimated_rows: float, method: str) -> float:
+    """TABLESAMPLE percentage expected to yield `rows` rows with the method's margin."""
+    if estimated_rows <= 0:
+        return 100.0
+    return min(100.0, 100.0 * rows * OVERSAMPLE[method] / estimated_rows)
+
+
+async def sample_rows(
+    session: AsyncSession,
+    identifier: str,
+    select_sql: str,
+    params: Dict[str, Any],
+    rows: int,
+    method: str,
+    seed: int,
+    estimated_rows: float,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Up to `rows` sampled rows and a description of how they were sampled."""
+    percent = sample_percent(rows, estimated_rows, method)
+    q = text(
+        f"SELECT {select_sql} FROM {identifier} TABLESAMPLE {method.upper()} (:percent) REPEATABLE (:seed) "
+        # ctid order is physical; shuffle by the seed so LIMIT does not favour early pages
+        f"ORDER BY md5(ctid::text || :seed_text) LIMIT :rows"
+    )
+    attempts = 0
+    while True:
+        attempts += 1
+        result = await session.execute(
+            q, {**params, "percent": percent, "seed": seed, "seed_text": str(seed), "rows": rows}
+        )
+        found = [dict(r) for r in result.mappings().all()]
+        if len(found) >= rows or percent >= 100.0 or attempts >= MAX_ATTEMPTS:
+            break
+        percent = min(100.0, percent * GROWTH)
+    return found, {"method": method, "seed": seed, "percent": round(percent, 6), "attempts": attempts}
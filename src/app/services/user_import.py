@@ -0,0 +1,178 @@
+"""Bulk import of user accounts from CSV or JSON.
+
+Records are validated like `UserCreate`, deduplicated within the upload and
+checked against existing emails before hashing, so skipped rows cost no
+bcrypt time. Passwords of a batch are hashed in the process pool across all
+cores (`hash_passwords_bulk`) while the previous batch is being inserted;
+each batch is one `INSERT ... ON CONFLICT (email) DO NOTHING`, so rows
+created concurrently by someone else are counted as skipped, not failed.
+"""
+import asyncio
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.security import hash_passwords_bulk
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.services.jobs import Job
+
+# errors listed in the result; the counters are always complete
+MAX_REPORTED_ERRORS = 100
+
+Record = Tuple[int, Dict[str, Any]]
+
+
+def parse_records(body: bytes, content_type: str) -> List[Record]:
+    """(line, record) pairs from a CSV (with header), NDJSON or JSON array body.
+
+    Raises ValueError for an unsupported type or a malformed document.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    data = body.decode("utf-8-sig")
+    if media_type == "text/csv":
+        reader = csv.DictReader(io.StringIO(data))
+        if not {"email", "password"} <= set(reader.fieldnames or []):
+            raise ValueError("CSV header must contain 'email' and 'password' columns")
+        # line numbers count the header as line 1
+        return [(reader.line_num, dict(row)) for row in reader]
+    if media_type == "application/x-ndjson":
+        records: List[Record] = []
+        for idx, line in enumerate(data.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append((idx, json.loads(line)))
+            except ValueError:
+                records.append((idx, {"_error": "Invalid JSON"}))
+        return records
+    if media_type == "application/json":
+        items = json.loads(data)
+        if not isinstance(items, list):
+            raise ValueError("JSON body must be an array of users")
+        return [(idx, item) for idx, item in enumerate(items, start=1)]
+    raise ValueError("Content-Type must be text/csv, application/x-ndjson or application/json")
+
+
+class _Report:
+    def __init__(self, job: Job, total: int):
+        self.job = job
+        self.total = total
+        self.started = time.monotonic()
+        self.created = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.publish()
+
+    def fail(self, line: int, email: Optional[str], error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "email": email, "error": error})
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        processed = self.created + self.skipped + self.failed
+        return {
+            "total": self.total,
+            "processed": processed,
+            "created": self.created,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "rows_per_second": round(processed / elapsed, 1),
+            "elapsed_seconds": round(elapsed, 3),
+        }
+
+    def publish(self) -> None:
+        self.job.progress = self.as_dict()
+
+
+def _validate(record: Dict[str, Any]) -> UserCreate:
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+    if "_error" in record:
+        raise ValueError(record["_error"])
+    user = UserCreate.model_validate(
+        {"email": record.get("email"), "full_name": record.get("full_name") or None, "password": record.get("password")}
+    )
+    if not user.password:
+        raise ValueError("Password is required")
+    return user
+
+
+async def _existing_emails(engine: AsyncEngine, emails: List[str]) -> set:
+    async with engine.connect() as conn:
+        result = await conn.execute(select(User.email).where(User.email.in_(emails)))
+        return {r[0] for r in result.fetchall()}
+
+
+async def _insert(engine: AsyncEngine, rows: List[Dict[str, Any]], report: _Report) -> None:
+    stmt = insert(User).values(rows).on_conflict_do_nothing(index_elements=[User.email]).returning(User.email)
+    async with engine.begin() as conn:
+        created = len((await conn.execute(stmt)).fetchall())
+    report.created += created
+    # lost a race with another insert of the same email
+    report.skipped += len(rows) - created
+    report.publish()
+
+
+async def import_users(job: Job, engine: AsyncEngine, records: List[Record], batch_size: int) -> Dict[str, Any]:
+    """Validate, hash and insert records batch by batch; returns the counters."""
+    report = _Report(job, len(records))
+    seen: set = set()
+    insert_task: Optional["asyncio.Task[None]"] = None
+    try:
+        for start in range(0, len(records), batch_size):
+            batch: List[Tuple[int, UserCreate]] = []
+            for line, record in records[start : start + batch_size]:
+                try:
+                    user = _validate(record)
+                except (ValidationError, ValueError) as exc:
+                    email = record.get("email") if isinstance(record, dict) else None
+                    message = exc.errors()[0]["msg"] if isinstance(exc, ValidationError) else str(exc)
+                    report.fail(line, email, message)
+                    continue
+                if user.email in seen:
+                    report.skipped += 1
+                    continue
+                seen.add(user.email)
+                batch.append((line, user))
+
+            existing = await _existing_emails(engine, [u.email for _, u in batch]) if batch else set()
+            todo = [(line, u) for line, u in batch if u.email not in existing]
+            report.skipped += len(batch) - len(todo)
+
+            # hashing this batch overlaps with inserting the previous one
+            hashes = await hash_passwords_bulk([u.password for _, u in todo])
+            if insert_task is not None:
+                await insert_task
+            now = datetime.now(timezone.utc)
+            rows = [
+                {
+                    "email": u.email,
+                    "full_name": u.full_name,
+                    "password_hash": h,
+                    "is_admin": False,
+                    "created_at": now,
+                    "login_count": 0,
+                }
+                for (_, u), h in zip(todo, hashes)
+            ]
+            insert_task = asyncio.create_task(_insert(engine, rows, report)) if rows else None
+            report.publish()
+        if insert_task is not None:
+            await insert_task
+    finally:
+        if insert_task is not None and not insert_task.done():
+            insert_task.cancel()
+    result = report.as_dict()
+    result["errors"] = report.errors
+    return result
@@ -2,7 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from app.models.user import User
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password_async, verify_password_async
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -19,7 +19,7 @@ async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
     return result.scalar_one_or_none()
 
 async def create_user(db: AsyncSession, email: str, full_name: Optional[str], password: str) -> User:
-    user = User(email=email, full_name=full_name, password_hash=hash_password(password))
+    user = User(email=email, full_name=full_name, password_hash=await hash_password_async(password))
     db.add(user)
     try:
         await db.commit()
@@ -33,7 +33,7 @@ async def update_user(db: AsyncSession, user: User, full_name: Optional[str] = N
     if full_name is not None:
         user.full_name = full_name
     if password is not None:
-        user.password_hash = hash_password(password)
+        user.password_hash = await hash_password_async(password)
     await db.commit()
     await db.refresh(user)
     return user
@@ -46,7 +46,7 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> Opti
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
     # Update login stats
     user.login_count = (user.login_count or 0) + 1
@@ -1,7 +1,7 @@
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { Alert, Box, Button, Card, CardContent, CardHeader, Dialog, DialogActions, DialogContent, DialogTitle, FormControl, InputLabel, MenuItem, Select, Skeleton, Stack, Table, TableBody, TableCell, TableContainer, TableHead, TableRow, TextField, Typography, Pagination, IconButton, Tooltip } from '@mui/material';
 import type { SelectChangeEvent } from '@mui/material';
-import { activateDbConnection, createDbConnection, createDbTable, deleteDbRow, dropDbTable, fetchDbConnections, fetchDbTableMeta, fetchDbTables, fetchDbTableRows, insertDbRow, testDbConnection, updateDbRow } from '../services/api';
+import { activateDbConnection, createDbConnection, createDbTable, deleteDbRow, dropDbTable, fetchDbConnections, fetchDbTableMeta, fetchDbTables, fetchDbTableRows, insertDbRow, subscribeDbTableChanges, testDbConnection, updateDbRow } from '../services/api';
 import type { CreateTablePayload, DbConnectionInfo, DbTable, DbTableRowsResponse, DbTableMeta, NewTableColumn } from '../services/api';
 import AddIcon from '@mui/icons-material/Add';
 import { useEffect, useMemo, useState } from 'react';
@@ -73,6 +73,39 @@ export default function DbBrowser() {
     enabled: !!selected,
   });
 
+  // Patch the visible page in place from the table's change feed (if enabled for the table)
+  useEffect(() => {
+    if (!selected || !meta?.primary_key?.length) return;
+    const pk = meta.primary_key;
+    const rowsKey = ['db-rows', selected.schema, selected.name, page];
+    const sameKey = (row: Record<string, any>, key: Record<string, any>) =>
+      pk.every((col) => String(row[col]) === String(key[col]));
+
+    return subscribeDbTableChanges(selected.schema, selected.name, (event) => {
+      if (event.type === 'reset') {
+        queryClient.invalidateQueries({ queryKey: ['db-rows', selected.schema, selected.name] });
+        return;
+      }
+      queryClient.setQueryData<DbTableRowsResponse>(rowsKey, (current) => {
+        if (!current) return current;
+        let rows = current.rows;
+        let total = current.total;
+        for (const change of event.changes) {
+          if (change.op === 'DELETE') {
+            const before = rows.length;
+            rows = rows.filter((r) => !sameKey(r, change.key));
+            total -= before - rows.length;
+          } else if (change.op === 'UPDATE' && change.row) {
+            rows = rows.map((r) => (sameKey(r, change.key) ? change.row! : r));
+          } else if (change.op === 'INSERT') {
+            total += 1;
+          }
+        }
+        return { ...current, rows, total };
+      });
+    });
+  }, [selected, meta, page, queryClient]);
+
   const insertMutation = useMutation({
     mutationFn: (values: Record<string, any>) => insertDbRow(selected!.schema, selected!.name, values),
     onSuccess: () => {
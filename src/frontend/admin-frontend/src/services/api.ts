@@ -37,6 +37,42 @@ export async function fetchUsers() {
   return data;
 }
 
+export interface UserImportProgress {
+  total: number;
+  processed: number;
+  created: number;
+  skipped: number;
+  failed: number;
+  rows_per_second: number;
+  elapsed_seconds: number;
+}
+
+/** Upload a CSV/NDJSON/JSON file of users; returns the import job. */
+export async function importUsers(file: File) {
+  const contentType = file.name.endsWith('.csv')
+    ? 'text/csv'
+    : file.name.endsWith('.ndjson') || file.name.endsWith('.jsonl')
+      ? 'application/x-ndjson'
+      : 'application/json';
+  const { data } = await api.post<{ id: number; status: string; progress: UserImportProgress }>(
+    '/admin/users/import',
+    file,
+    { headers: { 'Content-Type': contentType } },
+  );
+  return data;
+}
+
+export async function fetchUserImport(jobId: number) {
+  const { data } = await api.get<{
+    id: number;
+    status: 'pending' | 'running' | 'done' | 'failed' | 'cancelled';
+    progress: UserImportProgress;
+    result: (UserImportProgress & { errors: { line: number; email: string | null; error: string }[] }) | null;
+    error: string | null;
+  }>(`/admin/users/import/${jobId}`);
+  return data;
+}
+
 export async function fetchCurrentUser(): Promise<User | null> {
   try {
     const { data } = await api.get<User>('/auth/me');
@@ -51,8 +87,89 @@ export async function migrationsStatus() {
   return data;
 }
 
-export async function migrationsUpgradeHead() {
-  const { data } = await api.post<{ status: string; message: string }>('/admin/migrations/upgrade');
+export interface MigrationStatementPlan {
+  revision: string | null;
+  sql: string;
+  table: string | null;
+  lock: string | null;
+  cost: 'none' | 'metadata' | 'scan' | 'rewrite' | 'index_build' | 'dml' | 'unknown';
+  table_bytes: number | null;
+  table_rows: number | null;
+  risk: 'low' | 'medium' | 'high';
+}
+
+export interface MigrationsPreflight {
+  current: string[];
+  pending: string[];
+  statements: MigrationStatementPlan[];
+  risk: 'low' | 'medium' | 'high';
+}
+
+export async function migrationsPreflight(): Promise<MigrationsPreflight> {
+  const { data } = await api.get<MigrationsPreflight>('/admin/migrations/preflight');
+  return data;
+}
+
+export interface MigrationsUpgradeOptions {
+  guarded?: boolean;
+  lock_timeout_ms?: number;
+  statement_timeout_ms?: number;
+  retries?: number;
+  backoff_ms?: number;
+}
+
+export async function migrationsUpgradeHead(options: MigrationsUpgradeOptions = {}) {
+  const { data } = await api.post<{
+    status: string;
+    message: string;
+    applied?: string[];
+    statements?: number;
+    retries?: number;
+  }>('/admin/migrations/upgrade', options);
+  return data;
+}
+
+/** Axios config that asks the backend to profile this one request (admins only, rate-limited). */
+export const PROFILE_REQUEST = { headers: { 'X-Profile': '1' } };
+
+/** Profile id of a response made with PROFILE_REQUEST ("rate-limited" if refused). */
+export function responseProfileId(headers: Record<string, unknown>): string | null {
+  return (headers['x-profile-id'] as string | undefined) ?? null;
+}
+
+export interface RequestProfileSummary {
+  id: string;
+  method: string;
+  path: string;
+  user: string;
+  started_at: string;
+  duration_seconds: number | null;
+  status_code: number | null;
+}
+
+export interface RequestProfile extends RequestProfileSummary {
+  interval_ms: number;
+  samples: number;
+  samples_running: number;
+  samples_await: number;
+  samples_ready: number;
+  sql: {
+    count: number;
+    seconds: number;
+    statements: Array<{ sql: string; seconds: number; rows: number | null; error: string | null }>;
+    dropped: number;
+  };
+  /** Collapsed stacks ("a;b;c count" per line) for flamegraph.pl / speedscope. */
+  folded: string;
+}
+
+export async function fetchRequestProfiles(): Promise<RequestProfileSummary[]> {
+  const { data } = await api.get<{ items: RequestProfileSummary[] }>('/admin/profiling');
+  return data.items;
+}
+
+export async function fetchRequestProfile(id: string): Promise<RequestProfile> {
+  const { data } = await api.get<RequestProfile>(`/admin/profiling/${encodeURIComponent(id)}`);
   return data;
 }
 
@@ -64,15 +181,35 @@ export interface DbTable {
 
 export interface DbTableRowsResponse {
   total: number;
+  // rows read with `preview` may carry `_truncated: { column: fullSizeBytes }`,
+  // rows read with `labels` carry `_refs: { fkColumn: label | null }`
   rows: Record<string, any>[];
 }
 
+export interface DbTableRowsOptions {
+  columns?: string[];
+  preview?: number;
+  /** Resolve foreign key values to labels, returned per row in `_refs`. */
+  labels?: boolean;
+}
+
+export interface DbConnectionHealth {
+  state: 'closed' | 'open' | 'half_open';
+  last_latency_ms: number | null;
+  last_error: string | null;
+  last_check: number | null;
+  consecutive_failures: number;
+  recent_failure_rate: number | null;
+  history: { at: number; ok: boolean; latency_ms: number | null; error: string | null }[];
+}
+
 export interface DbConnectionInfo {
   id: number;
   name: string;
   dsn: string;
   read_only: boolean;
   active: boolean;
+  health?: DbConnectionHealth | null;
 }
 
 export interface DbTableColumnMeta {
@@ -85,11 +222,22 @@ export interface DbTableColumnMeta {
   is_unique: boolean;
 }
 
+export interface DbForeignKey {
+  name: string;
+  columns: string[];
+  ref_schema: string;
+  ref_table: string;
+  ref_columns: string[];
+  /** Column used as display label of referenced rows (table meta only). */
+  label_column?: string | null;
+}
+
 export interface DbTableMeta {
   schema: string;
   name: string;
   primary_key: string[];
   unique_indexes: { name: string; columns: string[] }[];
+  foreign_keys: DbForeignKey[];
   columns: DbTableColumnMeta[];
 }
 
@@ -124,10 +272,68 @@ export async function fetchDbTableRows(
   table: string,
   limit: number,
   offset: number,
+  options: DbTableRowsOptions = {},
 ): Promise<DbTableRowsResponse> {
   const { data } = await api.get<DbTableRowsResponse>(
     `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}`,
-    { params: { limit, offset } },
+    {
+      params: {
+        limit,
+        offset,
+        columns: options.columns?.join(','),
+        preview: options.preview,
+        labels: options.labels || undefined,
+      },
+    },
+  );
+  return data;
+}
+
+export interface DbTableSampleResponse {
+  rows: DbTableRowsResponse['rows'];
+  sample: {
+    method: 'system' | 'bernoulli';
+    /** pass back to get the same rows again */
+    seed: number;
+    percent: number;
+    attempts: number;
+    estimated_rows: number;
+    estimate_source: 'statistics' | 'relation_size';
+  };
+}
+
+/** Random sample of about `rows` rows via TABLESAMPLE; cheap on huge tables. */
+export async function fetchDbTableSample(
+  schema: string,
+  table: string,
+  rows: number,
+  options: DbTableRowsOptions & { method?: 'system' | 'bernoulli'; seed?: number } = {},
+): Promise<DbTableSampleResponse> {
+  const { data } = await api.get<DbTableSampleResponse>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/sample`,
+    {
+      params: {
+        rows,
+        method: options.method,
+        seed: options.seed,
+        columns: options.columns?.join(','),
+        preview: options.preview,
+        labels: options.labels || undefined,
+      },
+    },
+  );
+  return data;
+}
+
+export async function fetchDbCell(
+  schema: string,
+  table: string,
+  column: string,
+  key: Record<string, any>,
+): Promise<{ column: string; value: any; encoding: 'base64' | null }> {
+  const { data } = await api.get<{ column: string; value: any; encoding: 'base64' | null }>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/cell`,
+    { params: { column, key: JSON.stringify(key) } },
   );
   return data;
 }
@@ -158,8 +364,10 @@ export async function createDbConnection(
   return data;
 }
 
-export async function activateDbConnection(connId: number): Promise<{ active: number }> {
-  const { data } = await api.post<{ active: number }>(`/admin/db/connections/${connId}/activate`, {});
+export async function activateDbConnection(connId: number, force = false): Promise<{ active: number }> {
+  const { data } = await api.post<{ active: number }>(`/admin/db/connections/${connId}/activate`, {}, {
+    params: force ? { force: true } : undefined,
+  });
   return data;
 }
 
@@ -170,6 +378,44 @@ export async function fetchDbTableMeta(schema: string, table: string): Promise<D
   return data;
 }
 
+export interface DbColumnProfile {
+  name: string;
+  data_type: string;
+  /** false: never analyzed, no other fields */
+  analyzed: boolean;
+  null_fraction?: number;
+  distinct_estimate?: number | null;
+  distinct_scales_with_rows?: boolean;
+  avg_width?: number;
+  correlation?: number | null;
+  most_common?: Array<{ value: unknown; frequency: number; estimated_rows: number | null }>;
+  other_fraction?: number;
+  histogram_bounds?: unknown[];
+  histogram_bucket_fraction?: number | null;
+}
+
+export interface DbTableStats {
+  schema: string;
+  table: string;
+  estimated_rows: number | null;
+  last_analyzed: string | null;
+  modified_since_analyze: number | null;
+  columns: DbColumnProfile[];
+}
+
+/** Value distributions from pg_stats (no table scan); analyze=true refreshes them first. */
+export async function fetchDbTableStats(
+  schema: string,
+  table: string,
+  options: { columns?: string[]; analyze?: boolean } = {},
+): Promise<DbTableStats> {
+  const { data } = await api.get<DbTableStats>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/stats`,
+    { params: { columns: options.columns?.join(','), analyze: options.analyze || undefined } },
+  );
+  return data;
+}
+
 export async function insertDbRow(
   schema: string,
   table: string,
@@ -207,4 +453,411 @@ export async function deleteDbRow(
   return data;
 }
 
+export interface DbFilter {
+  column: string;
+  op: '=' | '!=' | '<' | '<=' | '>' | '>=' | 'like' | 'ilike' | 'in' | 'is_null' | 'not_null';
+  value?: any;
+}
+
+export interface BulkRowsPayload {
+  action: 'update' | 'delete';
+  where: DbFilter[];
+  values?: Record<string, any>;
+  chunk_size?: number;
+  throttle_ms?: number;
+  dry_run?: boolean;
+}
+
+export interface DbJob {
+  id: number;
+  kind: string;
+  owner: string;
+  params: Record<string, any>;
+  status: 'pending' | 'running' | 'done' | 'failed' | 'cancelled';
+  progress: Record<string, any>;
+  result: any;
+  error: string | null;
+  created_at: number;
+  elapsed_seconds: number | null;
+}
+
+export async function bulkDbRows(
+  schema: string,
+  table: string,
+  payload: BulkRowsPayload,
+): Promise<DbJob | { dry_run: true; estimated_rows: number; primary_key: string }> {
+  const { data } = await api.post(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/bulk`,
+    payload,
+  );
+  return data;
+}
+
+export type DbMaintenanceOperation = 'vacuum' | 'analyze' | 'reindex';
+
+/** Start VACUUM (ANALYZE) / ANALYZE / REINDEX CONCURRENTLY; progress has phase and percent. */
+export async function runDbMaintenance(
+  schema: string,
+  table: string,
+  operation: DbMaintenanceOperation,
+): Promise<DbJob> {
+  const { data } = await api.post<DbJob>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/maintenance`,
+    { operation },
+  );
+  return data;
+}
+
+export interface DbSession {
+  pid: number;
+  user: string | null;
+  application_name: string | null;
+  client_addr: string | null;
+  backend_type: string | null;
+  state: string | null;
+  wait_event_type: string | null;
+  wait_event: string | null;
+  session_seconds: number | null;
+  transaction_seconds: number | null;
+  query_seconds: number | null;
+  state_seconds: number | null;
+  holds_xmin: boolean;
+  query: string | null;
+  blocked_by: number[];
+  blocking: number[];
+  lock_type: string | null;
+  lock_mode: string | null;
+  lock_relation: string | null;
+  flags: Array<'long_transaction' | 'idle_in_transaction' | 'blocked' | 'blocking'>;
+}
+
+export interface DbBlockingNode {
+  pid: number;
+  blocked: DbBlockingNode[];
+}
+
+export interface DbActivity {
+  sessions: DbSession[];
+  chains: Array<{ root: DbBlockingNode; blocked_sessions: number }>;
+  summary: {
+    total: number;
+    states: Record<string, number>;
+    blocked: number;
+    long_transactions: number;
+    idle_in_transaction: number;
+    oldest_transaction_seconds: number | null;
+  };
+  thresholds: { long_transaction_seconds: number; idle_in_transaction_seconds: number };
+}
+
+/** Sessions and blocking chains of the active database; cheap enough to poll every few seconds. */
+export async function fetchDbActivity(includeIdle = false): Promise<DbActivity> {
+  const { data } = await api.get<DbActivity>('/admin/db/activity', { params: { include_idle: includeIdle } });
+  return data;
+}
+
+export async function signalDbBackend(pid: number, action: 'cancel' | 'terminate') {
+  const { data } = await api.post(`/admin/db/activity/${pid}/${action}`);
+  return data as { pid: number; action: string; signalled: boolean };
+}
+
+export async function fetchDbJob(jobId: number): Promise<DbJob> {
+  const { data } = await api.get<DbJob>(`/admin/db/jobs/${jobId}`);
+  return data;
+}
+
+export async function cancelDbJob(jobId: number): Promise<{ cancelled: number }> {
+  const { data } = await api.post<{ cancelled: number }>(`/admin/db/jobs/${jobId}/cancel`, {});
+  return data;
+}
+
+export type DbAuditEvent = {
+  id: number;
+  at: string;
+  user: string;
+  connection_id: number;
+  connection_name: string | null;
+  action: 'insert' | 'update' | 'delete' | 'create_table' | 'drop_table';
+  schema: string;
+  table: string;
+  key: Record<string, unknown> | null;
+  before: unknown;
+  after: unknown;
+};
+
+export type DbAuditPage = {
+  items: DbAuditEvent[];
+  next_before_id: number | null;
+  writer: { queued: number; written: number; dropped: number; failed_batches: number; last_error: string | null };
+};
+
+export type DbAuditQuery = {
+  limit?: number;
+  before_id?: number;
+  user?: string;
+  action?: DbAuditEvent['action'];
+  connection_id?: number;
+  schema?: string;
+  table?: string;
+};
+
+export async function fetchDbAudit(query: DbAuditQuery = {}): Promise<DbAuditPage> {
+  const { data } = await api.get<DbAuditPage>('/admin/db/audit', { params: query });
+  return data;
+}
+
+export interface DbRowChange {
+  schema: string;
+  table: string;
+  op: 'INSERT' | 'UPDATE' | 'DELETE';
+  key: Record<string, any>;
+  row?: Record<string, any> | null;
+}
+
+export type DbChangeFeedEvent =
+  | { type: 'changes'; schema: string; table: string; changes: DbRowChange[] }
+  | { type: 'reset'; reason: string };
+
+export async function enableDbChangeFeed(schema: string, table: string): Promise<{ enabled: boolean; key: string[] }> {
+  const { data } = await api.post<{ enabled: boolean; key: string[] }>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/feed`,
+    {},
+  );
+  return data;
+}
+
+export async function disableDbChangeFeed(schema: string, table: string): Promise<{ enabled: boolean }> {
+  const { data } = await api.delete<{ enabled: boolean }>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/feed`,
+  );
+  return data;
+}
+
+// EventSource cannot send the Authorization header, so the SSE stream is read via fetch.
+// Returns a function that closes the subscription.
+export function subscribeDbTableChanges(
+  schema: string,
+  table: string,
+  onEvent: (event: DbChangeFeedEvent) => void,
+): () => void {
+  const controller = new AbortController();
+  const token = localStorage.getItem('access_token');
+  const url = `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/feed/events`;
+
+  (async () => {
+    const resp = await fetch(url, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      credentials: 'include',
+      signal: controller.signal,
+    });
+    if (!resp.ok || !resp.body) return;
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let sep = buffer.indexOf('\n\n');
+      while (sep >= 0) {
+        const chunk = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        const dataLines = chunk.split('\n').filter((l) => l.startsWith('data: '));
+        if (dataLines.length) {
+          onEvent(JSON.parse(dataLines.map((l) => l.slice(6)).join('\n')));
+        }
+        sep = buffer.indexOf('\n\n');
+      }
+    }
+  })().catch(() => {
+    // aborted or feed not enabled for this table: fall back to regular polling
+  });
+
+  return () => controller.abort();
+}
+
+export interface DbSchemaTable extends DbTableMeta {
+  full_name: string;
+  indexes: { name: string; is_unique: boolean; is_primary: boolean; definition: string }[];
+  foreign_keys: DbForeignKey[];
+}
+
+export interface DbSchemaSnapshot {
+  version: string;
+  tables: DbSchemaTable[];
+}
+
+export type DbSchemaDelta =
+  | ({ full: true } & DbSchemaSnapshot)
+  | { full: false; since: string; version: string; changed: DbSchemaTable[]; removed: string[] };
+
+export async function fetchDbSchema(): Promise<DbSchemaSnapshot> {
+  const { data } = await api.get<DbSchemaSnapshot>('/admin/db/schema');
+  return data;
+}
+
+export async function fetchDbSchemaDelta(since: string): Promise<DbSchemaDelta> {
+  const { data } = await api.get<DbSchemaDelta>('/admin/db/schema/delta', { params: { since } });
+  return data;
+}
+
+export interface DbSearchResult {
+  mode: 'indexed' | 'scan';
+  partial: boolean;
+  timed_out?: boolean;
+  columns_searched: string[];
+  unindexed_columns: string[];
+  rows: (Record<string, any> & { _score: number | null })[];
+}
+
+export async function searchDbTable(
+  schema: string,
+  table: string,
+  q: string,
+  limit = 50,
+  columns?: string[],
+): Promise<DbSearchResult> {
+  const { data } = await api.get<DbSearchResult>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/search`,
+    { params: { q, limit, columns: columns?.join(',') } },
+  );
+  return data;
+}
+
+export async function createDbSearchIndex(
+  schema: string,
+  table: string,
+  columns: string[],
+  kind: 'trgm' | 'fts' = 'trgm',
+): Promise<DbJob> {
+  const { data } = await api.post<DbJob>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/search/index`,
+    { columns, kind },
+  );
+  return data;
+}
+
+export async function exportDbTable(
+  schema: string,
+  table: string,
+  format: 'arrow' | 'parquet',
+  options: { columns?: string[]; where?: DbFilter[]; batch_size?: number } = {},
+): Promise<Blob> {
+  const { data } = await api.get<Blob>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/export`,
+    {
+      params: {
+        format,
+        batch_size: options.batch_size,
+        columns: options.columns?.join(','),
+        where: options.where ? JSON.stringify(options.where) : undefined,
+      },
+      responseType: 'blob',
+    },
+  );
+  return data;
+}
+
 export default api;
+
+export type DbFanoutRequest =
+  | { probe: 'tables' | 'sizes' | 'row_estimates'; connections?: number[]; timeout_ms?: number; max_rows?: number }
+  | { sql: string; params?: Record<string, any>; connections?: number[]; timeout_ms?: number; max_rows?: number };
+
+export interface DbFanoutResult {
+  connection_id: number;
+  name: string;
+  ok: boolean;
+  rows?: Record<string, any>[];
+  truncated?: boolean;
+  error?: string;
+  elapsed_ms: number;
+}
+
+// Streams NDJSON: onResult is called once per connection as soon as it answers.
+export async function fanoutDbQuery(
+  request: DbFanoutRequest,
+  onResult: (result: DbFanoutResult) => void,
+  signal?: AbortSignal,
+): Promise<void> {
+  const token = localStorage.getItem('access_token');
+  const resp = await fetch('/admin/db/fanout', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    credentials: 'include',
+    body: JSON.stringify(request),
+    signal,
+  });
+  if (!resp.ok || !resp.body) {
+    throw new Error(`Fan-out failed: ${resp.status}`);
+  }
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl = buffer.indexOf('\n');
+    while (nl >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (line) onResult(JSON.parse(line));
+      nl = buffer.indexOf('\n');
+    }
+  }
+}
+
+export interface DiffTablePayload {
+  target: number;
+  source?: number;
+  target_schema?: string;
+  target_table?: string;
+  parts?: number;
+  leaf_rows?: number;
+  max_keys?: number;
+}
+
+/** Result of a finished `diff_table` job. */
+export interface DbTableDiffResult {
+  equal: boolean;
+  source_rows: number;
+  target_rows: number;
+  only_in_source: Record<string, any>[];
+  only_in_target: Record<string, any>[];
+  changed: Record<string, any>[];
+  truncated: boolean;
+  levels: number;
+  ranges_compared: number;
+  rows_fetched: number;
+}
+
+export async function diffDbTable(schema: string, table: string, payload: DiffTablePayload): Promise<DbJob> {
+  const { data } = await api.post<DbJob>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/diff`,
+    payload,
+  );
+  return data;
+}
+
+export interface CopyTablePayload {
+  target: number;
+  source?: number;
+  target_schema?: string;
+  target_table?: string;
+  create?: boolean;
+  truncate?: boolean;
+  workers?: number;
+  format?: 'binary' | 'text' | 'csv';
+}
+
+export async function copyDbTable(schema: string, table: string, payload: CopyTablePayload): Promise<DbJob> {
+  const { data } = await api.post<DbJob>(
+    `/admin/db/table/${encodeURIComponent(schema)}/${encodeURIComponent(table)}/copy`,
+    payload,
+  );
+  return data;
+}
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+
+from app.api.routes import db_admin
+from app.core.tenancy import current_tenant_schema
+from app.services import activity
+
+_ADMIN = SimpleNamespace(email="admin@example.com", is_admin=True)
+
+
+def _row(pid, state="active", blocked_by=(), transaction_seconds=1.0, state_seconds=1.0):
+    return {
+        "pid": pid,
+        "state": state,
+        "blocked_by": list(blocked_by),
+        "transaction_seconds": transaction_seconds,
+        "state_seconds": state_seconds,
+    }
+
+
+def test_blocking_chain_and_flags():
+    rows = [
+        _row(10, state="idle in transaction", transaction_seconds=600, state_seconds=300),
+        _row(11, blocked_by=[10]),
+        _row(12, blocked_by=[11]),
+        _row(13, blocked_by=[10]),
+        _row(14, state="idle", transaction_seconds=None),
+    ]
+    report = activity.build_report(rows, long_transaction_seconds=60, idle_in_transaction_seconds=10)
+
+    assert report["chains"] == [
+        {
+            "root": {
+                "pid": 10,
+                "blocked": [{"pid": 11, "blocked": [{"pid": 12, "blocked": []}]}, {"pid": 13, "blocked": []}],
+            },
+            "blocked_sessions": 3,
+        }
+    ]
+    by_pid = {s["pid"]: s for s in report["sessions"]}
+    assert by_pid[10]["flags"] == ["long_transaction", "idle_in_transaction", "blocking"]
+    assert by_pid[11]["flags"] == ["blocked", "blocking"]
+    # plain idle sessions are hidden by default
+    assert 14 not in by_pid
+    assert report["summary"]["blocked"] == 3
+    assert report["summary"]["oldest_transaction_seconds"] == 600
+
+
+def test_cycles_and_foreign_blockers_are_reported():
+    rows = [_row(1, blocked_by=[2]), _row(2, blocked_by=[1]), _row(3, blocked_by=[99])]
+    chains = activity.build_report(rows, 60, 10)["chains"]
+    # pid 99 is not in this database's list but still roots its chain
+    assert {c["root"]["pid"] for c in chains} == {99, 1}
+    assert all(c["blocked_sessions"] == 1 for c in chains)
+
+
+class _PermissionDenied(Exception):
+    sqlstate = "42501"
+
+
+class _FailingEngine:
+    def connect(self):
+        raise DBAPIError("SELECT pg_cancel_backend(...)", {}, _PermissionDenied("must be a superuser"))
+
+
+async def test_signal_without_privilege_is_forbidden(monkeypatch):
+    async def _engine():
+        return _FailingEngine()
+
+    monkeypatch.setattr(db_admin, "get_active_engine", _engine)
+    with pytest.raises(HTTPException) as exc_info:
+        await db_admin.signal_backend(42, "terminate", current_user=_ADMIN)
+    assert exc_info.value.status_code == 403
+
+
+async def test_activity_is_refused_within_tenant_scope():
+    token = current_tenant_schema.set("acme")
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await db_admin.signal_backend(42, "cancel", current_user=_ADMIN)
+    finally:
+        current_tenant_schema.reset(token)
+    assert exc_info.value.status_code == 403
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import admission
+from app.core.admission import AdmissionController, Overloaded, admission_guard
+
+
+def _controller(**overrides):
+    params = dict(
+        class_limits={"cheap": 10, "scan": 1, "bulk": 1},
+        per_user_limit=2,
+        max_queue=1,
+        queue_timeout=0.2,
+    )
+    params.update(overrides)
+    return AdmissionController(**params)
+
+
+async def test_waiter_gets_slot_after_release():
+    ctl = _controller()
+    await ctl.acquire("scan", 0, 1)
+    waiter = asyncio.create_task(ctl.acquire("scan", 0, 2))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    await ctl.release("scan", 0, 1, 0.01)
+    await asyncio.wait_for(waiter, timeout=1)
+
+
+async def test_full_queue_and_timeout_are_rejected():
+    ctl = _controller()
+    await ctl.acquire("scan", 0, 1)
+    waiter = asyncio.create_task(ctl.acquire("scan", 0, 2))
+    await asyncio.sleep(0.01)
+    with pytest.raises(Overloaded) as exc:
+        await ctl.acquire("scan", 0, 3)
+    assert exc.value.retry_after >= 1
+    with pytest.raises(Overloaded):
+        await waiter
+
+
+async def test_limits_are_per_connection_and_per_user():
+    ctl = _controller(class_limits={"cheap": 10, "scan": 5, "bulk": 5})
+    await ctl.acquire("scan", 0, 1)
+    await ctl.acquire("bulk", 1, 1)
+    # user 1 holds two non-cheap slots; cheap requests are not counted
+    await ctl.acquire("cheap", 0, 1)
+    with pytest.raises(Overloaded):
+        await ctl.acquire("scan", 2, 1)
+    await ctl.acquire("scan", 2, 2)
+
+
+def _request(route_name):
+    return SimpleNamespace(scope={"route": SimpleNamespace(name=route_name)})
+
+
+async def test_non_admins_are_rejected_before_taking_a_slot(monkeypatch):
+    ctl = _controller()
+    monkeypatch.setattr(admission, "controller", ctl)
+    guard = admission_guard({"read_table": "scan"}, admin_only=True)
+    with pytest.raises(HTTPException) as exc_info:
+        await guard(_request("read_table"), SimpleNamespace(id=1, is_admin=False)).__anext__()
+    assert exc_info.value.status_code == 403
+    assert ctl.snapshot()["running"] == {}
+
+
+async def test_admin_only_can_name_single_endpoints(monkeypatch):
+    ctl = _controller()
+    monkeypatch.setattr(admission, "controller", ctl)
+    guard = admission_guard({"users_list": "scan"}, admin_only={"users_import"})
+    user = SimpleNamespace(id=1, is_admin=False)
+    scope = guard(_request("users_list"), user)
+    await scope.__anext__()
+    assert ctl.snapshot()["running"] == {"0:scan": 1}
+    await scope.aclose()
+    with pytest.raises(HTTPException):
+        await guard(_request("users_import"), user).__anext__()
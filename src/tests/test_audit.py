@@ -0,0 +1,91 @@
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import db_admin
+from app.core.tenancy import current_tenant_schema
+from app.services import audit
+
+
+@pytest.fixture(autouse=True)
+def fresh_audit(monkeypatch):
+    monkeypatch.setattr(audit, "_queue", None)
+    monkeypatch.setattr(audit, "_in_flight", [])
+    monkeypatch.setattr(audit, "_stats", {"written": 0, "dropped": 0, "failed_batches": 0, "last_error": None})
+    monkeypatch.setattr(audit.settings, "audit_queue_size", 2)
+    monkeypatch.setattr(audit.settings, "audit_batch_size", 3)
+    monkeypatch.setattr(audit.settings, "audit_enqueue_timeout_ms", 10)
+    monkeypatch.setattr(audit.settings, "audit_flush_interval_ms", 10)
+
+
+async def _record(n):
+    return [await audit.record("a@b.c", 0, None, "insert", "public", "t", after={"id": i}) for i in range(n)]
+
+
+async def test_full_queue_drops_after_timeout():
+    assert await _record(3) == [True, True, False]
+    assert audit.stats()["dropped"] == 1
+    assert audit.stats()["queued"] == 2
+
+
+async def test_batch_is_limited_by_size():
+    audit.settings.audit_queue_size = 10
+    await _record(5)
+    batch = []
+    await audit._fill_batch(audit._get_queue(), batch)
+    assert [e["after"]["id"] for e in batch] == [0, 1, 2]
+
+
+async def test_stop_writer_flushes_pending(monkeypatch):
+    written = []
+
+    async def fake_write(batch):
+        written.extend(batch)
+
+    monkeypatch.setattr(audit, "_write", fake_write)
+    monkeypatch.setattr(audit, "_engine", object())
+    await _record(2)
+    audit._in_flight.append({"after": {"id": "in-flight"}})
+    await audit.stop_writer()
+    assert [e["after"]["id"] for e in written] == ["in-flight", 0, 1]
+    assert audit.stats()["queued"] == 0
+
+
+class _Events:
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+async def _audit_query(monkeypatch, **filters):
+    queries = []
+
+    class _Session:
+        async def execute(self, q):
+            queries.append(q)
+            return _Events()
+
+    @contextlib.asynccontextmanager
+    async def _session(_engine):
+        yield _Session()
+
+    monkeypatch.setattr(db_admin, "request_session", _session)
+    args = {"limit": 50, "before_id": None, "user": None, "action": None, "connection_id": None, "schema": None, "table": None}
+    await db_admin.audit_log(**{**args, **filters}, current_user=SimpleNamespace(is_admin=True))
+    return str(queries[0].compile(compile_kwargs={"literal_binds": True}))
+
+
+async def test_audit_log_is_limited_to_the_tenant_schema(monkeypatch):
+    token = current_tenant_schema.set("acme")
+    try:
+        assert "admin_audit_events.schema_name = 'acme'" in await _audit_query(monkeypatch)
+        with pytest.raises(HTTPException) as exc_info:
+            await _audit_query(monkeypatch, schema="other")
+        assert exc_info.value.status_code == 403
+    finally:
+        current_tenant_schema.reset(token)
+    assert "schema_name =" not in await _audit_query(monkeypatch)
@@ -0,0 +1,119 @@
+import asyncio
+import contextlib
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import db_admin
+from app.services import bulk_service
+from app.services.bulk_service import BulkPlan, run_bulk
+from app.services.jobs import Job
+
+
+class _Result:
+    def __init__(self, value=None, row=None, rowcount=0):
+        self.value = value
+        self.row = row
+        self.rowcount = rowcount
+
+    def scalar_one(self):
+        return self.value
+
+    def one(self):
+        return self.row
+
+
+class _Table:
+    """Primary keys of a table; every row matches the bulk predicate."""
+
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.transactions = 0
+
+    async def execute(self, q, params=None):
+        sql = str(q)
+        if sql.startswith("SELECT min("):
+            return _Result(row=(min(self.keys, default=None), max(self.keys, default=None)))
+        if sql.startswith("SELECT max(k)"):
+            lo = params.get("lo")
+            window = [k for k in self.keys if lo is None or k > lo][: params["chunk"]]
+            return _Result(value=max(window, default=None))
+        assert sql.startswith("DELETE FROM")
+        lo, hi = params.get("lo"), params["hi"]
+        hit = [k for k in self.keys if (lo is None or k > lo) and k <= hi]
+        self.keys = [k for k in self.keys if k not in hit]
+        return _Result(rowcount=len(hit))
+
+
+class _FakeEngine:
+    def __init__(self, table):
+        self.table = table
+
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        yield self.table
+
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        self.table.transactions += 1
+        yield self.table
+
+
+@pytest.fixture(autouse=True)
+def _no_estimate(monkeypatch):
+    async def _estimate(_engine, _identifier, _where_sql, _params):
+        return 10
+
+    monkeypatch.setattr(bulk_service, "estimate_matching_rows", _estimate)
+
+
+def _plan():
+    return BulkPlan("public", "items", "delete", "id", "true", {}, None)
+
+
+async def test_run_bulk_commits_one_transaction_per_chunk():
+    table = _Table(range(1, 11))
+    job = Job(1, "bulk_delete", "admin@example.com", {})
+    result = await run_bulk(job, _FakeEngine(table), _plan(), 4, 0)
+    assert result == {"affected": 10, "chunks": 3}
+    assert table.transactions == 3 and table.keys == []
+    assert job.progress["last_key"] == 10 and job.progress["percent"] == 100.0
+
+
+async def test_run_bulk_on_empty_table_does_nothing():
+    result = await run_bulk(Job(1, "bulk_delete", "a", {}), _FakeEngine(_Table([])), _plan(), 4, 0)
+    assert result == {"affected": 0, "chunks": 0}
+
+
+async def test_cancel_during_throttle_keeps_committed_chunks(monkeypatch):
+    table = _Table(range(1, 11))
+    job = Job(1, "bulk_delete", "a", {})
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def _sleep(seconds):
+        sleeps.append(seconds)
+        await real_sleep(3600)
+
+    monkeypatch.setattr(bulk_service.asyncio, "sleep", _sleep)
+    task = asyncio.create_task(run_bulk(job, _FakeEngine(table), _plan(), 4, 0.25))
+    while not sleeps:
+        await real_sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert sleeps == [0.25]
+    assert job.progress["chunks"] == 1 and job.progress["affected"] == 4
+    assert table.keys == list(range(5, 11))
+
+
+@pytest.mark.parametrize("value", ["abc", 1.5, True, [1], {"n": 1}])
+def test_int_fields_reject_non_integers(value):
+    with pytest.raises(HTTPException) as exc_info:
+        db_admin._int_field({"chunk_size": value}, "chunk_size", 1000)
+    assert exc_info.value.status_code == 400
+
+
+def test_int_fields_default_when_absent():
+    assert db_admin._int_field({}, "chunk_size", 1000) == 1000
+    assert db_admin._int_field({"chunk_size": "250"}, "chunk_size", 1000) == 250
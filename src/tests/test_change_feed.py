@@ -0,0 +1,160 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services import change_feed
+
+
+class _Conn:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, q, params=None):
+        self.executed.append(str(q))
+
+
+class _Engine:
+    def __init__(self):
+        self.conn = _Conn()
+
+    @asynccontextmanager
+    async def begin(self):
+        yield self.conn
+
+
+def _notify(hub, op, key, table="orders"):
+    payload = json.dumps({"schema": "public", "table": table, "op": op, "key": key})
+    hub._on_notify(None, 1, change_feed.CHANNEL, payload)
+
+
+async def _hub(monkeypatch, debounce=0.01):
+    hub = change_feed.ChangeFeedHub(_Engine(), debounce)
+    calls = []
+
+    async def _listen():
+        calls.append(1)
+
+    monkeypatch.setattr(hub, "_ensure_listening", _listen)
+    return hub, calls
+
+
+async def test_notifications_are_coalesced_per_row(monkeypatch):
+    hub, _ = await _hub(monkeypatch)
+    sub = await hub.subscribe("public", "orders")
+    other = await hub.subscribe("public", "customers")
+
+    _notify(hub, "UPDATE", {"id": 1})
+    _notify(hub, "UPDATE", {"id": 2})
+    # last operation on a row within the window wins
+    _notify(hub, "DELETE", {"id": 1})
+    await asyncio.sleep(0.05)
+
+    batch = sub.queue.get_nowait()
+    assert batch["type"] == "changes"
+    assert sorted((c["key"]["id"], c["op"]) for c in batch["changes"]) == [(1, "DELETE"), (2, "UPDATE")]
+    assert sub.queue.empty() and other.queue.empty()
+
+
+async def test_unsubscribing_last_subscriber_stops_listening(monkeypatch):
+    hub, _ = await _hub(monkeypatch)
+    stopped = []
+
+    async def _stop():
+        stopped.append(1)
+
+    monkeypatch.setattr(hub, "_stop", _stop)
+    first = await hub.subscribe("public", "orders")
+    second = await hub.subscribe("public", "orders")
+    await hub.unsubscribe(first)
+    assert stopped == []
+    await hub.unsubscribe(second)
+    assert stopped == [1]
+
+
+async def test_lost_listener_reconnects_with_backoff(monkeypatch):
+    monkeypatch.setattr(change_feed, "RECONNECT_MIN_SECONDS", 0.001)
+    hub, _ = await _hub(monkeypatch)
+    sub = await hub.subscribe("public", "orders")
+    attempts = []
+
+    async def _flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OSError("connection refused")
+
+    monkeypatch.setattr(hub, "_ensure_listening", _flaky)
+    hub._conn = lost = object()
+    hub._on_terminated(lost)
+    await asyncio.wait_for(hub._reconnect_task, 1)
+
+    assert len(attempts) == 3
+    assert [sub.queue.get_nowait()["reason"] for _ in range(2)] == ["listener_lost", "listener_restored"]
+
+
+async def test_closing_a_stale_connection_is_ignored(monkeypatch):
+    hub, _ = await _hub(monkeypatch)
+    sub = await hub.subscribe("public", "orders")
+    hub._conn = None
+    hub._on_terminated(object())
+    assert sub.queue.empty() and hub._reconnect_task is None
+
+
+def test_slow_subscriber_gets_reset_on_overflow():
+    sub = change_feed.Subscription("public", "orders")
+    for i in range(change_feed.SUBSCRIBER_QUEUE_SIZE + 1):
+        sub.offer({"type": "changes", "n": i})
+    assert sub.queue.qsize() == 1
+    assert sub.queue.get_nowait() == {"type": "reset", "reason": "overflow"}
+
+
+async def test_install_trigger_passes_key_columns(monkeypatch):
+    async def _pk(conn, schema, table):
+        return ["tenant_id", "id"]
+
+    monkeypatch.setattr(change_feed, "fetch_primary_key", _pk)
+    engine = _Engine()
+    assert await change_feed.install_trigger(engine, "public", "orders") == ["tenant_id", "id"]
+    create_fn, drop, create = engine.conn.executed
+    assert "pg_notify" in create_fn and change_feed.CHANNEL in create_fn
+    assert drop == f'DROP TRIGGER IF EXISTS {change_feed.TRIGGER_NAME} ON "public"."orders"'
+    assert create.endswith(f"EXECUTE FUNCTION {change_feed.FUNCTION_NAME}('tenant_id', 'id')")
+
+
+async def test_install_trigger_requires_primary_key(monkeypatch):
+    async def _no_pk(conn, schema, table):
+        return []
+
+    monkeypatch.setattr(change_feed, "fetch_primary_key", _no_pk)
+    with pytest.raises(ValueError):
+        await change_feed.install_trigger(_Engine(), "public", "logs")
+
+
+async def test_replaced_hub_is_retired(monkeypatch):
+    monkeypatch.setattr(change_feed, "_hubs", {})
+    old_engine = _Engine()
+    old = change_feed.get_hub(7, old_engine, 0.01)
+    assert change_feed.get_hub(7, old_engine, 0.01) is old
+    stopped = []
+
+    async def _listen():
+        pass
+
+    async def _stop():
+        stopped.append(1)
+
+    monkeypatch.setattr(old, "_ensure_listening", _listen)
+    monkeypatch.setattr(old, "_stop", _stop)
+    sub = await old.subscribe("public", "orders")
+
+    # e.g. the connection was registered again with a new engine
+    new = change_feed.get_hub(7, _Engine(), 0.01)
+    await asyncio.sleep(0)
+    assert new is not old and change_feed._hubs[7] is new
+    assert stopped == [1]
+    assert sub.closed and sub.queue.get_nowait() == {"type": "reset", "reason": "connection_changed"}
+    # notifications still arriving on the old connection reach nobody
+    _notify(old, "UPDATE", {"id": 1})
+    await asyncio.sleep(0.03)
+    assert sub.queue.empty()
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from app.services import column_stats
+
+
+def test_parse_array_literals():
+    assert column_stats.parse_array('{a,"b c",NULL,"NULL","x\\\\y","q\\"t"}') == ["a", "b c", None, "NULL", "x\\y", 'q"t']
+    assert column_stats.parse_array("{}") == []
+    assert column_stats.parse_array("[0:1]={1,2}") == ["1", "2"]
+    # statistics of array columns hold nested literals
+    assert column_stats.parse_array('{"{1,2}",{3,"}"}}') == ["{1,2}", '{3,"}"}']
+    assert column_stats.parse_array(None) is None
+    with pytest.raises(ValueError):
+        column_stats.parse_array("1,2")
+
+
+def test_column_profile_from_pg_stats_row():
+    row = {
+        "name": "status",
+        "typname": "int4",
+        "data_type": "integer",
+        "null_frac": 0.1,
+        "n_distinct": -0.5,
+        "avg_width": 4,
+        "correlation": 0.9,
+        "most_common_vals": "{1,2}",
+        "most_common_freqs": [0.5, 0.2],
+        "histogram_bounds": "{3,10,20}",
+    }
+    profile = column_stats.column_profile(row, 1000.0)
+    assert profile["distinct_estimate"] == 500
+    assert profile["most_common"][0] == {"value": 1, "frequency": 0.5, "estimated_rows": 500}
+    assert profile["histogram_bounds"] == [3, 10, 20]
+    assert profile["other_fraction"] == pytest.approx(0.2)
+    assert profile["histogram_bucket_fraction"] == pytest.approx(0.1)
+
+    never_analyzed = dict(row, null_frac=None)
+    assert column_stats.column_profile(never_analyzed, -1.0) == {
+        "name": "status", "data_type": "integer", "analyzed": False,
+    }
+    # reltuples = -1: no row estimate for fractional n_distinct
+    assert column_stats.distinct_estimate(-0.5, -1.0) is None
+
+
+def test_non_finite_floats_stay_strings():
+    row = {
+        "name": "ratio", "typname": "float8", "data_type": "double precision",
+        "null_frac": 0.0, "n_distinct": 3.0, "avg_width": 8, "correlation": None,
+        "most_common_vals": "{NaN,Infinity,0.5}", "most_common_freqs": [0.3, 0.3, 0.3],
+        "histogram_bounds": "{-Infinity,1.5,Infinity}",
+    }
+    profile = column_stats.column_profile(row, 10.0)
+    assert [m["value"] for m in profile["most_common"]] == ["NaN", "Infinity", 0.5]
+    assert profile["histogram_bounds"] == ["-Infinity", 1.5, "Infinity"]
+    # responses are rendered with allow_nan=False
+    json.dumps(profile, allow_nan=False)
@@ -0,0 +1,36 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core import db_monitor
+from app.core.db_monitor import DbHealth
+
+
+def test_breaker_opens_after_threshold_and_closes_on_success():
+    health = DbHealth(99, engine=None)
+    db_monitor._health[99] = health
+    try:
+        for _ in range(db_monitor.settings.db_breaker_failure_threshold - 1):
+            health.record(False, None, "connection refused")
+        assert health.state == "closed"
+        db_monitor.ensure_available(99)
+
+        health.record(False, None, "connection refused")
+        assert health.state == "open"
+        with pytest.raises(HTTPException) as exc:
+            db_monitor.ensure_available(99)
+        assert exc.value.status_code == 503
+        assert "Retry-After" in exc.value.headers
+
+        health.state = "half_open"
+        health.record(True, 1.5, None)
+        assert health.state == "closed"
+        assert health.to_dict()["last_latency_ms"] == 1.5
+    finally:
+        db_monitor._health.pop(99, None)
+
+
+def test_failed_half_open_probe_reopens():
+    health = DbHealth(98, engine=None)
+    health.state = "half_open"
+    health.record(False, None, "timeout")
+    assert health.state == "open"
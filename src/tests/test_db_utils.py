@@ -0,0 +1,29 @@
+import pytest
+
+from app.services.db_utils import build_where, quote_ident, table_identifier
+
+
+def test_quote_ident_rejects_injection():
+    assert quote_ident("users") == '"users"'
+    assert table_identifier("public", "users") == '"public"."users"'
+    for bad in ("", 'a"b', "a;b", "a\\b"):
+        with pytest.raises(ValueError):
+            quote_ident(bad)
+
+
+def test_build_where_binds_values():
+    sql, params = build_where(
+        [
+            {"column": "status", "op": "=", "value": "stale"},
+            {"column": "id", "op": "in", "value": [1, 2]},
+            {"column": "deleted_at", "op": "not_null"},
+        ]
+    )
+    assert sql == '("status" = :f0) AND ("id" = ANY(:f1)) AND ("deleted_at" IS NOT NULL)'
+    assert params == {"f0": "stale", "f1": [1, 2]}
+
+
+def test_build_where_rejects_unknown_op():
+    assert build_where([]) == ("TRUE", {})
+    with pytest.raises(ValueError):
+        build_where([{"column": "id", "op": "; drop", "value": 1}])
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.services import fanout
+
+
+async def _collect(targets, timeout_ms=1000):
+    return [item async for item in fanout.fan_out(targets, "SELECT 1", {}, timeout_ms, 10)]
+
+
+@pytest.fixture
+def fake_query(monkeypatch):
+    running = {"now": 0, "max": 0}
+
+    async def _query(engine, sql, params, timeout_ms, max_rows):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        try:
+            delay, error = engine
+            await asyncio.sleep(delay)
+            if error:
+                raise RuntimeError(error)
+            return {"rows": [{"delay": delay}], "truncated": False}
+        finally:
+            running["now"] -= 1
+
+    monkeypatch.setattr(fanout, "_query", _query)
+    return running
+
+
+async def test_results_arrive_in_completion_order(fake_query):
+    targets = [fanout.Target(0, "slow", (0.05, None)), fanout.Target(1, "fast", (0, None))]
+    items = await _collect(targets)
+    assert [i["name"] for i in items] == ["fast", "slow"]
+    assert all(i["ok"] for i in items)
+
+
+async def test_failures_are_reported_per_target(fake_query):
+    targets = [
+        fanout.Target(0, "broken", (0, "boom")),
+        fanout.Target(1, "down", None, unavailable="breaker open"),
+        fanout.Target(2, "ok", (0, None)),
+    ]
+    items = {i["name"]: i for i in await _collect(targets)}
+    assert items["broken"]["error"] == "boom"
+    assert items["down"]["error"] == "breaker open"
+    assert items["ok"]["ok"] is True
+
+
+async def test_concurrency_is_capped(fake_query, monkeypatch):
+    monkeypatch.setattr(fanout, "_semaphore", asyncio.Semaphore(2))
+    await _collect([fanout.Target(i, str(i), (0.01, None)) for i in range(6)])
+    assert fake_query["max"] == 2
+
+
+def test_probe_sql_scopes_to_tenant():
+    assert ":tenant" in fanout.probe_sql("tables", "acme")
+    assert ":tenant" not in fanout.probe_sql("sizes", None)
+    with pytest.raises(ValueError):
+        fanout.probe_sql("nope", None)
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from app.core import db_init, db_monitor, health
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class _Pool:
+    def __init__(self, size, checked_out, max_overflow=10):
+        self._size = size
+        self._checked_out = checked_out
+        self._max_overflow = max_overflow
+
+    def size(self):
+        return self._size
+
+    def checkedout(self):
+        return self._checked_out
+
+
+def _engine(checked_out):
+    return SimpleNamespace(pool=_Pool(5, checked_out))
+
+
+def _healthy_db(monkeypatch):
+    monkeypatch.setattr(db_init, "db_initialized", True)
+    # a fresh registry per test: the breaker state must not leak into other tests
+    monkeypatch.setattr(db_monitor, "_health", {})
+    db_monitor.register(0, None)
+    db_monitor.get_health(0).record(True, 1.0, None)
+
+
+def test_ready_when_all_checks_pass(monkeypatch):
+    _healthy_db(monkeypatch)
+    result = health.readiness(_engine(3))
+    assert result["ready"] is True
+    assert result["checks"]["pool"]["saturation"] == 0.2
+
+
+def test_not_ready_when_pool_saturated(monkeypatch):
+    _healthy_db(monkeypatch)
+    result = health.readiness(_engine(15))
+    assert result["ready"] is False
+    assert result["checks"]["pool"]["ok"] is False
+
+
+def test_not_ready_when_breaker_open(monkeypatch):
+    _healthy_db(monkeypatch)
+    for _ in range(settings.db_breaker_failure_threshold):
+        db_monitor.get_health(0).record(False, None, "down")
+    result = health.readiness(_engine(0))
+    assert result["ready"] is False
+    assert result["checks"]["database"]["reason"] == "breaker open"
+
+
+def test_loop_lag_over_threshold(monkeypatch):
+    _healthy_db(monkeypatch)
+    monkeypatch.setattr(health, "_lag_samples", health.deque())
+    health._record_lag(settings.readiness_max_loop_lag_ms + 1)
+    result = health.readiness(_engine(0))
+    assert result["checks"]["event_loop"]["ok"] is False
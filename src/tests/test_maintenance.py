@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import db_admin
+from app.services import maintenance
+from app.services.jobs import Job
+
+
+def test_guard_limits_operations_per_database():
+    assert maintenance.try_reserve("db1", 1)
+    assert not maintenance.try_reserve("db1", 1)
+    # other databases are independent
+    assert maintenance.try_reserve("db2", 1)
+    maintenance.release("db1")
+    assert maintenance.running("db1") == 0
+    assert maintenance.try_reserve("db1", 1)
+    maintenance.release("db1")
+    maintenance.release("db2")
+
+
+def test_progress_percent():
+    assert maintenance._with_percent({"phase": "scanning heap", "total": 200, "done": 50})["percent"] == 25.0
+    # phases without block counters (e.g. "initializing") have no percent
+    assert maintenance._with_percent({"phase": "initializing", "total": 0, "done": 0})["percent"] is None
+
+
+class _Result:
+    def __init__(self, value=None, row=None):
+        self.value = value
+        self.row = row
+
+    def scalar_one(self):
+        return self.value
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self.row
+
+
+class _Server:
+    """One backend running the command, its progress rows and pg_cancel_backend."""
+
+    def __init__(self):
+        self.progress = {}
+        self.finished = asyncio.Event()
+        self.cancelled_pid = None
+        self.polls = 0
+
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        yield _Conn(self)
+
+
+class _Conn:
+    def __init__(self, server):
+        self.server = server
+
+    async def execution_options(self, **_kwargs):
+        return self
+
+    async def execute(self, q, params=None):
+        sql = str(q)
+        if "pg_backend_pid()" in sql:
+            return _Result(value=4242)
+        if "pg_cancel_backend" in sql:
+            self.server.cancelled_pid = params["pid"]
+            return _Result()
+        for view, progress_q in maintenance.PROGRESS_Q.items():
+            if q is progress_q:
+                assert params == {"pid": 4242}
+                self.server.polls += 1
+                return _Result(row=self.server.progress.get(view))
+        await self.server.finished.wait()  # the maintenance command itself
+        return _Result()
+
+
+async def _until(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("condition not reached")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    async def _stats(_engine, _schema, _table):
+        return {"dead_tuples": 0}
+
+    monkeypatch.setattr(maintenance, "_table_stats", _stats)
+    return _Server()
+
+
+async def test_vacuum_progress_follows_the_analyze_pass(server):
+    job = Job(1, "maintenance", "a", {})
+    task = asyncio.create_task(maintenance.run_maintenance(job, server, "public", "items", "vacuum", 0.001))
+
+    server.progress = {"vacuum": {"phase": "scanning heap", "total": 200, "done": 50}}
+    await _until(lambda: job.progress.get("phase") == "scanning heap")
+    assert job.progress["percent"] == 25.0
+
+    server.progress = {"analyze": {"phase": "acquiring sample rows", "total": 10, "done": 5}}
+    await _until(lambda: job.progress.get("phase") == "acquiring sample rows")
+    assert job.progress == {
+        "operation": "vacuum", "phase": "acquiring sample rows", "total": 10, "done": 5, "percent": 50.0,
+    }
+
+    server.finished.set()
+    result = await task
+    assert result["operation"] == "vacuum" and result["after"] == {"dead_tuples": 0}
+    assert job.progress == {"operation": "vacuum", "phase": "done", "percent": 100.0}
+    assert server.cancelled_pid is None
+
+
+async def test_cancelling_the_job_cancels_the_backend(server):
+    job = Job(1, "maintenance", "a", {})
+    task = asyncio.create_task(maintenance.run_maintenance(job, server, "public", "items", "reindex", 0.001))
+    await _until(lambda: server.polls > 0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert server.cancelled_pid == 4242
+
+
+async def test_invalid_table_name_is_rejected_before_reserving():
+    with pytest.raises(HTTPException) as exc_info:
+        await db_admin.table_maintenance(
+            "public", 'items"; DROP', {"operation": "vacuum"},
+            current_user=SimpleNamespace(email="a@example.com", is_admin=True), ticket=None,
+        )
+    assert exc_info.value.status_code == 400
+    assert maintenance.running(db_admin._active_connection_key()) == 0
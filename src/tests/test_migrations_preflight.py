@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import admin
+from app.services import migrations
+
+OFFLINE_SQL = """BEGIN;
+
+-- Running upgrade 0002 -> 0003
+
+ALTER TABLE orders ADD COLUMN note TEXT;
+
+ALTER TABLE orders ALTER COLUMN amount TYPE NUMERIC(12, 2);
+
+CREATE INDEX ix_orders_customer ON orders (customer_id);
+
+CREATE FUNCTION touch() RETURNS trigger AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+UPDATE alembic_version SET version_num='0003' WHERE alembic_version.version_num = '0002';
+
+COMMIT;
+
+CREATE INDEX CONCURRENTLY ix_orders_status ON public.orders (status);
+"""
+
+
+def _classified(sql):
+    stmt = migrations.Statement(sql, None)
+    migrations.classify(stmt)
+    return stmt.table, stmt.lock, stmt.cost
+
+
+def test_split_keeps_dollar_quoted_bodies_and_revisions():
+    statements = migrations.split_statements(OFFLINE_SQL)
+    assert [s.keyword for s in statements] == [
+        "BEGIN", "ALTER", "ALTER", "CREATE", "CREATE", "UPDATE", "COMMIT", "CREATE",
+    ]
+    assert "RETURN NEW;" in statements[4].sql
+    assert statements[1].revision == "0003"
+
+
+def test_classify_lock_levels_and_costs():
+    assert _classified("ALTER TABLE orders ADD COLUMN note TEXT") == ("orders", "ACCESS EXCLUSIVE", "metadata")
+    assert _classified("ALTER TABLE orders ALTER COLUMN amount TYPE bigint") == ("orders", "ACCESS EXCLUSIVE", "rewrite")
+    assert _classified("ALTER TABLE orders ALTER COLUMN amount SET NOT NULL")[2] == "scan"
+    assert _classified(
+        "ALTER TABLE orders ADD CONSTRAINT fk FOREIGN KEY (c) REFERENCES customers (id) NOT VALID"
+    ) == ("orders", "SHARE ROW EXCLUSIVE", "metadata")
+    assert _classified("CREATE INDEX ix ON orders (c)") == ("orders", "SHARE", "index_build")
+    assert _classified('CREATE INDEX CONCURRENTLY ix ON public."Orders" (c)') == (
+        'public."Orders"', "SHARE UPDATE EXCLUSIVE", "index_build",
+    )
+    assert _classified("SELECT 1") == (None, None, "unknown")
+
+
+def test_risk_depends_on_lock_cost_and_size():
+    big, small = 10 * 2**30, 8192
+    limit = 2**30
+
+    def _risk(sql, size):
+        stmt = migrations.Statement(sql, None)
+        migrations.classify(stmt)
+        return migrations.risk(stmt, size, limit)
+
+    assert _risk("ALTER TABLE orders ALTER COLUMN a TYPE bigint", big) == "high"
+    assert _risk("ALTER TABLE orders ALTER COLUMN a TYPE bigint", small) == "medium"
+    assert _risk("ALTER TABLE orders ADD COLUMN note TEXT", big) == "medium"
+    # does not block writes, but a long build still loads a big table
+    assert _risk("CREATE INDEX CONCURRENTLY ix ON orders (c)", big) == "medium"
+    assert _risk("CREATE INDEX CONCURRENTLY ix ON orders (c)", small) == "low"
+    assert _risk("CREATE TABLE fresh (id int)", None) == "low"
+
+
+def test_blocks_group_transactions_as_retry_units():
+    units = migrations._blocks(migrations.split_statements(OFFLINE_SQL))
+    assert [(transactional, len(stmts)) for transactional, stmts in units] == [(True, 5), (False, 1)]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [{"lock_timeout_ms": "soon"}, {"retries": 1.5}, {"backoff_ms": -1}, {"statement_timeout_ms": 0}, {"guarded": "false"}],
+)
+async def test_upgrade_rejects_invalid_options(monkeypatch, payload):
+    def _never(*_args):
+        raise AssertionError("no migration may run for a rejected request")
+
+    monkeypatch.setattr(admin, "_get_alembic_config", _never)
+    with pytest.raises(HTTPException) as exc_info:
+        await admin.run_migrations_upgrade_head(payload, current_user=SimpleNamespace(is_admin=True))
+    assert exc_info.value.status_code == 400
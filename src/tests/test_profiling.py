@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from app.core import profiling
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def _app(scope, receive, send):
+    _busy(0.05)
+    await asyncio.sleep(0.05)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _call(middleware, headers):
+    sent = []
+
+    async def _send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/x", "headers": headers, "query_string": b""}
+    await middleware(scope, None, _send)
+    return dict(sent[0]["headers"]).get(b"x-profile-id")
+
+
+async def test_profiles_running_and_awaiting_time(monkeypatch):
+    async def _admin(scope):
+        return "admin@example.com"
+
+    monkeypatch.setattr(profiling, "_admin_email", _admin)
+    monkeypatch.setattr(profiling.settings, "profiling_interval_ms", 1.0)
+    monkeypatch.setattr(profiling.settings, "profiling_max_per_minute", 1)
+    profiling._started.clear()
+    middleware = profiling.ProfilingMiddleware(_app)
+
+    # no opt-in header: not profiled
+    assert await _call(middleware, []) is None
+
+    profile_id = (await _call(middleware, [(b"x-profile", b"1")])).decode()
+    profile = profiling.get_profile(profile_id).to_dict()
+    assert profile["status_code"] == 200
+    assert profile["samples_running"] > 0 and profile["samples_await"] > 0
+    stacks = profile["folded"].splitlines()
+    assert any("_busy" in s for s in stacks)
+    # every stack starts at the middleware, not in the server
+    assert all(s.startswith("ProfilingMiddleware.__call__") for s in stacks)
+
+    # global rate limit
+    assert await _call(middleware, [(b"x-profile", b"1")]) == b"rate-limited"
+
+
+async def test_failed_admin_lookup_runs_the_request_unprofiled(monkeypatch):
+    async def _admin(scope):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(profiling, "_admin_email", _admin)
+    middleware = profiling.ProfilingMiddleware(_app)
+    assert await _call(middleware, [(b"x-profile", b"1")]) is None
@@ -0,0 +1,77 @@
+from app.services import ref_labels
+from app.services.ref_labels import LabelCache, pick_label_column, resolve_labels
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Conn:
+    """Answers the foreign key query and records label queries."""
+
+    def __init__(self, foreign_keys, labels):
+        self.foreign_keys = foreign_keys
+        self.labels = labels
+        self.label_queries = []
+
+    async def execute(self, q, params):
+        if q is ref_labels.FOREIGN_KEYS_Q:
+            return _Result(self.foreign_keys)
+        self.label_queries.append(sorted(params["keys"]))
+        return _Result([(k, self.labels[k]) for k in params["keys"] if k in self.labels])
+
+
+FK = {
+    "name": "orders_customer_fk",
+    "columns": ["customer_id"],
+    "ref_schema": "public",
+    "ref_table": "customers",
+    "ref_columns": ["id"],
+    "ref_text_columns": ["email", "name"],
+}
+
+
+def test_pick_label_column_prefers_known_names():
+    assert pick_label_column(["email", "name"]) == "name"
+    assert pick_label_column(["notes"]) == "notes"
+    assert pick_label_column([]) is None
+
+
+def test_label_cache_evicts_least_recently_used():
+    cache = LabelCache(max_size=2)
+    cache.put_many(("c", "s", "t"), {1: "a", 2: "b"})
+    cache.get_many(("c", "s", "t"), [1])
+    cache.put_many(("c", "s", "t"), {3: "c"})
+    found, missing = cache.get_many(("c", "s", "t"), [1, 2, 3])
+    assert found == {1: "a", 3: "c"} and missing == [2]
+
+
+async def test_resolve_labels_batches_per_table_and_caches(monkeypatch):
+    monkeypatch.setattr(ref_labels, "label_cache", LabelCache())
+    conn = _Conn([FK], {1: "Ann", 2: "Bob"})
+    rows = [{"id": 10, "customer_id": 1}, {"id": 11, "customer_id": 2}, {"id": 12, "customer_id": 1},
+            {"id": 13, "customer_id": 3}, {"id": 14, "customer_id": None}]
+    await resolve_labels(conn, 0, "public", "orders", rows)
+    assert conn.label_queries == [[1, 2, 3]]
+    assert [r.get("_refs") for r in rows] == [
+        {"customer_id": "Ann"}, {"customer_id": "Bob"}, {"customer_id": "Ann"}, {"customer_id": None}, None,
+    ]
+
+    await resolve_labels(conn, 0, "public", "orders", [{"customer_id": 2}])
+    assert len(conn.label_queries) == 1
+
+
+def test_foreign_keys_of_a_missing_table_are_empty_not_an_error():
+    # ::regclass raises for an unknown table; to_regclass yields NULL and no rows
+    assert "to_regclass(" in ref_labels.FOREIGN_KEYS_SQL
+    assert "::regclass" not in ref_labels.FOREIGN_KEYS_SQL
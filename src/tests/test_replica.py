@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+from sqlalchemy.exc import OperationalError
+
+from app.core import replica
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+
+class _ReplicaEngine:
+    def __init__(self, in_recovery=True, lag=0.0, fail=False):
+        self.row = SimpleNamespace(in_recovery=in_recovery, lag=lag)
+        self.fail = fail
+
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        if self.fail:
+            raise OSError("connection refused")
+        yield self
+
+    async def execute(self, _q):
+        return _Result(self.row)
+
+
+@pytest.fixture
+def probe_state(monkeypatch):
+    """Keep the module-level probe state from leaking between tests."""
+    for name in ("replica_healthy", "replica_lag_seconds", "replica_last_error", "_last_check"):
+        monkeypatch.setattr(replica, name, getattr(replica, name))
+
+
+def _use_replica(monkeypatch, engine):
+    monkeypatch.setattr(replica, "replica_engine", engine)
+    monkeypatch.setattr(replica, "replica_healthy", True)
+    # the probe result is fresh: no probe runs during the test
+    monkeypatch.setattr(replica, "_last_check", float("inf"))
+
+
+@pytest.mark.parametrize(
+    "in_recovery, lag, healthy",
+    [(True, 0.0, True), (True, 60.0, False), (True, None, False), (False, 0.0, False)],
+)
+async def test_probe_checks_recovery_and_lag(probe_state, monkeypatch, in_recovery, lag, healthy):
+    monkeypatch.setattr(replica, "replica_engine", _ReplicaEngine(in_recovery, lag))
+    await replica._probe()
+    assert replica.replica_healthy is healthy
+    assert replica.replica_lag_seconds == lag
+    assert (replica.replica_last_error is None) is healthy
+
+
+async def test_unreachable_replica_is_marked_failed(probe_state, monkeypatch):
+    monkeypatch.setattr(replica, "replica_engine", _ReplicaEngine(fail=True))
+    await replica._probe()
+    assert not replica.replica_healthy
+    assert "connection refused" in replica.replica_last_error
+
+
+async def test_run_read_retries_on_primary_after_connection_error(probe_state, monkeypatch):
+    replica_engine, primary = _ReplicaEngine(), object()
+    _use_replica(monkeypatch, replica_engine)
+    calls = []
+
+    async def _read(engine):
+        calls.append(engine)
+        if engine is replica_engine:
+            raise OperationalError("SELECT 1", {}, OSError("connection reset"))
+        return "rows"
+
+    assert await replica.run_read(_read, primary) == ("rows", "primary")
+    assert calls == [replica_engine, primary]
+    assert not replica.replica_healthy
+
+
+async def test_run_read_does_not_retry_query_errors(probe_state, monkeypatch):
+    _use_replica(monkeypatch, _ReplicaEngine())
+
+    async def _read(_engine):
+        raise ValueError("bad filter")
+
+    with pytest.raises(ValueError):
+        await replica.run_read(_read, object())
+    assert replica.replica_healthy
+
+
+class _Session:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_exc):
+        return False
+
+    async def connection(self):
+        if self.fail:
+            raise OperationalError("connect", {}, OSError("connection refused"))
+
+
+async def _read_db_session(response):
+    gen = replica.get_read_db(response)
+    session = await gen.__anext__()
+    await gen.aclose()
+    return session
+
+
+async def test_get_read_db_falls_back_when_replica_cannot_connect(probe_state, monkeypatch):
+    _use_replica(monkeypatch, _ReplicaEngine())
+    monkeypatch.setattr(replica, "ReplicaSessionLocal", lambda: _Session("replica", fail=True))
+    monkeypatch.setattr(replica, "SessionLocal", lambda: _Session("primary"))
+    response = Response()
+    assert (await _read_db_session(response)).name == "primary"
+    assert response.headers[replica.NODE_HEADER] == "primary"
+    assert not replica.replica_healthy
+
+
+async def test_get_read_db_uses_a_healthy_replica(probe_state, monkeypatch):
+    _use_replica(monkeypatch, _ReplicaEngine())
+    monkeypatch.setattr(replica, "ReplicaSessionLocal", lambda: _Session("replica"))
+    response = Response()
+    assert (await _read_db_session(response)).name == "replica"
+    assert response.headers[replica.NODE_HEADER] == "replica"
+
+
+class _HangingEngine:
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        await asyncio.sleep(3600)  # unreachable host: the driver's connect timeout is long
+        yield self
+
+
+async def test_probe_timeout_covers_the_connect(probe_state, monkeypatch):
+    monkeypatch.setattr(replica, "replica_engine", _HangingEngine())
+    monkeypatch.setattr(replica, "PROBE_TIMEOUT_SECONDS", 0.01)
+    await asyncio.wait_for(replica._probe(), timeout=1)
+    assert not replica.replica_healthy
+    assert "timed out" in replica.replica_last_error
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.services.result_cache import ResultCache
+
+TABLE = (0, "public", "orders")
+
+
+def _loader(calls, value, gate=None):
+    async def load():
+        calls.append(value)
+        if gate is not None:
+            await gate.wait()
+        return value
+
+    return load
+
+
+async def test_second_request_is_a_hit():
+    cache, calls = ResultCache(10, 60), []
+    assert await cache.get_or_load(TABLE, "p1", _loader(calls, "rows")) == ("rows", "miss")
+    assert await cache.get_or_load(TABLE, "p1", _loader(calls, "rows")) == ("rows", "hit")
+    assert calls == ["rows"]
+
+
+async def test_concurrent_identical_requests_share_one_load():
+    cache, calls, gate = ResultCache(10, 60), [], asyncio.Event()
+    first = asyncio.create_task(cache.get_or_load(TABLE, "p1", _loader(calls, "rows", gate)))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_or_load(TABLE, "p1", _loader(calls, "other")))
+    await asyncio.sleep(0)
+    gate.set()
+    assert await first == ("rows", "miss")
+    assert await second == ("rows", "coalesced")
+    assert calls == ["rows"]
+
+
+async def test_invalidation_during_load_discards_result():
+    cache, calls, gate = ResultCache(10, 60), [], asyncio.Event()
+    task = asyncio.create_task(cache.get_or_load(TABLE, "p1", _loader(calls, "stale", gate)))
+    await asyncio.sleep(0)
+    cache.invalidate(TABLE)
+    gate.set()
+    await task
+    assert await cache.get_or_load(TABLE, "p1", _loader(calls, "fresh")) == ("fresh", "miss")
+
+
+async def test_lru_and_ttl():
+    cache, calls = ResultCache(1, 60), []
+    await cache.get_or_load(TABLE, "p1", _loader(calls, 1))
+    await cache.get_or_load(TABLE, "p2", _loader(calls, 2))
+    assert (await cache.get_or_load(TABLE, "p1", _loader(calls, 1)))[1] == "miss"
+
+    expired = ResultCache(10, 0)
+    await expired.get_or_load(TABLE, "p1", _loader(calls, 1))
+    await asyncio.sleep(0.01)
+    assert (await expired.get_or_load(TABLE, "p1", _loader(calls, 1)))[1] == "miss"
@@ -0,0 +1,93 @@
+from app.services import schema_service
+from app.services.schema_service import SchemaCache
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _Conn:
+    """Returns the current fingerprint rows; tables are {name: signature}."""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    async def execute(self, _q, _params=None):
+        return _Result(
+            [{"oid": oid, "schema": "public", "name": name, "sig": sig} for oid, (name, sig) in enumerate(self.tables.items())]
+        )
+
+
+def _fake_loader(monkeypatch):
+    loaded = []
+
+    async def _load_tables(_conn, oids):
+        loaded.append(sorted(oids))
+        return {oid: {"columns": []} for oid in oids}
+
+    monkeypatch.setattr(schema_service, "load_tables", _load_tables)
+    return loaded
+
+
+async def test_unchanged_fingerprints_keep_the_version(monkeypatch):
+    loaded = _fake_loader(monkeypatch)
+    cache, conn = SchemaCache(), _Conn({"a": "1", "b": "1"})
+    await cache.refresh(conn)
+    version = cache.version
+    await cache.refresh(conn)
+    assert cache.version == version
+    # only the first refresh had anything to load
+    assert loaded == [[0, 1], []]
+    assert cache.delta(version) == {"full": False, "since": version, "version": version, "changed": [], "removed": []}
+
+
+async def test_delta_lists_changed_and_removed_tables(monkeypatch):
+    _fake_loader(monkeypatch)
+    cache, conn = SchemaCache(), _Conn({"a": "1", "b": "1"})
+    await cache.refresh(conn)
+    old = cache.version
+    conn.tables = {"a": "2"}
+    await cache.refresh(conn)
+    delta = cache.delta(old)
+    assert cache.version != old
+    assert [t["full_name"] for t in delta["changed"]] == ["public.a"]
+    assert delta["removed"] == ["public.b"]
+
+
+async def test_evicted_versions_get_a_full_snapshot(monkeypatch):
+    _fake_loader(monkeypatch)
+    monkeypatch.setattr(schema_service, "MAX_VERSIONS", 3)
+    cache, conn = SchemaCache(), _Conn({"a": "0"})
+    await cache.refresh(conn)
+    first = cache.version
+    for sig in ("1", "2", "3"):
+        conn.tables = {"a": sig}
+        await cache.refresh(conn)
+    assert len(cache.history) == 3
+    delta = cache.delta(first)
+    assert delta["full"] is True and delta["version"] == cache.version
+    assert [t["full_name"] for t in delta["tables"]] == ["public.a"]
+
+
+async def test_returning_to_an_old_version_makes_it_newest(monkeypatch):
+    _fake_loader(monkeypatch)
+    monkeypatch.setattr(schema_service, "MAX_VERSIONS", 2)
+    cache, conn = SchemaCache(), _Conn({"a": "0"})
+    await cache.refresh(conn)
+    first = cache.version
+    conn.tables = {"a": "1"}
+    await cache.refresh(conn)
+    conn.tables = {"a": "0"}
+    await cache.refresh(conn)
+    assert cache.version == first
+    # the current version must survive the next eviction
+    conn.tables = {"a": "2"}
+    await cache.refresh(conn)
+    assert cache.delta(first)["full"] is False
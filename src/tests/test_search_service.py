@@ -0,0 +1,126 @@
+import contextlib
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.services import search_service
+from app.services.search_service import search_index_name, search_table
+
+
+class _Canceled(Exception):
+    sqlstate = "57014"
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+    def scalar_one(self):
+        return self._rows[0][0]
+
+
+class _Conn:
+    """Catalog answers plus a fake table whose matches come back through FETCH."""
+
+    def __init__(self, trgm=(), indexes=(), matches=(), cancel_after=None, table_rows=0):
+        self.trgm = trgm
+        self.indexes = indexes
+        self.matches = list(matches)
+        self.cancel_after = cancel_after
+        self.table_rows = table_rows
+        self.statements = []
+        self.fetches = 0
+        self.rolled_back = False
+
+    async def execute(self, q, params=None):
+        sql = str(q)
+        self.statements.append(sql)
+        if q is search_service.TEXT_COLUMNS_Q:
+            return _Result([("name",), ("notes",)])
+        if q is search_service.TRGM_COLUMNS_Q:
+            return _Result([(c,) for c in self.trgm])
+        if q is search_service.INDEX_NAMES_Q:
+            return _Result([(n,) for n in self.indexes])
+        if sql.startswith("FETCH FORWARD"):
+            if self.cancel_after is not None and self.fetches >= self.cancel_after:
+                raise DBAPIError(sql, {}, _Canceled("canceling statement due to statement timeout"))
+            self.fetches += 1
+            step = int(sql.split()[2])
+            rows, self.matches = self.matches[:step], self.matches[step:]
+            return _Result(rows)
+        if sql.startswith("SELECT count(*)"):
+            return _Result([(min(self.table_rows, params["budget_plus"]),)])
+        return _Result([{"name": "a", "_score": 0.5}])
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+class _FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        yield self.conn
+
+
+async def _search(conn, limit=50, scan_budget=1000):
+    return await search_table(_FakeEngine(conn), "public", "items", "abc", limit, None, scan_budget, 1000)
+
+
+async def test_trigram_indexed_columns_are_ranked_by_similarity():
+    conn = _Conn(trgm=["name"])
+    result = await _search(conn)
+    assert result["mode"] == "indexed" and not result["partial"]
+    assert result["columns_searched"] == ["name"] and result["unindexed_columns"] == ["notes"]
+    assert "similarity(\"name\", :q)" in conn.statements[-1]
+    assert "plainto_tsquery" not in conn.statements[-1]
+
+
+async def test_fts_index_is_recognised_by_its_name():
+    conn = _Conn(trgm=["name"], indexes=[search_index_name("items", "notes", "fts")])
+    result = await _search(conn)
+    assert result["columns_searched"] == ["name", "notes"]
+    assert "greatest(" in conn.statements[-1] and "ts_rank(" in conn.statements[-1]
+
+
+async def test_scan_without_index_reads_the_cursor_in_steps(monkeypatch):
+    monkeypatch.setattr(search_service, "SCAN_FETCH_ROWS", 2)
+    conn = _Conn(matches=[{"name": f"r{i}"} for i in range(3)], table_rows=10)
+    result = await _search(conn, limit=5)
+    assert result["mode"] == "scan"
+    assert any(s.startswith("DECLARE search_scan") and "ILIKE :pattern" in s for s in conn.statements)
+    assert [r["name"] for r in result["rows"]] == ["r0", "r1", "r2"]
+    assert conn.fetches == 2
+    # the whole table fit in the budget: nothing was left unscanned
+    assert not result["partial"] and not result["timed_out"]
+
+
+async def test_scan_over_budget_is_partial():
+    conn = _Conn(matches=[], table_rows=5000)
+    result = await _search(conn, scan_budget=1000)
+    assert result["partial"] and not result["timed_out"]
+
+
+async def test_scan_timeout_keeps_rows_matched_so_far(monkeypatch):
+    monkeypatch.setattr(search_service, "SCAN_FETCH_ROWS", 2)
+    conn = _Conn(matches=[{"name": f"r{i}"} for i in range(10)], cancel_after=2)
+    result = await _search(conn, limit=10)
+    assert result["timed_out"] and result["partial"]
+    assert [r["name"] for r in result["rows"]] == ["r0", "r1", "r2", "r3"]
+    assert conn.rolled_back
+
+
+async def test_unknown_columns_are_rejected():
+    with pytest.raises(ValueError):
+        await search_table(_FakeEngine(_Conn()), "public", "items", "abc", 10, ["id"], 1000, 1000)
@@ -0,0 +1,112 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from app.services import jobs, table_copy
+
+
+class _FakeDriver:
+    """Just enough of an asyncpg connection for one COPY pipe."""
+
+    def __init__(self, chunks=0, write_delay=0.0, fail_write=False):
+        self.chunks = chunks
+        self.write_delay = write_delay
+        self.fail_write = fail_write
+        self.produced = 0
+        self.consumed = 0
+        self.max_lag = 0
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, **_kwargs):
+        yield
+
+    async def execute(self, _sql):
+        pass
+
+    async def copy_from_query(self, _sql, *_args, output, format):
+        for _ in range(self.chunks):
+            self.produced += 1
+            await output(b"x" * 10)
+
+    async def copy_to_table(self, _table, source, schema_name, columns, format):
+        rows = 0
+        async for _chunk in source:
+            if self.fail_write:
+                raise RuntimeError("target is gone")
+            await asyncio.sleep(self.write_delay)
+            rows += 1
+        return f"COPY {rows}"
+
+
+class _FakeEngine:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        yield self.driver
+
+
+@pytest.fixture
+def sides(monkeypatch):
+    async def _driver(conn):
+        return conn
+
+    monkeypatch.setattr(table_copy, "_driver", _driver)
+
+    def _make(src, dst):
+        source = table_copy.CopySide(1, _FakeEngine(src), "public", "items")
+        target = table_copy.CopySide(2, _FakeEngine(dst), "public", "items")
+        return table_copy.CopyPlan(source, target, ["id", "name"], ["id"], None)
+
+    return _make
+
+
+async def test_pipe_is_bounded_by_the_buffer(sides):
+    src = _FakeDriver(chunks=50)
+    dst = _FakeDriver(write_delay=0.001)
+    plan = sides(src, dst)
+    meter = table_copy._Throughput(jobs.Job(1, "copy_table", "test", {}), 1)
+
+    async def _watch():
+        while True:
+            # produced but not yet consumed never exceeds queue + the chunk in hand
+            src.max_lag = max(src.max_lag, src.produced - meter.bytes // 10)
+            await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(_watch())
+    try:
+        rows = await table_copy._copy_range(plan, "snap", None, None, "binary", 4, meter)
+    finally:
+        watcher.cancel()
+    assert rows == 50
+    assert meter.bytes == 500
+    assert src.max_lag <= 4 + 2
+    assert meter.job.progress["rows"] == 50
+
+
+async def test_target_failure_stops_the_source(sides):
+    src = _FakeDriver(chunks=1000)
+    dst = _FakeDriver(fail_write=True)
+    meter = table_copy._Throughput(jobs.Job(1, "copy_table", "test", {}), 1)
+    with pytest.raises(RuntimeError, match="target is gone"):
+        await table_copy._copy_range(sides(src, dst), "snap", None, None, "binary", 4, meter)
+    assert src.produced < 10
+
+
+def test_range_query_and_create_sql():
+    side = table_copy.CopySide(0, None, "public", "items")
+    plan = table_copy.CopyPlan(side, side, ["id", "name"], ["id"], None)
+    assert table_copy._range_query(plan, 10, 20) == (
+        'SELECT "id", "name" FROM "public"."items" WHERE "id" > $1 AND "id" <= $2',
+        [10, 20],
+    )
+    assert table_copy._range_query(plan, None, None)[1] == []
+    columns = [
+        {"name": "id", "type": "bigint", "not_null": True},
+        {"name": "name", "type": "character varying(80)", "not_null": False},
+    ]
+    assert table_copy.create_table_sql(side, columns, ["id"]) == (
+        'CREATE TABLE "public"."items" ("id" bigint NOT NULL, "name" character varying(80), PRIMARY KEY ("id"))'
+    )
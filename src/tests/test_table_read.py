@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.table_read import attach_sizes, build_select_list
+
+TYPES = [("id", "int8"), ("title", "varchar"), ("body", "text"), ("payload", "bytea"), ("doc", "jsonb")]
+
+
+def test_projection_keeps_primary_key():
+    sql, sizes = build_select_list(TYPES, ["title"], None, ["id"])
+    assert sql == '"id", "title"'
+    assert sizes == {}
+    with pytest.raises(ValueError):
+        build_select_list(TYPES, ["missing"], None, ["id"])
+
+
+def test_preview_truncates_large_columns_only():
+    sql, sizes = build_select_list(TYPES, None, 100, ["id"])
+    assert sql.startswith('"id", left("title", :preview + 1) AS "title", octet_length("title") AS __size_1')
+    assert "encode(substring(\"payload\" from 1 for :preview + 1), 'hex') AS \"payload\"" in sql
+    assert sizes == {
+        "__size_1": ("title", "varchar"),
+        "__size_2": ("body", "text"),
+        "__size_3": ("payload", "bytea"),
+        "__size_4": ("doc", "jsonb"),
+    }
+
+
+def test_attach_sizes_reports_only_cut_values():
+    # previews are one character longer than asked for; a value of exactly 100 was not cut
+    row = {"id": 1, "title": "x" * 101, "__size_1": 5000, "body": "y" * 100, "__size_2": 400}
+    row = attach_sizes(row, {"__size_1": ("title", "varchar"), "__size_2": ("body", "text")}, 100)
+    assert row == {"id": 1, "title": "x" * 100, "body": "y" * 100, "_truncated": {"title": 5000}}
+
+
+def test_values_that_fit_keep_their_type():
+    sizes = {"__size_1": ("doc", "jsonb"), "__size_2": ("payload", "bytea")}
+    row = attach_sizes({"doc": '{"a": [1, 2]}', "__size_1": 40, "payload": "00ff", "__size_2": 2}, sizes, 16)
+    assert row == {"doc": {"a": [1, 2]}, "payload": b"\x00\xff"}
+
+    cut = attach_sizes({"doc": '{"a": "' + "z" * 20, "__size_1": 900, "payload": "ab" * 17, "__size_2": 500}, sizes, 16)
+    assert cut["doc"] == '{"a": "' + "z" * 9 and cut["payload"] == "ab" * 16
+    assert cut["_truncated"] == {"doc": 900, "payload": 500}
@@ -0,0 +1,50 @@
+from app.services import table_sample
+
+
+def test_percent_follows_row_estimate():
+    # 50 rows with a 2x margin out of 10M rows
+    assert table_sample.sample_percent(50, 10_000_000, "system") == 0.001
+    assert table_sample.sample_percent(50, 1_000, "bernoulli") == 6.0
+    assert table_sample.sample_percent(50, 20, "system") == 100.0
+    assert table_sample.sample_percent(50, 0, "system") == 100.0
+
+
+def test_estimate_covers_never_analyzed_partitions():
+    assert table_sample.estimate_rows(1000.0, 10.0, 0.0) == (1000.0, "statistics")
+    # unknown pages take the density of the analyzed ones
+    assert table_sample.estimate_rows(1000.0, 10.0, 5.0) == (1500.0, "relation_size")
+    assert table_sample.estimate_rows(0.0, 0.0, 3.0) == (3 * table_sample.DEFAULT_ROWS_PER_PAGE, "relation_size")
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _Session:
+    """Returns as many rows as the percentage yields from a 1000-row table."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, q, params):
+        self.calls.append((str(q), params))
+        n = min(params["rows"], int(1000 * params["percent"] / 100))
+        return _Result([{"id": i} for i in range(n)])
+
+
+async def test_sample_grows_percentage_when_estimate_was_too_high():
+    session = _Session()
+    # stale statistics claim 10000 rows, the table has 1000
+    rows, info = await table_sample.sample_rows(session, '"public"."t"', "*", {}, 50, "system", 7, 10_000)
+    assert len(rows) == 50
+    assert info["attempts"] == 3 and info["seed"] == 7
+    assert [p["percent"] for _, p in session.calls] == [1.0, 4.0, 16.0]
+    sql = session.calls[0][0]
+    assert "TABLESAMPLE SYSTEM (:percent) REPEATABLE (:seed)" in sql
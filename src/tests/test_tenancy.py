@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import tenancy
+
+
+class _DbapiConnection:
+    def __init__(self):
+        self.executed = []
+
+    def run_async(self, fn):
+        fn(SimpleNamespace(execute=self.executed.append))
+
+
+def test_tenant_schema_validation(monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "tenant_schema_prefix", "t_")
+    assert tenancy.tenant_schema("acme") == "t_acme"
+    with pytest.raises(ValueError):
+        tenancy.tenant_schema('acme"; drop')
+
+
+def test_checkout_sets_search_path_only_on_change():
+    dbapi, record = _DbapiConnection(), SimpleNamespace(info={})
+    token = tenancy.current_tenant_schema.set("acme")
+    try:
+        tenancy._on_checkout(dbapi, record, None)
+        tenancy._on_checkout(dbapi, record, None)
+    finally:
+        tenancy.current_tenant_schema.reset(token)
+    tenancy._on_checkout(dbapi, record, None)
+    assert dbapi.executed == ['SET search_path TO "acme", public', "RESET search_path"]
+
+
+def test_scope_dependency_guards_path_schema(monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "tenancy_enabled", True)
+    monkeypatch.setattr(tenancy.settings, "tenant_schema_prefix", "")
+    router = APIRouter(dependencies=[Depends(tenancy.tenant_scope)])
+
+    @router.get("/table/{schema}")
+    async def endpoint(schema: str):
+        return {"tenant": tenancy.current_tenant_schema.get()}
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    assert client.get("/table/acme", headers={"X-Tenant": "acme"}).json() == {"tenant": "acme"}
+    assert client.get("/table/other", headers={"X-Tenant": "acme"}).status_code == 403
+    assert client.get("/table/acme").status_code == 400
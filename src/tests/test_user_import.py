@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import users
+from app.services import jobs, user_import
+
+CSV = b"""email,password,full_name
+a@example.com,secret1,Ann
+not-an-email,secret2,
+b@example.com,,Bob
+a@example.com,secret3,Dup
+taken@example.com,secret4,
+"""
+
+
+def test_parse_records_formats():
+    records = user_import.parse_records(CSV, "text/csv; charset=utf-8")
+    assert records[0] == (2, {"email": "a@example.com", "password": "secret1", "full_name": "Ann"})
+    ndjson = b'{"email": "a@example.com", "password": "x"}\n\nnot json\n'
+    assert user_import.parse_records(ndjson, "application/x-ndjson") == [
+        (1, {"email": "a@example.com", "password": "x"}),
+        (3, {"_error": "Invalid JSON"}),
+    ]
+    with pytest.raises(ValueError):
+        user_import.parse_records(b"{}", "application/json")
+    with pytest.raises(ValueError):
+        user_import.parse_records(b"name\nx\n", "text/csv")
+
+
+async def test_import_counts_created_skipped_and_failed(monkeypatch):
+    inserted = []
+    hashed = []
+
+    async def _existing(engine, emails):
+        return {"taken@example.com"} & set(emails)
+
+    async def _hash(passwords):
+        hashed.extend(passwords)
+        return [f"hash:{p}" for p in passwords]
+
+    async def _insert(engine, rows, report):
+        inserted.extend(rows)
+        report.created += len(rows)
+
+    monkeypatch.setattr(user_import, "_existing_emails", _existing)
+    monkeypatch.setattr(user_import, "hash_passwords_bulk", _hash)
+    monkeypatch.setattr(user_import, "_insert", _insert)
+
+    job = jobs.Job(1, "user_import", "test", {})
+    records = user_import.parse_records(CSV, "text/csv")
+    result = await user_import.import_users(job, None, records, batch_size=2)
+
+    assert (result["created"], result["skipped"], result["failed"]) == (1, 2, 2)
+    assert [r["email"] for r in inserted] == ["a@example.com"]
+    assert inserted[0]["password_hash"] == "hash:secret1"
+    # duplicates and existing accounts are never hashed
+    assert hashed == ["secret1"]
+    assert [e["line"] for e in result["errors"]] == [3, 4]
+
+
+async def test_import_endpoints_require_admin():
+    user = SimpleNamespace(email="user@example.com", is_admin=False)
+    with pytest.raises(HTTPException) as exc_info:
+        await users.users_import(request=None, current=user, ticket=None)
+    assert exc_info.value.status_code == 403
+    with pytest.raises(HTTPException) as exc_info:
+        await users.users_import_status(1, current=user)
+    assert exc_info.value.status_code == 403